@@ -0,0 +1,22 @@
+"""Cloud browser benchmarks.
+
+Offline benchmarks for the listing, filtering and bulk mutation paths of the
+datastore backends, run against generated directories of increasing size.
+Each case reports the backend calls issued, wall time and peak RSS, and is
+compared against the stored baselines (``bench/baselines.json``) so that
+regressions fail the run.
+
+Usage::
+
+    $ python -m bench.run                        # Compare with baselines.
+    $ python -m bench.run --sizes=10,100,1000000  # Up to 1M keys.
+    $ python -m bench.run --save                 # Store new baselines.
+
+or through fabric::
+
+    $ fab bench
+
+The per-call overhead of the exception translators is measured separately::
+
+    $ python -m bench.errors
+"""
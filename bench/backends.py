@@ -0,0 +1,164 @@
+"""Benchmark datastore backends.
+
+A backend knows how to configure Django settings for its datastore, how to
+populate a container with a generated directory tree and how to open that
+container through the normal :mod:`cloud_browser.cloud` connection.
+"""
+from __future__ import with_statement
+
+import os
+import shutil
+import tempfile
+
+#: Benchmarked directory (relative to the container).
+BENCH_DIR = "dir"
+
+#: Document fetched by the ``document`` case.
+BENCH_DOC = "dir/document.bin"
+
+#: Size of generated files / document.
+FILE_BYTES = 64
+DOC_BYTES = 256 * 1024
+
+
+def key_names(size):
+    """Yield ``size`` file key names and one key per generated subdirectory.
+
+    Files are flat under :data:`BENCH_DIR` with one subdirectory (holding a
+    single file) for every ten files.
+    """
+    for i in xrange(size):
+        yield "%s/f%07d.txt" % (BENCH_DIR, i)
+    for i in xrange(max(1, size // 10)):
+        yield "%s/s%05d/f.txt" % (BENCH_DIR, i)
+
+
+class Backend(object):
+    """Benchmark backend."""
+    #: Backend name (as used in baselines).
+    name = None
+
+    def settings(self):
+        """Return Django settings dictionary for the datastore."""
+        raise NotImplementedError
+
+    def populate(self, container_name, size):
+        """Create container holding a generated tree of ``size`` keys."""
+        raise NotImplementedError
+
+    def start(self):
+        """Start backend (after Django settings are configured)."""
+        pass
+
+    def close(self):
+        """Release any backend resources."""
+        pass
+
+    def request_count(self):  # pylint: disable=no-self-use
+        """Return total requests served so far (``None`` if not counted)."""
+        return None
+
+    @classmethod
+    def get_container(cls, container_name):
+        """Return container through the configured connection."""
+        from cloud_browser.cloud import get_connection
+
+        return get_connection().get_container(container_name)
+
+
+class FilesystemBackend(Backend):
+    """Filesystem datastore in a temporary directory."""
+    name = 'fs'
+
+    def __init__(self):
+        """Initializer."""
+        self.root = tempfile.mkdtemp(prefix="cloud-browser-bench-")
+
+    def settings(self):
+        """Return Django settings dictionary for the datastore."""
+        return {
+            'CLOUD_BROWSER_DATASTORE': "Filesystem",
+            'CLOUD_BROWSER_FILESYSTEM_ROOT': self.root,
+        }
+
+    def populate(self, container_name, size):
+        """Create container holding a generated tree of ``size`` keys."""
+        base = os.path.join(self.root, container_name)
+        if os.path.exists(base):
+            shutil.rmtree(base)
+
+        for name in key_names(size):
+            path = os.path.join(base, name)
+            parent = os.path.dirname(path)
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+            with open(path, 'wb') as file_obj:
+                file_obj.write("x" * FILE_BYTES)
+
+        with open(os.path.join(base, BENCH_DOC), 'wb') as file_obj:
+            file_obj.write("d" * DOC_BYTES)
+
+    def close(self):
+        """Remove temporary directory."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class S3Backend(Backend):
+    """AWS datastore against a local S3 stand-in server.
+
+    The server runs in a thread of the parent benchmark process and serves
+    the forked case processes over loopback.
+    """
+    name = 's3'
+
+    def __init__(self, latency=0.0):
+        """Initializer."""
+        self.latency = latency
+        self.server = None
+
+    def settings(self):
+        """Return Django settings dictionary for the datastore."""
+        return {
+            'CLOUD_BROWSER_DATASTORE': "AWS",
+            'CLOUD_BROWSER_AWS_ACCOUNT': "bench",
+            'CLOUD_BROWSER_AWS_SECRET_KEY': "bench",
+            'CLOUD_BROWSER_AWS_IS_SECURE': False,
+        }
+
+    def start(self):
+        """Start server and point the AWS datastore at it."""
+        from django.conf import settings
+        from cloud_browser.testing import S3StandIn
+
+        self.server = S3StandIn(latency=self.latency).start()
+        settings.CLOUD_BROWSER_AWS_HOST = self.server.host
+        settings.CLOUD_BROWSER_AWS_PORT = self.server.port
+
+    def populate(self, container_name, size):
+        """Create container holding a generated tree of ``size`` keys."""
+        with self.server.lock:
+            self.server.buckets.pop(container_name, None)
+            self.server.create_bucket(container_name)
+            # Pseudo-directory key, as created by ``mkdir``.
+            self.server.put(container_name, BENCH_DIR + "/",
+                            "It is a directory.")
+            for name in key_names(size):
+                self.server.put(container_name, name, "x" * FILE_BYTES)
+            self.server.put(container_name, BENCH_DOC, "d" * DOC_BYTES)
+
+    def close(self):
+        """Stop server."""
+        if self.server is not None:
+            self.server.stop()
+
+    def request_count(self):
+        """Return total requests served so far."""
+        with self.server.lock:
+            return sum(self.server.requests.values())
+
+
+#: Available backends by name.
+BACKENDS = {
+    FilesystemBackend.name: FilesystemBackend,
+    S3Backend.name: S3Backend,
+}
@@ -0,0 +1,99 @@
+"""Exception wrapper micro-benchmark.
+
+Measures the per-call overhead of a :class:`CloudExceptionWrapper`
+decorated function against the bare function, for calls that return, that
+raise a translated exception and that raise an untranslated exception.
+
+Usage::
+
+    $ python -m bench.errors
+    $ python -m bench.errors --number=1000000
+"""
+import timeit
+
+from optparse import OptionParser
+
+from cloud_browser.cloud import errors
+
+
+class MissingError(Exception):
+    """Library "not found" error."""
+    pass
+
+
+class MissingKeyError(MissingError):
+    """Library "no such key" error."""
+    pass
+
+
+class BenchWrapper(errors.CloudExceptionWrapper):
+    """Wrapper under benchmark."""
+    translations = {
+        MissingError: errors.NoObjectException,
+        LookupError: errors.StorageResponseException,
+    }
+
+
+def succeed():
+    """Return."""
+    return None
+
+
+def fail():
+    """Raise a translated exception."""
+    raise MissingKeyError("no such key")
+
+
+def fail_untranslated():
+    """Raise an untranslated exception."""
+    raise ValueError("bad value")
+
+
+def catch(function, exc_cls):
+    """Return callable calling ``function`` and trapping ``exc_cls``."""
+    def call():
+        """Call."""
+        try:
+            function()
+        except exc_cls:
+            pass
+    return call
+
+
+#: Cases: (name, bare callable, wrapped callable).
+CASES = (
+    ("success", succeed, BenchWrapper()(succeed)),
+    ("translated", catch(fail, MissingError),
+     catch(BenchWrapper()(fail), errors.NoObjectException)),
+    ("untranslated", catch(fail_untranslated, ValueError),
+     catch(BenchWrapper()(fail_untranslated), ValueError)),
+)
+
+
+def per_call(function, number, repeat):
+    """Return best time per call of ``function`` (in nanoseconds)."""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / \
+        number * 1e9
+
+
+def main(argv=None):
+    """Run the benchmark."""
+    parser = OptionParser(usage="python -m bench.errors [options]")
+    parser.add_option("--number", type='int', default=100000,
+                      help="Calls per timing (default: %default).")
+    parser.add_option("--repeat", type='int', default=5,
+                      help="Timings per case, best is kept "
+                           "(default: %default).")
+    options, _ = parser.parse_args(argv)
+
+    print "%-14s %12s %12s %12s" % ("case", "bare (ns)", "wrapped (ns)",
+                                     "overhead")
+    for name, bare, wrapped in CASES:
+        bare_time = per_call(bare, options.number, options.repeat)
+        wrapped_time = per_call(wrapped, options.number, options.repeat)
+        print "%-14s %12.1f %12.1f %12.1f" % (name, bare_time, wrapped_time,
+                                               wrapped_time - bare_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Benchmark runner.
+
+Every (case, size) pair runs in a forked child process so that peak RSS is
+measured per case. Backend calls are counted with the
+:mod:`cloud_browser.cloud.instrument` recorder and, for the S3 stand-in,
+HTTP requests are counted by the server itself.
+"""
+from __future__ import with_statement
+
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+from optparse import OptionParser
+
+from bench.backends import BACKENDS, BENCH_DIR, BENCH_DOC
+
+#: Default stored baselines file.
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+#: Default directory sizes (number of file keys).
+DEFAULT_SIZES = (10, 100, 1000)
+
+#: Listing limit (as in the browser view: default limit + 1).
+LIST_LIMIT = 21
+
+
+###############################################################################
+# Cases.
+###############################################################################
+class Case(object):
+    """Benchmark case."""
+    #: Case name.
+    name = None
+    #: Case destroys the container contents (needs a fresh one per run).
+    mutates = False
+
+    def setup(self, container):  # pylint: disable=no-self-use, W0613
+        """Prepare and return arguments for :meth:`run`."""
+        return ()
+
+    def run(self, container, *args):
+        """Run timed case."""
+        raise NotImplementedError
+
+
+class GetObjectsCase(Case):
+    """List a page of the benchmark directory."""
+    name = 'get_objects'
+
+    def run(self, container, *args):
+        """Run timed case."""
+        container.get_objects(BENCH_DIR, None, LIST_LIMIT)
+
+
+class ObjectMetadataCase(Case):
+    """Read the displayed metadata of a listed page of the benchmark
+    directory."""
+    name = 'object_metadata'
+
+    def setup(self, container):
+        """Prepare and return arguments for :meth:`run`."""
+        return (container.get_objects(BENCH_DIR, None, LIST_LIMIT),)
+
+    def run(self, container, *args):
+        """Run timed case."""
+        for obj in args[0]:
+            obj.modified_by  # pylint: disable=pointless-statement
+
+
+class GetDirectoriesPathsCase(Case):
+    """Collect all directory paths of the container."""
+    name = 'get_directories_paths'
+
+    def run(self, container, *args):
+        """Run timed case."""
+        container.get_directories_paths()
+
+
+class DeleteDirectoryCase(Case):
+    """Recursively delete the benchmark directory."""
+    name = 'delete_directory'
+    mutates = True
+
+    def run(self, container, *args):
+        """Run timed case."""
+        container.delete(BENCH_DIR, False)
+
+
+class RenameDirectoryCase(Case):
+    """Recursively rename the benchmark directory."""
+    name = 'rename_directory'
+    mutates = True
+
+    def run(self, container, *args):
+        """Run timed case."""
+        container.rename('', BENCH_DIR, BENCH_DIR + "-renamed", False)
+
+
+class DocumentCase(Case):
+    """Serve a document through the ``document`` view."""
+    name = 'document'
+
+    def setup(self, container):
+        """Prepare and return arguments for :meth:`run`."""
+        from django.test.client import RequestFactory
+        from cloud_browser.views import document
+
+        path = "/".join((container.name, BENCH_DOC))
+        return (document, RequestFactory().get("/document/" + path), path)
+
+    def run(self, container, *args):
+        """Run timed case."""
+        view, request, path = args
+        response = view(request, path=path)
+        for _ in response:
+            pass
+
+
+#: All cases (in run order).
+CASES = (
+    GetObjectsCase(),
+    ObjectMetadataCase(),
+    GetDirectoriesPathsCase(),
+    DocumentCase(),
+    DeleteDirectoryCase(),
+    RenameDirectoryCase(),
+)
+
+
+###############################################################################
+# Running.
+###############################################################################
+def _measure(backend, case, container_name, results, start):
+    """Run a single case (in a child process) and put result on queue.
+
+    Signals readiness after setup and waits for ``start`` so the parent can
+    snapshot server-side request counters around the timed part only.
+    """
+    from cloud_browser.cloud import instrument
+
+    container = backend.get_container(container_name)
+    args = case.setup(container)
+    results.put(None)
+    start.wait()
+
+    instrument.start()
+    begin = time.time()
+    case.run(container, *args)
+    wall = time.time() - begin
+    stats = instrument.stop()
+
+    results.put({
+        'calls': stats.count,
+        'wall': round(wall, 6),
+        'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    })
+
+
+def measure(backend, case, size, repeat):
+    """Return best-of-``repeat`` result for the case."""
+    container_name = "bench-%d" % size
+    if case.mutates:
+        container_name = "bench-%d-%s" % (size, case.name)
+
+    best = None
+    for _ in range(repeat):
+        if case.mutates:
+            backend.populate(container_name, size)
+
+        results = multiprocessing.Queue()
+        start = multiprocessing.Event()
+        proc = multiprocessing.Process(
+            target=_measure,
+            args=(backend, case, container_name, results, start))
+        proc.start()
+        results.get()
+
+        requests = backend.request_count()
+        start.set()
+        proc.join()
+        if proc.exitcode != 0:
+            raise RuntimeError("Case %s (%d keys) failed." % (case.name, size))
+
+        result = results.get()
+        if requests is not None:
+            result['requests'] = backend.request_count() - requests
+        if best is None or result['wall'] < best['wall']:
+            best = result
+
+    return best
+
+
+def compare(result, baseline, wall_tolerance, rss_tolerance):
+    """Return list of regression descriptions (empty if none)."""
+    regressions = []
+    if result.get('requests', 0) > baseline.get('requests', 0):
+        regressions.append("requests %d > %d" %
+                           (result['requests'], baseline.get('requests', 0)))
+
+    if result['calls'] > baseline['calls']:
+        regressions.append("calls %d > %d" %
+                           (result['calls'], baseline['calls']))
+
+    # Allow a small absolute slack for very short cases.
+    if result['wall'] > baseline['wall'] * wall_tolerance + 0.005:
+        regressions.append("wall %.4fs > %.4fs" %
+                           (result['wall'], baseline['wall']))
+
+    if result['rss_kb'] > baseline['rss_kb'] * rss_tolerance + 2048:
+        regressions.append("rss %dKB > %dKB" %
+                           (result['rss_kb'], baseline['rss_kb']))
+
+    return regressions
+
+
+def configure(backend):
+    """Configure Django settings for backend."""
+    from django.conf import settings
+
+    options = {
+        'DEBUG': False,
+        'SECRET_KEY': "cloud-browser-bench",
+        'INSTALLED_APPS': ('cloud_browser',),
+        'CLOUD_BROWSER_INSTRUMENTATION': True,
+    }
+    options.update(backend.settings())
+    settings.configure(**options)
+
+
+def _parse_options(argv):
+    """Parse command line options."""
+    parser = OptionParser(usage="python -m bench.run [options]")
+    parser.add_option("--backend", default='fs',
+                      choices=sorted(BACKENDS.keys()),
+                      help="Datastore backend (default: %default).")
+    parser.add_option("--sizes",
+                      default=",".join(str(x) for x in DEFAULT_SIZES),
+                      help="Comma-separated directory sizes "
+                           "(default: %default).")
+    parser.add_option("--cases", default=None,
+                      help="Comma-separated case names (default: all).")
+    parser.add_option("--repeat", type='int', default=3,
+                      help="Runs per case, best is kept (default: %default).")
+    parser.add_option("--baselines", default=BASELINES_PATH,
+                      help="Baselines file (default: %default).")
+    parser.add_option("--save", action='store_true', default=False,
+                      help="Store results as new baselines.")
+    parser.add_option("--wall-tolerance", type='float', default=1.5,
+                      help="Allowed wall time ratio (default: %default).")
+    parser.add_option("--rss-tolerance", type='float', default=1.25,
+                      help="Allowed peak RSS ratio (default: %default).")
+
+    options, _ = parser.parse_args(argv)
+    return options
+
+
+def main(argv=None):
+    """Run benchmarks and return exit status."""
+    options = _parse_options(argv)
+    sizes = [int(x) for x in options.sizes.split(',')]
+    cases = CASES
+    if options.cases:
+        names = set(options.cases.split(','))
+        cases = [x for x in CASES if x.name in names]
+
+    baselines = {}
+    if os.path.exists(options.baselines):
+        with open(options.baselines, 'rb') as file_obj:
+            baselines = json.load(file_obj)
+    backend_baselines = baselines.setdefault(options.backend, {})
+
+    backend = BACKENDS[options.backend]()
+    configure(backend)
+
+    failed = False
+    try:
+        backend.start()
+        print "%-24s %9s %8s %8s %10s %10s  %s" % (
+            "case", "keys", "requests", "calls", "wall (s)", "rss (KB)",
+            "status")
+        for size in sizes:
+            backend.populate("bench-%d" % size, size)
+            for case in cases:
+                result = measure(backend, case, size, options.repeat)
+                case_baselines = backend_baselines.setdefault(case.name, {})
+                baseline = case_baselines.get(str(size))
+
+                if options.save:
+                    case_baselines[str(size)] = result
+                    status = "saved"
+                elif baseline is None:
+                    status = "no baseline"
+                else:
+                    regressions = compare(result, baseline,
+                                          options.wall_tolerance,
+                                          options.rss_tolerance)
+                    failed = failed or bool(regressions)
+                    status = "; ".join(regressions) or "ok"
+
+                print "%-24s %9d %8s %8d %10.4f %10d  %s" % (
+                    case.name, size, result.get('requests', "--"),
+                    result['calls'], result['wall'], result['rss_kb'], status)
+    finally:
+        backend.close()
+
+    if options.save:
+        with open(options.baselines, 'wb') as file_obj:
+            json.dump(baselines, file_obj, indent=2, sort_keys=True,
+                      separators=(',', ': '))
+            file_obj.write("\n")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -82,6 +82,8 @@ class Settings(object):
     """Cloud Browser application settings.
 
     This class wraps the "real" Django settings object, so can be used instead.
+    Cloud browser settings are resolved and validated once, on first access,
+    into a read-only snapshot of plain attributes (see :meth:`reload`).
     The additional cloud browser settings are as follows:
 
     .. note::
@@ -105,6 +107,11 @@ class Settings(object):
     * ``CLOUD_BROWSER_DATASTORE = "AWS"``
     * ``CLOUD_BROWSER_AWS_ACCOUNT``: Account name. (*Env*)
     * ``CLOUD_BROWSER_AWS_SECRET_KEY``: Account API secret key. (*Env*)
+    * ``CLOUD_BROWSER_AWS_HOST``: Alternative S3-compatible endpoint host,
+      e.g., a local stand-in server for testing. (*Env*)
+    * ``CLOUD_BROWSER_AWS_PORT``: Alternative endpoint port. (*Env*)
+    * ``CLOUD_BROWSER_AWS_IS_SECURE``: Boolean designating whether or not to
+      use HTTPS, defaults to ``True``. (*Env*)
 
     **Google Storage for Developers**: Configure Google Storage as backing
     datastore.
@@ -151,6 +158,149 @@ class Settings(object):
     * ``CLOUD_BROWSER_CONTAINER_WHITELIST``: White list of names. (Iterable)
     * ``CLOUD_BROWSER_CONTAINER_BLACKLIST``: Black list of names. (Iterable)
 
+    **Instrumentation**: Per-request accounting of native datastore calls.
+
+    * ``CLOUD_BROWSER_INSTRUMENTATION``: Boolean designating whether or not
+      to record native datastore call counts and latencies. Requires
+      ``cloud_browser.middleware.ServerTimingMiddleware`` to report them in
+      a ``Server-Timing`` response header and a log line. (*Env*)
+
+    **Background Jobs**: Recursive deletes, renames and moves run as
+    background jobs (see :mod:`cloud_browser.jobs`), with progress kept in the
+    Django cache.
+
+    * ``CLOUD_BROWSER_JOB_WORKERS``: Number of worker threads per process,
+      defaults to 4. Use 0 to run operations within the request instead.
+    * ``CLOUD_BROWSER_JOB_TTL``: Seconds job state is kept in the cache,
+      defaults to one day.
+    * ``CLOUD_BROWSER_JOURNAL_DIR``: Directory for checkpoint journals of
+      recursive renames and deletes (see :mod:`cloud_browser.cloud.journal`).
+      An interrupted operation run again continues its progress from the
+      last checkpoint. Unset disables journaling. (*Env*)
+
+    **Copies**: Server-side copies (renames and moves) of large objects on
+    boto-based datastores.
+
+    * ``CLOUD_BROWSER_COPY_MULTIPART_THRESHOLD``: Objects larger than this
+      many bytes are copied with a multipart upload, defaults to 256 MB.
+      Must not exceed 5 GB, the limit of a single copy.
+    * ``CLOUD_BROWSER_COPY_PART_SIZE``: Part size in bytes, defaults to
+      128 MB (at least 5 MB; raised as needed to stay within 10,000 parts).
+    * ``CLOUD_BROWSER_COPY_WORKERS``: Parts copied concurrently, defaults
+      to 8.
+
+    **Bulk Operations**: Deleting and moving multiple selected files.
+
+    * ``CLOUD_BROWSER_BULK_WORKERS``: Maximum number of concurrent datastore
+      operations, defaults to 8.
+
+    **Request Coalescing**: Concurrent identical listing and metadata calls
+    (``get_objects``, ``get_object``, ``get_containers``) within a process
+    share one backend call (see :mod:`cloud_browser.cloud.singleflight`).
+
+    * ``CLOUD_BROWSER_SINGLEFLIGHT``: Boolean designating whether or not to
+      coalesce calls, defaults to ``True``. (*Env*)
+
+    **Existence Cache**: Results of existence probes (``has_directory`` and
+    name collision checks, see :mod:`cloud_browser.cloud.existence`) are
+    cached per process, including negative results. Mutations of a
+    container drop its cached results.
+
+    * ``CLOUD_BROWSER_EXISTS_CACHE_TTL``: Seconds a probe result is cached,
+      defaults to 5. ``0`` disables the cache.
+
+    **Metadata Index**: Containers crawled into a local SQLite index (with
+    the ``cloud_browser_index`` management command), or imported from S3
+    Inventory reports (``--inventory``), are listed from the index instead
+    of the datastore (see :mod:`cloud_browser.cloud.index`). Mutations and
+    uploads made through the browser update the index.
+
+    * ``CLOUD_BROWSER_INDEX_PATH``: Index database file. Unset disables the
+      index. (*Env*)
+
+    **Rate Limiting**: Requests of boto-based datastores pass through an
+    adaptive per-process token bucket per bucket; throttled (``503
+    SlowDown``) requests are retried (see
+    :mod:`cloud_browser.cloud.ratelimit`).
+
+    * ``CLOUD_BROWSER_RATE_LIMIT``: Maximum requests per second per bucket
+      and process, defaults to 3500. ``None`` disables rate limiting and
+      retries.
+    * ``CLOUD_BROWSER_RATE_RETRIES``: Retries of a throttled request,
+      defaults to 8.
+    * ``CLOUD_BROWSER_RATE_BACKOFF``: Base backoff in seconds, doubled on
+      every retry (with full jitter), defaults to 0.1.
+
+    **Hedged Requests**: Duplicate slow ``GET`` and ``HEAD`` requests of
+    boto-based datastores, first response wins (see
+    :mod:`cloud_browser.cloud.hedge`).
+
+    * ``CLOUD_BROWSER_HEDGE``: Boolean designating whether or not to hedge
+      requests, defaults to ``False``. (*Env*)
+    * ``CLOUD_BROWSER_HEDGE_PERCENTILE``: Latency percentile (of recent
+      requests of the same type) after which a request is hedged, defaults
+      to 95.
+
+    **Document Cache**: Local disk cache of documents served by the
+    ``document`` view (see :mod:`cloud_browser.cloud.doccache`).
+
+    * ``CLOUD_BROWSER_DOCUMENT_CACHE_DIR``: Cache directory. Unset disables
+      the cache. (*Env*)
+    * ``CLOUD_BROWSER_DOCUMENT_CACHE_SIZE``: Maximum bytes cached in the
+      directory by all processes sharing it, defaults to 1 GB. Least
+      recently used documents are evicted first.
+    * ``CLOUD_BROWSER_DOCUMENT_CACHE_MAX_OBJECT_SIZE``: Larger documents are
+      not cached, defaults to 16 MB.
+
+    **Download Redirects**: The ``document`` view can redirect (302) to a
+    short-lived presigned URL of boto-based datastores instead of proxying
+    the contents.
+
+    * ``CLOUD_BROWSER_DOCUMENT_REDIRECT``: Boolean designating whether or
+      not to redirect downloads, defaults to ``False``. (*Env*)
+    * ``CLOUD_BROWSER_DOCUMENT_REDIRECT_MIN_SIZE``: Only documents of at
+      least this many bytes are redirected, defaults to 0 (all).
+    * ``CLOUD_BROWSER_DOCUMENT_REDIRECT_EXPIRES``: Seconds a presigned URL
+      is valid, defaults to 300.
+
+    **Directory Downloads**: Directories are downloaded as streamed ZIP
+    archives (see :mod:`cloud_browser.zipstream`).
+
+    * ``CLOUD_BROWSER_ZIP_WORKERS``: Number of files read ahead
+      concurrently, defaults to 8.
+    * ``CLOUD_BROWSER_ZIP_PREFETCH_SIZE``: Files up to this many bytes are
+      read ahead, larger files are streamed in chunks, defaults to 1 MB.
+    * ``CLOUD_BROWSER_READ_CHUNK_SIZE``: Chunk size in bytes of streamed
+      reads (directory downloads and documents, on the filesystem, boto and
+      Rackspace datastores), defaults to 1 MB.
+
+    **Ranged Reads**: Large objects of boto-based datastores are
+    downloaded with concurrent ranged ``GET`` requests, reassembled in order.
+
+    * ``CLOUD_BROWSER_RANGED_READ_THRESHOLD``: Objects of at least this many
+      bytes are fetched in ranges, defaults to 64 MB.
+    * ``CLOUD_BROWSER_RANGED_READ_PART_SIZE``: Range size in bytes, defaults
+      to 8 MB.
+    * ``CLOUD_BROWSER_RANGED_READ_WORKERS``: Ranges fetched (and buffered)
+      concurrently, defaults to 4. Use 1 to disable ranged reads.
+
+    **Multipart Uploads**: On AWS, the browser uploads files directly to S3
+    in parts with presigned URLs, uploading several parts at once and
+    retrying failed parts; the server only initiates and completes uploads.
+    The bucket needs a CORS rule allowing ``PUT`` from the site's origin.
+
+    * ``CLOUD_BROWSER_UPLOAD_MULTIPART``: Boolean designating whether or not
+      to use multipart uploads instead of the single ``POST`` form, defaults
+      to ``True``. (*Env*)
+    * ``CLOUD_BROWSER_UPLOAD_PART_SIZE``: Part size in bytes, defaults to
+      16 MB (at least 5 MB; raised as needed to stay within 10,000 parts).
+    * ``CLOUD_BROWSER_UPLOAD_WORKERS``: Parts uploaded concurrently by the
+      browser, defaults to 4.
+    * ``CLOUD_BROWSER_UPLOAD_RETRIES``: Retries of a failed part, defaults
+      to 5.
+    * ``CLOUD_BROWSER_UPLOAD_URL_EXPIRES``: Seconds a presigned part URL is
+      valid, defaults to 3600.
+
     **General**: Other settings.
 
     * ``CLOUD_BROWSER_DEFAULT_LIST_LIMIT``: Default number of objects to
@@ -179,6 +329,10 @@ class Settings(object):
         # Amazon Web Services S3 datastore settings.
         'CLOUD_BROWSER_AWS_ACCOUNT': Setting(from_env=True),
         'CLOUD_BROWSER_AWS_SECRET_KEY': Setting(from_env=True),
+        'CLOUD_BROWSER_AWS_HOST': Setting(from_env=True),
+        'CLOUD_BROWSER_AWS_PORT': Setting(from_env=True),
+        'CLOUD_BROWSER_AWS_IS_SECURE': BoolSetting(from_env=True,
+                                                   default=True),
 
         # Google Storage for Developers datastore settings.
         'CLOUD_BROWSER_GS_ACCOUNT': Setting(from_env=True),
@@ -200,6 +354,76 @@ class Settings(object):
         'CLOUD_BROWSER_CONTAINER_WHITELIST': Setting(),
         'CLOUD_BROWSER_CONTAINER_BLACKLIST': Setting(),
 
+        # Instrumentation.
+        'CLOUD_BROWSER_INSTRUMENTATION': BoolSetting(from_env=True,
+                                                     default=False),
+
+        # Background jobs.
+        'CLOUD_BROWSER_JOB_WORKERS': Setting(default=4),
+        'CLOUD_BROWSER_JOB_TTL': Setting(default=24 * 60 * 60),
+        'CLOUD_BROWSER_JOURNAL_DIR': Setting(from_env=True),
+
+        # Server-side copies.
+        'CLOUD_BROWSER_COPY_MULTIPART_THRESHOLD': Setting(
+            default=256 * 1024 * 1024),
+        'CLOUD_BROWSER_COPY_PART_SIZE': Setting(default=128 * 1024 * 1024),
+        'CLOUD_BROWSER_COPY_WORKERS': Setting(default=8),
+
+        # Bulk operations.
+        'CLOUD_BROWSER_BULK_WORKERS': Setting(default=8),
+
+        # Request coalescing.
+        'CLOUD_BROWSER_SINGLEFLIGHT': BoolSetting(from_env=True,
+                                                  default=True),
+
+        # Existence cache.
+        'CLOUD_BROWSER_EXISTS_CACHE_TTL': Setting(default=5),
+
+        # Metadata index.
+        'CLOUD_BROWSER_INDEX_PATH': Setting(from_env=True),
+
+        # Rate limiting.
+        'CLOUD_BROWSER_RATE_LIMIT': Setting(default=3500),
+        'CLOUD_BROWSER_RATE_RETRIES': Setting(default=8),
+        'CLOUD_BROWSER_RATE_BACKOFF': Setting(default=0.1),
+
+        # Hedged requests.
+        'CLOUD_BROWSER_HEDGE': BoolSetting(from_env=True, default=False),
+        'CLOUD_BROWSER_HEDGE_PERCENTILE': Setting(default=95),
+
+        # Document cache.
+        'CLOUD_BROWSER_DOCUMENT_CACHE_DIR': Setting(from_env=True),
+        'CLOUD_BROWSER_DOCUMENT_CACHE_SIZE': Setting(
+            default=1024 * 1024 * 1024),
+        'CLOUD_BROWSER_DOCUMENT_CACHE_MAX_OBJECT_SIZE': Setting(
+            default=16 * 1024 * 1024),
+
+        # Download redirects.
+        'CLOUD_BROWSER_DOCUMENT_REDIRECT': BoolSetting(from_env=True,
+                                                       default=False),
+        'CLOUD_BROWSER_DOCUMENT_REDIRECT_MIN_SIZE': Setting(default=0),
+        'CLOUD_BROWSER_DOCUMENT_REDIRECT_EXPIRES': Setting(default=5 * 60),
+
+        # Directory downloads.
+        'CLOUD_BROWSER_ZIP_WORKERS': Setting(default=8),
+        'CLOUD_BROWSER_ZIP_PREFETCH_SIZE': Setting(default=1024 * 1024),
+        'CLOUD_BROWSER_READ_CHUNK_SIZE': Setting(default=1024 * 1024),
+
+        # Ranged reads.
+        'CLOUD_BROWSER_RANGED_READ_THRESHOLD': Setting(
+            default=64 * 1024 * 1024),
+        'CLOUD_BROWSER_RANGED_READ_PART_SIZE': Setting(
+            default=8 * 1024 * 1024),
+        'CLOUD_BROWSER_RANGED_READ_WORKERS': Setting(default=4),
+
+        # Multipart uploads.
+        'CLOUD_BROWSER_UPLOAD_MULTIPART': BoolSetting(from_env=True,
+                                                      default=True),
+        'CLOUD_BROWSER_UPLOAD_PART_SIZE': Setting(default=16 * 1024 * 1024),
+        'CLOUD_BROWSER_UPLOAD_WORKERS': Setting(default=4),
+        'CLOUD_BROWSER_UPLOAD_RETRIES': Setting(default=5),
+        'CLOUD_BROWSER_UPLOAD_URL_EXPIRES': Setting(default=60 * 60),
+
         # Browser settings.
         'CLOUD_BROWSER_DEFAULT_LIST_LIMIT': Setting(default=20),
 
@@ -209,32 +433,43 @@ class Settings(object):
 
     def __init__(self):
         """Initializer."""
-        self.__container_whitelist = None
-        self.__container_blacklist = None
+        self.__dict__['_loaded'] = False
 
     def __getattr__(self, name, default=None):
-        """Get setting."""
-        if name in self.SETTINGS:
-            return self.SETTINGS[name].get(name, default)
+        """Get setting.
+
+        Only called for names missing from the snapshot: cloud browser
+        settings before the first load, and real Django settings.
+        """
+        if name in self.SETTINGS and not self._loaded:
+            self.reload()
+            return getattr(self, name)
 
         # Use real Django settings.
         return getattr(_settings, name, default)
 
-    @property
-    def _container_whitelist(self):
-        """Container whitelist."""
-        if self.__container_whitelist is None:
-            self.__container_whitelist = \
-                set(self.CLOUD_BROWSER_CONTAINER_WHITELIST or [])
-        return self.__container_whitelist
+    def __setattr__(self, name, value):
+        """Settings are read-only."""
+        raise AttributeError("Cloud browser settings are read-only: %s" %
+                             name)
 
-    @property
-    def _container_blacklist(self):
-        """Container blacklist."""
-        if self.__container_blacklist is None:
-            self.__container_blacklist = \
-                set(self.CLOUD_BROWSER_CONTAINER_BLACKLIST or [])
-        return self.__container_blacklist
+    def reload(self):
+        """Resolve and validate all cloud browser settings into a snapshot.
+
+        Settings are read from the snapshot as plain attributes afterwards.
+        The snapshot is taken on first access; call this to pick up later
+        changes, e.g., of environment variables. The test suite retakes it
+        whenever a test overrides Django settings (``override_settings``).
+        """
+        values = dict((name, setting.get(name))
+                      for name, setting in self.SETTINGS.items())
+        values.update(
+            _container_whitelist=set(
+                values['CLOUD_BROWSER_CONTAINER_WHITELIST'] or []),
+            _container_blacklist=set(
+                values['CLOUD_BROWSER_CONTAINER_BLACKLIST'] or []),
+            _loaded=True)
+        self.__dict__.update(values)
 
     def container_permitted(self, name):
         """Return whether or not a container is permitted.
@@ -13,6 +13,7 @@ import hmac
 import json
 
 from cloud_browser.cloud import boto_base as base
+from cloud_browser.cloud import ratelimit
 from cloud_browser.common import requires
 
 
@@ -59,11 +60,37 @@ class AwsConnection(base.BotoConnection):
     #: Container child class.
     cont_cls = AwsContainer
 
+    def __init__(self, account, secret_key, host=None, port=None,
+                 is_secure=True):
+        """Initializer.
+
+        :param host: Alternative S3-compatible endpoint host (e.g., a local
+            stand-in server), or ``None`` for Amazon S3.
+        :param port: Endpoint port, or ``None`` for the default port.
+        :param is_secure: Use HTTPS?
+        """
+        super(AwsConnection, self).__init__(account, secret_key)
+        self.host = host
+        self.port = port
+        self.is_secure = is_secure
+
     @base.BotoConnection.wrap_boto_errors
     @requires(boto, 'boto')
     def _get_connection(self):
         """Return native connection object."""
-        return boto.connect_s3(self.account, self.secret_key)
+        if self.host is None:
+            conn = boto.connect_s3(self.account, self.secret_key,
+                                   is_secure=self.is_secure)
+        else:
+            # Alternative endpoints get path-style bucket addressing.
+            from boto.s3.connection import OrdinaryCallingFormat
+            conn = boto.connect_s3(self.account, self.secret_key,
+                                   host=self.host,
+                                   port=self.port,
+                                   is_secure=self.is_secure,
+                                   calling_format=OrdinaryCallingFormat())
+
+        return ratelimit.limit_connection(conn)
 
     @staticmethod
     def _get_policy(container_name, key_prefix,
@@ -1,18 +1,70 @@
 """Cloud datastore API base abstraction."""
 import mimetypes
 
-from cloud_browser.cloud import errors
+from cloud_browser.cloud import errors, existence, index, instrument, \
+    singleflight
+from cloud_browser.cloud.concurrency import map_threaded
 from cloud_browser.app_settings import settings
 from cloud_browser.common import SEP, \
     path_join, basename
 
 
+#: Objects listed per page when walking directories.
+WALK_PAGE_SIZE = 1000
+
+#: Listing sort keys (see :meth:`CloudContainer.get_sorted_objects`).
+SORT_KEYS = ('name', 'size', 'last_modified')
+
+
+def sort_value(obj, sort_key):
+    """Return value of object for sort key.
+
+    Values are JSON-serializable (for page tokens) and sort like the
+    metadata index columns: sizes as numbers, dates as ISO strings (empty
+    if unknown). Dates are taken as listed (see
+    :attr:`CloudObject.listed_last_modified`).
+    """
+    if sort_key == 'size':
+        return obj.size or 0
+    elif sort_key == 'last_modified':
+        last_modified = obj.listed_last_modified
+        return last_modified.isoformat(" ") if last_modified else ''
+    return obj.name
+
+
 class CloudObjectTypes(object):
     """Cloud object types helper."""
     FILE = 'file'
     SUBDIR = 'subdirectory'
 
 
+class Progress(object):
+    """Progress reporter for multi-object operations.
+
+    Calls an optional ``callback(done, total, size)`` after every processed
+    object with the number of objects done, the total number of objects and
+    the number of bytes processed so far.
+    """
+
+    def __init__(self, callback=None, total=0, done=0, size=0):
+        """Initializer.
+
+        :param done: Objects already done (e.g., when resuming).
+        :param size: Bytes already processed.
+        """
+        self.callback = callback
+        self.total = total
+        self.done = done
+        self.size = size
+
+    def step(self, size=0):
+        """Record a processed object of ``size`` bytes."""
+        self.done += 1
+        self.size += size or 0
+        if self.callback is not None:
+            self.callback(self.done, self.total, self.size)
+
+
 class CloudObject(object):
     """Cloud object wrapper."""
     type_cls = CloudObjectTypes
@@ -26,7 +78,9 @@ class CloudObject(object):
         :kwarg content_type: Document 'content-type'.
         :kwarg content_encoding: Document 'content-encoding'.
         :kwarg last_modified: Last modified date.
+        :kwarg etag: Entity tag (version) of object contents, if known.
         :kwarg obj_type: Type of object (e.g., file or subdirectory).
+        :kwarg modified_by: User of the last change, if known.
         """
         self.container = container
         self.name = name.rstrip(SEP)
@@ -34,15 +88,17 @@ class CloudObject(object):
         self.content_type = kwargs.get('content_type', '')
         self.content_encoding = kwargs.get('content_encoding', '')
         self.last_modified = kwargs.get('last_modified', None)
+        self.etag = kwargs.get('etag', None)
         self.type = kwargs.get('obj_type', self.type_cls.FILE)
-        self.modified_by = None
+        self.modified_by = kwargs.get('modified_by', None)
         self.__native = None
 
     @property
     def native_obj(self):
         """Native storage object."""
         if self.__native is None:
-            self.__native = self._get_object()
+            self.__native = instrument.wrap_native(self._get_object(),
+                                                   'object')
 
         return self.__native
 
@@ -50,6 +106,12 @@ class CloudObject(object):
         """Return native storage object."""
         raise NotImplementedError
 
+    @property
+    def listed_last_modified(self):
+        """Last modified date as listed, without further lookups (e.g.,
+        for sorting whole directory listings)."""
+        return self.last_modified
+
     @property
     def is_subdir(self):
         """Is a subdirectory?"""
@@ -95,6 +157,24 @@ class CloudObject(object):
         """Return contents of object."""
         return self._read()
 
+    def read_iter(self, chunk_size=None):
+        """Yield contents of object in chunks.
+
+        The default implementation reads the whole object as one chunk.
+
+        :param chunk_size: Chunk size in bytes, defaults to
+            ``CLOUD_BROWSER_READ_CHUNK_SIZE``.
+        """
+        yield self.read()
+
+    def get_download_url(self, expires):
+        """Return short-lived URL downloading object directly from the
+        datastore, or ``None`` if not supported.
+
+        :param expires: Seconds the URL is valid.
+        """
+        return None
+
     def _read(self):
         """Return contents of object."""
         raise NotImplementedError
@@ -120,7 +200,8 @@ class CloudContainer(object):
     def native_container(self):
         """Native container object."""
         if self.__native is None:
-            self.__native = self._get_container()
+            self.__native = instrument.wrap_native(self._get_container(),
+                                                   'container')
 
         return self.__native
 
@@ -135,19 +216,191 @@ class CloudContainer(object):
         """Return native container object."""
         raise NotImplementedError
 
+    @singleflight.coalesced
+    @index.served
     def get_objects(self, path, marker=None,
                     limit=settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT):
-        """Get objects."""
+        """Get up to ``limit`` objects of directory ``path`` after
+        ``marker``.
+
+        Listing pages (see :meth:`_get_page`) are pulled lazily through the
+        filter stages of :meth:`listing_stages` until ``limit`` objects come
+        out or the listing is exhausted, so entries filtered out never leave
+        a page short.
+        """
+        from itertools import islice
+
+        # Ask for one more than needed, as the marker is commonly listed
+        # again (e.g., subdirectory "foo/" after marker "foo").
+        return list(islice(self._listing(path, marker, limit + 1), limit))
+
+    @index.served
+    def get_sorted_objects(self, path, sort_key, descending=False,
+                           after=None,
+                           limit=settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT):
+        """Get up to ``limit`` objects of directory ``path`` ordered by
+        ``sort_key`` (one of :data:`SORT_KEYS`), then by name.
+
+        Pages are addressed by keyset: ``after`` is the ``(sort value, name)``
+        pair (see :func:`sort_value`) of the last object of the previous
+        page, so pages stay stable while objects are added or removed.
+
+        Indexed containers are sorted by the index. Otherwise, the whole
+        directory listing is streamed through a bounded top-``limit``
+        selection, so memory stays proportional to ``limit``, while every
+        page costs a full listing of the directory. Objects are sorted by
+        listed values only, e.g., subdirectories of boto datastores sort
+        as undated.
+        """
+        import heapq
+
+        key = lambda obj: (sort_value(obj, sort_key), obj.name)
+        objs = self._listing(path, None, WALK_PAGE_SIZE)
+        if after is not None:
+            after = tuple(after)
+            if descending:
+                objs = (obj for obj in objs if key(obj) < after)
+            else:
+                objs = (obj for obj in objs if key(obj) > after)
+
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(limit, objs, key=key)
+
+    def _listing(self, path, marker, page_size):
+        """Return iterator of the (filtered) listing of directory ``path``
+        after ``marker``, fetched lazily in pages of ``page_size``.
+        """
+        objs = self._iter_pages(path, marker, page_size)
+        for stage in self.listing_stages():
+            objs = stage(objs, path, marker)
+        return objs
+
+    def _iter_pages(self, path, marker, page_size):
+        """Yield objects of listing pages, fetched lazily."""
+        if self.max_list is not None:
+            page_size = min(page_size, self.max_list)
+
+        while True:
+            objs, marker = self._get_page(path, marker, page_size)
+            for obj in objs:
+                yield obj
+            if marker is None:
+                break
+
+    def _get_page(self, path, marker, limit):
+        """Return a page of the (unfiltered) listing of directory ``path``.
+
+        :param marker: Native name to list after, ``None`` from the start.
+        :param limit: Maximum number of objects.
+        :return: ``(objects, next_marker)`` tuple, ``next_marker`` is the
+            native marker of the next page, or ``None`` if the listing is
+            exhausted.
+        """
         raise NotImplementedError
 
+    def listing_stages(self):
+        """Return filter stages of directory listings.
+
+        A stage is called with ``(objects, path, marker)`` and returns an
+        iterator of the objects to keep. Stages must consume their input
+        lazily; subclasses extend the list with backend specific filters.
+        """
+        return [self._skip_marker]
+
+    @staticmethod
+    def _skip_marker(objs, path, marker):  # pylint: disable=unused-argument
+        """Skip objects listed again under the marker name."""
+        marker = marker.rstrip(SEP) if marker else None
+        for obj in objs:
+            if obj.name != marker:
+                yield obj
+
     def get_object(self, path):
         """Get single object."""
         raise NotImplementedError
 
     def has_directory(self, path):
-        """Check directory path exists or not."""
+        """Check directory path exists or not.
+
+        :raises: :class:`NoObjectException` if nothing exists under ``path``.
+        """
+        if not self.path_exists(path):
+            raise errors.NoObjectException
+
+        return True
+
+    def path_exists(self, path, cached=True):
+        """Return ``True`` if an object exists at or under ``path``.
+
+        :param cached: Answer from the existence cache if possible.
+        :rtype: ``bool``
+        """
+        return self.paths_exist([path], cached)[0]
+
+    def paths_exist(self, paths, cached=True):
+        """Return existence of objects at or under each of ``paths``.
+
+        Results come from the existence cache of the connection (see
+        :mod:`cloud_browser.cloud.existence`) where possible; the other
+        paths are probed concurrently.
+
+        :param cached: Answer from the existence cache if possible. Checks
+            guarding against overwrites should pass ``False``, as the cache
+            does not see changes made by other processes: all paths are
+            then probed, and the cache refreshed.
+        :rtype: ``list`` of ``bool``, in order of ``paths``
+        """
+        cache = self.conn.existence
+        found = dict((path, cache.get(self.name, path) if cached else None)
+                     for path in paths)
+        missing = sorted(path for path, exists in found.items()
+                         if exists is None)
+
+        probed = map_threaded(self._probe, missing,
+                              settings.CLOUD_BROWSER_BULK_WORKERS)
+        for path, exists in zip(missing, probed):
+            cache.set(self.name, path, exists)
+            found[path] = exists
+
+        return [found[path] for path in paths]
+
+    def _probe(self, path):
+        """Return ``True`` if an object exists at or under ``path``.
+
+        Backends should fetch as little as possible (e.g., at most one key).
+        """
         raise NotImplementedError
 
+    def walk_objects(self, path):
+        """Yield file and subdirectory objects under directory ``path``
+        recursively (each subdirectory before its contents).
+
+        Listing pages are fetched lazily, so the first objects are yielded
+        before the whole directory is listed.
+        """
+        dir_name = path.rstrip(SEP)
+        limit = min(WALK_PAGE_SIZE, self.max_list or WALK_PAGE_SIZE)
+        marker = None
+        while True:
+            objs = self.get_objects(path, marker, limit)
+            for obj in objs:
+                if obj.name == dir_name:
+                    continue
+                yield obj
+                if obj.is_subdir:
+                    for sub_obj in self.walk_objects(obj.name + SEP):
+                        yield sub_obj
+
+            if len(objs) < limit:
+                break
+            marker = objs[-1].name
+
+    def walk_files(self, path):
+        """Yield file objects under directory ``path`` recursively."""
+        for obj in self.walk_objects(path):
+            if not obj.is_subdir:
+                yield obj
+
     def get_directories_paths(self):
         """Get all the directories in the given container.
 
@@ -161,6 +414,8 @@ class CloudContainer(object):
         Amazon S3. This method can also be used to filter the objects depending
         on the user-defined requirements.
 
+        Directory listings are filtered by :meth:`listing_stages` already.
+
         :return: A list of instances of actual objects, inheritaed from
             abstract class CloudObject.
         """
@@ -182,32 +437,84 @@ class CloudContainer(object):
         """
         raise NotImplementedError
 
-    def delete(self, src_path, is_file):
+    def delete(self, src_path, is_file, progress=None):
         """If src_path is a file, delete it. If it's a directory, delete all
         paths under it and itself.
 
+        :param progress: Optional ``callback(done, total, size)`` (see
+            :class:`Progress`).
+
         :raises: :class:`StorageResponseException`
         :raises: :class:`ClientException`
         """
         raise NotImplementedError
 
-    def rename(self, parent_dir_path, src_path, new_basename, is_file):
+    def rename(self, parent_dir_path, src_path, new_basename, is_file,
+               progress=None):
         """If src_path is a file, rename it. If it's a directory, rename all
         paths under it and itself.
 
+        :param progress: Optional ``callback(done, total, size)`` (see
+            :class:`Progress`).
+
         :raises: :class:`StorageResponseException`
         :raises: :class:`ClientException`
         """
         raise NotImplementedError
 
-    def move(self, src_file_path, target_dir_path):
+    def move(self, src_file_path, target_dir_path, progress=None):
         """Move the file to the target directory.
 
+        :param progress: Optional ``callback(done, total, size)`` (see
+            :class:`Progress`).
+
         :raises: :class:`StorageResponseException`
         :raises: :class:`ClientException`
         """
         raise NotImplementedError
 
+    def _for_each(self, operation, paths):
+        """Run ``operation(path)`` for every path with bounded concurrency.
+
+        :return: List of ``(path, error)`` tuples in order of ``paths``, with
+            an error message for failed paths or ``None``.
+        """
+        def run(path):
+            """Run operation and return result tuple."""
+            try:
+                operation(path)
+            except errors.CloudException as error:
+                return path, unicode(error) or type(error).__name__
+            return path, None
+
+        return map_threaded(run, paths, settings.CLOUD_BROWSER_BULK_WORKERS)
+
+    def delete_files(self, paths):
+        """Delete files.
+
+        Datastores with a batch delete call should override this.
+
+        :param paths: List of file paths.
+
+        :return: List of ``(path, error)`` tuples in order of ``paths``, with
+            an error message for failed paths or ``None``.
+        :raises: :class:`StorageResponseException`
+        :raises: :class:`ClientException`
+        """
+        return self._for_each(lambda path: self.delete(path, True), paths)
+
+    def move_files(self, paths, target_dir_path):
+        """Move files to the target directory.
+
+        :param paths: List of file paths.
+        :param target_dir_path: A string.
+
+        :return: List of ``(path, error)`` tuples in order of ``paths``, with
+            an error message for failed paths or ``None``.
+        """
+        return self._for_each(lambda path: self.move(path, target_dir_path),
+                              paths)
+
 
 class CloudConnection(object):
     """Cloud connection wrapper."""
@@ -221,13 +528,15 @@ class CloudConnection(object):
         """Initializer."""
         self.account = account
         self.secret_key = secret_key
+        self.existence = existence.ExistenceCache()
         self.__native = None
 
     @property
     def native_conn(self):
         """Native connection object."""
         if self.__native is None:
-            self.__native = self._get_connection()
+            self.__native = instrument.wrap_native(self._get_connection(),
+                                                   'conn')
 
         return self.__native
 
@@ -235,10 +544,13 @@ class CloudConnection(object):
         """Return native connection object."""
         raise NotImplementedError
 
+    @singleflight.coalesced
     def get_containers(self):
         """Return available containers."""
         permitted = lambda c: settings.container_permitted(c.name)
-        return [c for c in self._get_containers() if permitted(c)]
+        containers = [c for c in self._get_containers() if permitted(c)]
+        index.fill_stats(containers)
+        return containers
 
     def _get_containers(self):
         """Return available containers."""
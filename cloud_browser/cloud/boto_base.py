@@ -9,8 +9,15 @@ for Developers. This abstract base class gets most of the common work done.
 
 .. _boto: http://code.google.com/p/boto/
 """
+import threading
+
+from functools import partial
+
 from cloud_browser.app_settings import settings
-from cloud_browser.cloud import errors, base
+from cloud_browser.cloud import errors, base, existence, hedge, index, \
+    singleflight
+from cloud_browser.cloud.concurrency import imap_ahead, map_threaded
+from cloud_browser.cloud.journal import Journal
 from cloud_browser.common import ROOT, SEP, requires, dt_from_header
 
 
@@ -22,6 +29,71 @@ try:
 except ImportError:
     boto = None  # pylint: disable=C0103
 
+#: Maximum number of parts of a multipart upload.
+MULTIPART_MAX_PARTS = 10000
+
+#: Maximum number of keys of a listing request.
+LIST_MAX_KEYS = 1000
+
+#: Maximum number of keys of a multi-object delete request.
+MULTI_DELETE_MAX_KEYS = 1000
+
+
+def _complete_upload_xml(parts):
+    """Return body of a complete multipart upload request.
+
+    :param parts: Iterable of ``(part number, etag)`` tuples.
+    """
+    from xml.sax.saxutils import escape
+
+    return "<CompleteMultipartUpload>%s</CompleteMultipartUpload>" % "".join(
+        "<Part><PartNumber>%d</PartNumber><ETag>%s</ETag></Part>" %
+        (number, escape(etag)) for number, etag in parts)
+
+
+def _presigned_url(native_conn, expires, method, bucket, key, subresources):
+    """Return query string authenticated URL of ``key`` with subresources.
+
+    ``generate_url`` has no notion of subresources (e.g., ``partNumber`` and
+    ``uploadId`` of a multipart upload part), so for signature version 2 the
+    string to sign and the query are built here. Signature version 4 signs
+    every query parameter.
+
+    :param subresources: Dictionary of subresource names and values.
+    """
+    import time
+    import urllib
+    from boto.utils import canonical_string
+
+    # pylint: disable=protected-access
+    if native_conn._auth_handler.capability[0] == 'hmac-v4-s3':
+        return native_conn.generate_url_sigv4(
+            expires, method, bucket=bucket, key=key,
+            response_headers=subresources)
+
+    expires = int(time.time() + expires)
+    headers = {}
+    if native_conn.provider.security_token:
+        headers['x-amz-security-token'] = native_conn.provider.security_token
+
+    query = '&'.join("%s=%s" % (name, urllib.quote(value, safe=''))
+                     for name, value in sorted(subresources.items()))
+    auth_path = native_conn.get_path(
+        native_conn.calling_format.build_auth_path(bucket, key))
+    signature = native_conn._auth_handler.sign_string(canonical_string(
+        method, auth_path + '?' + query, headers, expires,
+        native_conn.provider))
+
+    params = [query, native_conn.QueryString % (
+        urllib.quote(signature, safe=''), expires,
+        native_conn.aws_access_key_id)]
+    params.extend("%s=%s" % (name, urllib.quote(value, safe=''))
+                  for name, value in headers.items())
+    return native_conn.calling_format.build_url_base(
+        native_conn, native_conn.protocol,
+        native_conn.server_name(native_conn.port), bucket, key) + \
+        '?' + '&'.join(params)
+
 
 ###############################################################################
 # Classes
@@ -85,6 +157,81 @@ class BotoObject(base.CloudObject):
     #: Exception translations.
     wrap_boto_errors = BotoKeyWrapper()
 
+    def __init__(self, container, name, **kwargs):
+        """Initializer.
+
+        :kwarg modified_by: User of the last change. Looked up on first
+            access (see :attr:`modified_by`) unless given.
+        """
+        self._metadata_lock = threading.Lock()
+        self._metadata_pending = 'modified_by' not in kwargs
+        super(BotoObject, self).__init__(container, name, **kwargs)
+
+    @property
+    def modified_by(self):
+        """User of the last change (``modified-by`` metadata).
+
+        Listings carry no user-defined metadata, so it is read with a
+        ``HEAD`` of the key (of the directory key for subdirectories) on
+        first access, i.e., only for the objects actually displayed.
+        """
+        self._load_metadata()
+        return self._modified_by
+
+    @modified_by.setter
+    def modified_by(self, value):
+        """Set user of the last change."""
+        self._modified_by = value
+
+    @property
+    def last_modified(self):
+        """Last modified date.
+
+        Listed subdirectories take the date of their directory key, looked
+        up along with :attr:`modified_by`.
+        """
+        if self._last_modified is None and self.is_subdir:
+            self._load_metadata()
+        return self._last_modified
+
+    @last_modified.setter
+    def last_modified(self, value):
+        """Set last modified date."""
+        self._last_modified = value
+
+    @property
+    def listed_last_modified(self):
+        """Last modified date as listed (unknown for subdirectories)."""
+        return self._last_modified
+
+    def _load_metadata(self):
+        """Look up metadata of the key once (thread-safe, as listings are
+        shared by coalesced requests). Failed lookups leave it unknown.
+        """
+        if not self._metadata_pending:
+            return
+
+        from boto.exception import BotoClientError, BotoServerError
+
+        with self._metadata_lock:
+            if not self._metadata_pending:
+                return
+            name = self.name + SEP if self.is_subdir else self.name
+            try:
+                key = hedge.call('head', partial(
+                    self.container.native_container.get_key, name))
+            except (BotoClientError, BotoServerError):
+                key = None
+            self._set_metadata(key)
+
+    def _set_metadata(self, key):
+        """Set metadata from looked up key (``None`` if missing)."""
+        if key is not None:
+            if self.is_subdir and key.last_modified:
+                self._last_modified = dt_from_header(key.last_modified)
+            self._modified_by = key.metadata.get('modified-by', 'unknown')
+        self._metadata_pending = False
+
     @classmethod
     def is_key(cls, result):
         """Return ``True`` if result is a key object."""
@@ -98,12 +245,94 @@ class BotoObject(base.CloudObject):
     @wrap_boto_errors
     def _get_object(self):
         """Return native storage object."""
-        return self.container.native_container.get_key(self.name)
+        return hedge.call('head', partial(
+            self.container.native_container.get_key, self.name))
+
+    def _open_key(self):
+        """Return native key with the response of a (hedged) ``GET``
+        started."""
+        def open_key():
+            """Return key with response of ``GET`` request started."""
+            key = self.container.native_container.new_key(self.name)
+            key.open_read()
+            return key
+
+        return hedge.call('get', open_key,
+                          discard=lambda key: key.close(fast=True))
 
     @wrap_boto_errors
     def _read(self):
         """Return contents of object."""
-        return self.native_obj.read()
+        key = self._open_key()
+        try:
+            return key.read()
+        finally:
+            key.close()
+
+    def read_iter(self, chunk_size=None):
+        """Return iterator of contents of object in chunks.
+
+        Objects of at least ``CLOUD_BROWSER_RANGED_READ_THRESHOLD`` bytes are
+        fetched with concurrent ranged ``GET`` requests.
+        """
+        chunk_size = chunk_size or settings.CLOUD_BROWSER_READ_CHUNK_SIZE
+        if settings.CLOUD_BROWSER_RANGED_READ_WORKERS > 1 and \
+                self.size >= settings.CLOUD_BROWSER_RANGED_READ_THRESHOLD:
+            return self._read_ranges(chunk_size)
+        return self._read_stream(chunk_size)
+
+    def _read_stream(self, chunk_size):
+        """Yield contents of a single ``GET`` in chunks."""
+        key = self._open_key()
+        try:
+            for chunk in iter(lambda: key.read(chunk_size), ''):
+                yield chunk
+        finally:
+            key.close(fast=True)
+
+    @boto_server_client_error_wrapper
+    def _read_range(self, byte_range):
+        """Return contents of inclusive ``(start, end)`` byte range."""
+        headers = {'Range': "bytes=%d-%d" % byte_range}
+        if self.etag:
+            # Fail rather than mix parts of different versions.
+            headers['If-Match'] = '"%s"' % self.etag
+
+        key = self.container.native_container.new_key(self.name)
+        return key.get_contents_as_string(headers=headers)
+
+    def _read_ranges(self, chunk_size):
+        """Yield contents of concurrent ranged ``GET`` requests in order.
+
+        At most ``CLOUD_BROWSER_RANGED_READ_WORKERS`` parts are fetched or
+        buffered ahead of the part being yielded.
+        """
+        part_size = settings.CLOUD_BROWSER_RANGED_READ_PART_SIZE
+        ranges = ((start, min(start + part_size, self.size) - 1)
+                  for start in xrange(0, self.size, part_size))
+        parts = imap_ahead(self._read_range, ranges,
+                           settings.CLOUD_BROWSER_RANGED_READ_WORKERS)
+        for part in parts:
+            for start in xrange(0, len(part), chunk_size):
+                yield part[start:start + chunk_size]
+
+    def get_download_url(self, expires):
+        """Return presigned (query string authenticated) ``GET`` URL.
+
+        The URL overrides the response content type and encoding with the
+        smart values served by the ``document`` view.
+        """
+        response_headers = {}
+        if self.smart_content_type:
+            response_headers['response-content-type'] = \
+                self.smart_content_type
+        if self.smart_content_encoding:
+            response_headers['response-content-encoding'] = \
+                self.smart_content_encoding
+
+        return self.container.conn.native_conn.generate_url(
+            expires, 'GET', bucket=self.container.name, key=self.name,
+            response_headers=response_headers or None)
 
     @classmethod
     def from_result(cls, container, result):
@@ -139,6 +368,11 @@ class BotoObject(base.CloudObject):
         last_modified = dt_from_header(key.last_modified) \
             if key.last_modified else None
 
+        # Keys of a HEAD request carry their user-defined metadata already.
+        kwargs = {}
+        if key.metadata:
+            kwargs['modified_by'] = key.metadata.get('modified-by', 'unknown')
+
         # Get Key   (1123): Tue, 13 Apr 2010 14:02:48 GMT
         # List Keys (8601): 2010-04-13T14:02:48.000Z
         return cls(container,
@@ -147,7 +381,9 @@ class BotoObject(base.CloudObject):
                    content_type=key.content_type,
                    content_encoding=key.content_encoding,
                    last_modified=last_modified,
-                   obj_type=cls.type_cls.FILE)
+                   etag=(key.etag or '').strip('"') or None,
+                   obj_type=cls.type_cls.FILE,
+                   **kwargs)
 
 
 class BotoContainer(base.CloudContainer):
@@ -165,6 +401,9 @@ class BotoContainer(base.CloudContainer):
     #: practical reasons, we'll limit it to the same as Rackspace.
     max_list = 10000
 
+    #: Copy large keys part by part (``UploadPartCopy``) if supported.
+    multipart_copy = True
+
     def get_safe_special_characters(self):
         """Object name safe characters.
 
@@ -179,47 +418,67 @@ class BotoContainer(base.CloudContainer):
         return self.conn.native_conn.get_bucket(self.name)
 
     @boto_server_client_error_wrapper
-    def get_objects(self, path, marker=None,
-                    limit=settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT):
-        """Get objects."""
-        from itertools import islice
-
+    def _get_page(self, path, marker, limit):
+        """Return a page of keys and prefixes."""
         path = path.rstrip(SEP) + SEP if path else path
 
-        result_set = self.native_container.list(path, SEP, marker)
-        # Get +1 results because marker and first item can match as we strip
-        # the separator from results obscuring things. No real problem here
-        # because boto masks any real request limits.
-        results = list(islice(result_set, limit+1))
-        if results:
-            if marker and results[0].name.rstrip(SEP) == marker.rstrip(SEP):
-                results = results[1:]
-            else:
-                results = results[:limit]
-
-        return [self.obj_cls.from_result(self, r) for r in results]
-
+        kwargs = {'marker': marker} if marker else {}
+        results = self.native_container.get_all_keys(
+            prefix=path, delimiter=SEP, max_keys=min(limit, LIST_MAX_KEYS),
+            **kwargs)
+
+        next_marker = None
+        if results.is_truncated and len(results):
+            next_marker = results.next_marker or results[-1].name
+
+        return [self.obj_cls.from_result(self, r) for r in results], \
+            next_marker
+
+    def listing_stages(self):
+        """Return filter stages of directory listings."""
+        return super(BotoContainer, self).listing_stages() + \
+            [self._skip_directory_key]
+
+    @staticmethod
+    def _skip_directory_key(objs, path, marker):
+        """Skip the key mocking the listed directory itself (e.g., key
+        ``foo/`` when listing ``foo``)."""
+        # pylint: disable=unused-argument
+        dir_name = path.rstrip(SEP)
+        for obj in objs:
+            if not (dir_name and obj.is_file and obj.name == dir_name):
+                yield obj
+
+    @singleflight.coalesced
     @wrap_boto_errors
     def get_object(self, path):
         """Get single object."""
-        key = self.native_container.get_key(path)
+        key = hedge.call('head', partial(self.native_container.get_key,
+                                         path))
         return self.obj_cls.from_key(self, key)
 
-    def has_directory(self, path):
-        """Check the directory exists or not.
-
-        This method checks if there are keys whose name start with "path". If
-        None, raise exception.
+    def walk_files(self, path):
+        """Yield file objects under directory ``path`` recursively.
 
-        :param path: A string.
+        Uses a flat (undelimited) listing of the prefix, which boto pages
+        lazily.
         """
-        results = self.native_container.get_all_keys(prefix=path)
-        if len(results)==0:
-            raise errors.NoObjectException
+        path = path.rstrip(SEP) + SEP if path else path
+        for key in self.native_container.list(path):
+            if not key.name.endswith(SEP):
+                yield self.obj_cls.from_key(self, key)
 
-        return True
+    @boto_server_client_error_wrapper
+    def _probe(self, path):
+        """Return ``True`` if there are keys whose name start with ``path``.
+
+        Lists at most one key.
+        """
+        return len(self.native_container.get_all_keys(prefix=path,
+                                                      max_keys=1)) > 0
 
     @boto_server_client_error_wrapper
+    @index.served
     def get_directories_paths(self):
         """Get all the directories paths in the given container.
 
@@ -262,7 +521,7 @@ class BotoContainer(base.CloudContainer):
             if len(current_keys) == 0:
                 return keys
 
-            has_more = len(current_keys) == 1000
+            has_more = len(current_keys) == LIST_MAX_KEYS
             marker = current_keys[-1].name
             keys += current_keys
 
@@ -270,51 +529,27 @@ class BotoContainer(base.CloudContainer):
 
     @boto_server_client_error_wrapper
     def filter_objects(self, objects):
-        """Remove NoneType key objects from the objects list, which should be
-        regarded as the parent directory. Set the user-defined the metadata.
-
-        Django-cloud-browser wraps boto object with AwsObject. There are two
-        types boto objects, Key and Prefix. Key object is regarded as a file
-        and Prefix object is regarded as directory. Like AWS S3 console, we use
-        a key (whose name ends with "/") to mock a directory so that we can
-        have a hierarchical file system. The goal of this function is to remove
-        the mock-directory key objects and set the properties of the Prefix
-        objects from their corresponding Key objects, so that the browser can
-        display a correct hierachical file system.
+        """Remove file objects without key (e.g., the key mocking the
+        parent directory) and set the user-defined metadata right away.
+
+        Listings skip the directory key themselves and objects look up their
+        metadata on first access (see :class:`BotoObject`), so this is only
+        needed for objects from elsewhere.
 
         :param objects: A list of AwsObject objects.
 
         :return: A list of AwsObjects objects.
         :rtype: :class:`cloud_browser.cloud.aws.AwsObject`
         """
-        object_to_be_removed = []
-        index = 0
-
+        kept = []
         for obj in objects:
-            # Set metatdata last_modified for is_subdir object which has
-            # corresponding real key stored in S3.
-            key = None
-            if obj.is_subdir:
-                key = self.native_container.get_key("{}/".format(obj.name))
-                if key:
-                    # is_subdir object does not have last_modified metadata
-                    # when initilized, use the metadata from coressponding boto
-                    # key here.
-                    obj.last_modified = dt_from_header(key.last_modified) \
-                        if key.last_modified else None
-            else:
-                key = self.native_container.get_key(obj.name)
-                # Remove directory key.
-                if key is None:
-                    object_to_be_removed.append(index)
-            # Retreive 'modified-by' for is_file and is_subdir objects.
-            if key:
-                obj.modified_by = key.metadata.get('modified-by', 'unknown')
+            name = "{}/".format(obj.name) if obj.is_subdir else obj.name
+            key = self.native_container.get_key(name)
+            obj._set_metadata(key)  # pylint: disable=protected-access
+            if key is not None or obj.is_subdir:
+                kept.append(obj)
 
-            index += 1
-
-        return [objects[i] for i in range(0, len(objects))
-                if i not in object_to_be_removed]
+        return kept
 
     def is_safe_basename(self, base_name):
         """Verify that the base_name string path contains only safe
@@ -335,6 +570,7 @@ class BotoContainer(base.CloudContainer):
 
         return False
 
+    @existence.invalidates
     @boto_server_client_error_wrapper
     def mkdir(self, dir_path, username=None):
         """Create a new subdirectory under dir_path and set user-defined
@@ -346,9 +582,7 @@ class BotoContainer(base.CloudContainer):
 
         :rtype: :class:`cloud_browser.cloud.aws.AwsObject`
         """
-        from boto.s3.key import Key
-
-        key = Key(self.native_container, dir_path)
+        key = self.native_container.new_key(dir_path)
         if username:
             key.set_metadata('modified-by', username)
         key.set_contents_from_string('It is a directory.')
@@ -356,49 +590,138 @@ class BotoContainer(base.CloudContainer):
 
         return self.obj_cls.from_key(self, key)
 
-    def _delete_directory(self, dir_src_path):
+    def _delete_directory(self, dir_src_path, progress=None):
         """Delete the directory and all of the files and subdirectories under
         it.
 
         :param subdir_src_path: A string ends with "/".
+        :param progress: Optional progress callback.
 
         :rtype: :class:`cloud_browser.cloud.aws.AwsObject`
         """
+        # Deleted keys are gone, so an interrupted run only leaves the
+        # remaining keys to list. The journal carries over its progress.
+        journal = Journal.open(self, 'delete', dir_src_path)
         keys = self._get_key_objects(dir_src_path)
-        # Delete all the files and sub-dirs
-        # pylint: disable=expression-not-assigned
-        [key.delete() for key in keys if key]
+        tracker = base.Progress(progress, journal.done + len(keys),
+                                journal.done, journal.size)
+        # Delete all the files and sub-dirs in batches (see delete_files),
+        # checkpointing once per batch.
+        for start in range(0, len(keys), MULTI_DELETE_MAX_KEYS):
+            batch = keys[start:start + MULTI_DELETE_MAX_KEYS]
+            failed = [(path, error) for path, error in
+                      self.delete_files([key.name for key in batch])
+                      if error is not None]
+            if failed:
+                raise errors.StorageResponseException(
+                    "Unable to delete {}: {}".format(*failed[0]))
+            for key in batch:
+                tracker.step(key.size)
+            journal.checkpoint(tracker.done, tracker.size)
         # Delete the directory itself if all of the files and sub-dirs are
         # successfully deleted
         key = self.native_container.get_key(dir_src_path)
+        journal.complete()
         if key:
             return self.obj_cls.from_key(self, key.delete())
         else:
             raise errors.NoObjectException(
                 "{} does not exist".format(dir_src_path))
 
+    @existence.invalidates
     @boto_server_client_error_wrapper
-    def delete(self, src_path, is_file):
+    def delete(self, src_path, is_file, progress=None):
         """If src_path is a file, delete it. If it's a directory, delete all
         paths under it and itself.
 
         :param src_path: A string.
         :param is_file: A boolean indicating the target AwsObject is a file
             or not.
+        :param progress: Optional ``callback(done, total, size)``.
 
         :rtype: :class:`cloud_browser.cloud.aws.AwsObject`
         """
         if is_file:
             key = self.native_container.get_key(src_path)
             if key:
-                return self.obj_cls.from_key(self, key.delete())
+                deleted = self.obj_cls.from_key(self, key.delete())
+                base.Progress(progress, 1).step(key.size)
+                return deleted
             else:
                 raise errors.NoObjectException(
                     "{} does not exist".format(src_path))
         else:
-            return self._delete_directory("{}/".format(src_path))
+            return self._delete_directory("{}/".format(src_path), progress)
+
+    def _copy_key(self, new_key_name, src_key_name, size=None):
+        """Copy a key within the container, preserving its ACL.
 
-    def _rename_object(self, parent_dir_path, src_path, new_basename):
+        Keys larger than ``CLOUD_BROWSER_COPY_MULTIPART_THRESHOLD`` bytes are
+        copied with a multipart upload whose parts are copied concurrently
+        (single copies are limited to 5 GB), unless :attr:`multipart_copy`
+        is off.
+
+        :param new_key_name: A string.
+        :param src_key_name: A string.
+        :param size: Source size in bytes, if known.
+
+        :return: The new key.
+        """
+        if not self.multipart_copy or size is None or \
+                size <= settings.CLOUD_BROWSER_COPY_MULTIPART_THRESHOLD:
+            return self.native_container.copy_key(
+                new_key_name,
+                self.native_container.name,
+                src_key_name,
+                preserve_acl=True)
+
+        return self._multipart_copy_key(new_key_name, src_key_name, size)
+
+    def _multipart_copy_key(self, new_key_name, src_key_name, size):
+        """Copy a key part by part with a multipart upload.
+
+        :return: The new key.
+        """
+        bucket = self.native_container
+        src_key = bucket.get_key(src_key_name)
+        if src_key is None:
+            raise errors.NoObjectException(
+                "{} does not exist".format(src_key_name))
+
+        acl = bucket.get_xml_acl(src_key_name)
+        upload = bucket.initiate_multipart_upload(
+            new_key_name,
+            headers={'Content-Type': src_key.content_type},
+            metadata=src_key.metadata)
+
+        part_size = max(settings.CLOUD_BROWSER_COPY_PART_SIZE,
+                        -(-size // MULTIPART_MAX_PARTS))
+        parts = [(number, start, min(start + part_size, size) - 1)
+                 for number, start in enumerate(xrange(0, size, part_size),
+                                                1)]
+
+        def copy_part(part):
+            """Copy part and return its ETag."""
+            number, start, end = part
+            return upload.copy_part_from_key(bucket.name, src_key_name,
+                                             number, start, end).etag
+
+        try:
+            etags = map_threaded(copy_part, parts,
+                                 settings.CLOUD_BROWSER_COPY_WORKERS)
+            bucket.complete_multipart_upload(
+                new_key_name, upload.id, _complete_upload_xml(
+                    (number, etag)
+                    for (number, _, _), etag in zip(parts, etags)))
+        except Exception:
+            upload.cancel_upload()
+            raise
+
+        bucket.set_xml_acl(acl, new_key_name)
+        return bucket.get_key(new_key_name)
+
+    def _rename_object(self, parent_dir_path, src_path, new_basename,
+                       src_key=None):
         """Rename a file. Cause AWS S3 is a key value store, this method can
         also be used to rename a directory, which key ends with "/".
 
@@ -408,48 +731,58 @@ class BotoContainer(base.CloudContainer):
             directory "foo/bar/baz/".
         :param new_basename: A string. If renaming a file: "baz-rename", or a
             directory: "baz-rename/".
+        :param src_key: Source boto key, if already listed.
 
         :return: If the file is successfully renamed (copy and delete the
             original key).
         :rtype: :class:`cloud_browser.cloud.aws.AwsObject`
         """
-        renamed = self.native_container.copy_key(
-            parent_dir_path + new_basename,
-            self.native_container.name,
-            src_path,
-            preserve_acl=True)
-        key = self.native_container.get_key(src_path)
+        key = src_key or self.native_container.get_key(src_path)
+        renamed = self._copy_key(parent_dir_path + new_basename, src_path,
+                                 key.size if key else None)
         if key:
             key.delete()
 
         return renamed
 
-    def _rename_directory(self, parent_dir_path, dir_src_path, new_basename):
+    def _rename_directory(self, parent_dir_path, dir_src_path, new_basename,
+                          progress=None):
         """Rename the directory and all of the files and subdirectories under
         it.
 
         :param parent_dir_path. A string, for example "foo/bar/".
         :param dir_src_path. A string, for example "foo/bar/baz/".
         :param new_basename. A string, for example "baz-rename".
+        :param progress: Optional progress callback.
 
         :return: Renamed object, if the directory and all of the files and
             subdirectories under it are successfully renamed.
         :rtype: :class:`cloud_browser.cloud.aws.AwsObject`
         """
         from boto.exception import BotoServerError
+        from boto.s3.prefix import Prefix
 
         # Rename all the files and subdirectories under the target directory.
         # While error occurs, continue renaming only if 'key does not exist'.
+        # Other errors stop the rename. Renamed keys are gone from the source,
+        # so running it again only renames the remaining keys.
+        journal = Journal.open(self, 'rename', parent_dir_path, dir_src_path,
+                               new_basename)
         keys = self._get_key_objects(dir_src_path)
+        tracker = base.Progress(progress, journal.done + len(keys),
+                                journal.done, journal.size)
         for key in keys:
             try:
                 self._rename_object(
                     "{}{}/".format(parent_dir_path, new_basename),
                     key.name,
-                    key.name[len(dir_src_path):])
+                    key.name[len(dir_src_path):],
+                    key)
             except BotoServerError as error:
-                if error.status == 404:
-                    pass
+                if error.status != 404:
+                    raise
+            tracker.step(key.size)
+            journal.checkpoint(tracker.done, tracker.size)
         # If directory key exists, rename the directory itself and return the
         # renamed directory key. Otherwise, change the key name of first item
         # in '_get_key_objects' to the new directory name. Because in `rename`,
@@ -457,16 +790,22 @@ class BotoContainer(base.CloudContainer):
         # is required.
         try:
             self.get_object(dir_src_path)
-            return  self._rename_object(
+            renamed = self._rename_object(
                 parent_dir_path,
                 dir_src_path,
                 "{}/".format(new_basename))
         except errors.NoObjectException:
-            keys[0].name = "{}{}".format(parent_dir_path, new_basename)
-            return keys[0]
+            # All keys may have been renamed by an interrupted run already.
+            renamed = keys[0] if keys else Prefix()
+            renamed.name = "{}{}".format(parent_dir_path, new_basename)
+
+        journal.complete()
+        return renamed
 
+    @existence.invalidates
     @boto_server_client_error_wrapper
-    def rename(self, parent_dir_path, src_path, new_basename, is_file):
+    def rename(self, parent_dir_path, src_path, new_basename, is_file,
+               progress=None):
         """If src_path is a file, rename it. If it's a directory, rename all
         paths under it and itself.
 
@@ -481,41 +820,124 @@ class BotoContainer(base.CloudContainer):
             contain key prefix.
         :param is_file: A boolean indicating the target CloudObject is a file
             or not.
+        :param progress: Optional ``callback(done, total, size)``.
 
         :return: If successfully rename the src key.
         :rtype: :class:`cloud_browser.cloud.aws.AwsObject`
         """
         if is_file:
-            return self.obj_cls.from_key(
+            renamed = self.obj_cls.from_key(
                 self, self._rename_object(parent_dir_path,
                                           src_path,
                                           new_basename))
+            base.Progress(progress, 1).step(renamed.size)
+            return renamed
         else:
             return self.obj_cls.from_prefix(
                 self, self._rename_directory(parent_dir_path,
                                              "{}/".format(src_path),
-                                             new_basename))
+                                             new_basename,
+                                             progress))
 
+    @existence.invalidates
     @boto_server_client_error_wrapper
-    def move(self, src_file_path, target_dir_path):
+    def move(self, src_file_path, target_dir_path, progress=None):
         """Move the file to the target directory.
 
         :param src_file_path: A string ends with "/" (excludes ROOT).
         :param target_dir_path: A string.
+        :param progress: Optional ``callback(done, total, size)``.
 
         :return: If successfully move the key to the target directory.
         :rtype: :class:`cloud_browser.cloud.aws.AwsObject`
         """
-        moved = self.native_container.copy_key(
+        key = self.native_container.get_key(src_file_path)
+        moved = self._copy_key(
             target_dir_path + src_file_path.split("/")[-1],
-            self.native_container.name,
             src_file_path,
-            preserve_acl=True)
+            key.size if key else None)
 
-        key = self.native_container.get_key(src_file_path)
         if key:
             key.delete()
-        return self.obj_cls.from_key(self, moved)
+        moved = self.obj_cls.from_key(self, moved)
+        base.Progress(progress, 1).step(moved.size)
+        return moved
+
+    @existence.invalidates
+    @boto_server_client_error_wrapper
+    def delete_files(self, paths):
+        """Delete files with multi-object delete requests.
+
+        :param paths: List of file paths.
+
+        :return: List of ``(path, error)`` tuples in order of ``paths``, with
+            an error message for failed paths or ``None``.
+        """
+        results = []
+        for start in range(0, len(paths), MULTI_DELETE_MAX_KEYS):
+            chunk = paths[start:start + MULTI_DELETE_MAX_KEYS]
+            result = self.native_container.delete_keys(chunk)
+            failed = dict((error.key, error.message or error.code)
+                          for error in result.errors)
+            results.extend((path, failed.get(path)) for path in chunk)
+
+        return results
+
+    @boto_server_client_error_wrapper
+    def initiate_upload(self, path, content_type=None, username=None):
+        """Initiate a multipart upload of a browser file to ``path``.
+
+        The new object is public-read and records user-defined metadata
+        modified-by, like the form returned by ``get_upload_form``.
+
+        :return: Upload id.
+        """
+        upload = self.native_container.initiate_multipart_upload(
+            path,
+            headers={'Content-Type': content_type} if content_type else None,
+            metadata={'modified-by': username} if username else None,
+            policy='public-read')
+        return upload.id
+
+    def get_upload_part_url(self, path, upload_id, part_number, expires):
+        """Return presigned ``PUT`` URL of part ``part_number`` of a
+        multipart upload.
+
+        The browser must send the part without ``Content-Type`` and
+        ``Content-MD5`` headers, which are not signed.
+        """
+        return _presigned_url(self.conn.native_conn, expires, 'PUT',
+                              self.name, path,
+                              {'partNumber': str(part_number),
+                               'uploadId': upload_id})
+
+    @existence.invalidates
+    @boto_server_client_error_wrapper
+    def complete_upload(self, path, upload_id, part_count):
+        """Complete a multipart upload of parts 1 to ``part_count``.
+
+        Parts are listed from the datastore, so that the browser does not
+        need to read (CORS exposed) part etags.
+
+        :rtype: :class:`cloud_browser.cloud.aws.AwsObject`
+        """
+        from boto.s3.multipart import MultiPartUpload
+
+        upload = MultiPartUpload(self.native_container)
+        upload.key_name, upload.id = path, upload_id
+        parts = [(part.part_number, part.etag) for part in upload]
+        if [number for number, _ in parts] != range(1, part_count + 1):
+            raise errors.StorageResponseException(
+                "Upload of {} is missing parts".format(path))
+
+        self.native_container.complete_multipart_upload(
+            path, upload_id, _complete_upload_xml(parts))
+        return self.get_object(path)
+
+    @boto_server_client_error_wrapper
+    def abort_upload(self, path, upload_id):
+        """Abort a multipart upload, discarding uploaded parts."""
+        self.native_container.cancel_multipart_upload(path, upload_id)
 
     @classmethod
     def from_bucket(cls, connection, bucket):
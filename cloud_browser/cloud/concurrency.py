@@ -0,0 +1,128 @@
+"""Bounded thread concurrency helpers.
+
+Datastore calls are network bound, so threads are enough to overlap them.
+Calls in helper threads are recorded into the stats of the calling thread
+(see :func:`cloud_browser.cloud.instrument.bind`).
+"""
+import Queue
+import sys
+import threading
+
+from collections import deque
+
+from cloud_browser.cloud import instrument
+
+
+def map_threaded(function, items, workers):
+    """Apply ``function`` to every item using up to ``workers`` threads.
+
+    Results are returned in the order of ``items``. If any call raises, the
+    remaining (not yet started) items are skipped and the first exception is
+    re-raised (with its traceback) once all threads are done.
+
+    :param function: Callable taking a single item.
+    :param items: Iterable of items.
+    :param workers: Maximum number of concurrent calls.
+
+    :rtype: ``list``
+    """
+    items = list(items)
+    workers = max(1, min(workers, len(items)))
+    if workers == 1:
+        return [function(item) for item in items]
+
+    function = instrument.bind(function)
+    tasks = Queue.Queue()
+    for task in enumerate(items):
+        tasks.put(task)
+
+    results = [None] * len(items)
+    failures = []
+
+    def work():
+        """Worker loop."""
+        while not failures:
+            try:
+                index, item = tasks.get_nowait()
+            except Queue.Empty:
+                return
+
+            try:
+                results[index] = function(item)
+            except Exception:  # pylint: disable=broad-except
+                failures.append(sys.exc_info())
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if failures:
+        exc_type, exc_value, exc_tb = failures[0]
+        raise exc_type, exc_value, exc_tb
+
+    return results
+
+
+class _Future(object):
+    """Result of a call running in a background thread."""
+
+    def __init__(self, function, item):
+        """Initializer."""
+        self.done = threading.Event()
+        self.value = None
+        self.exc_info = None
+        thread = threading.Thread(target=self.run, args=(function, item))
+        thread.daemon = True
+        thread.start()
+
+    def run(self, function, item):
+        """Run call."""
+        try:
+            self.value = function(item)
+        except Exception:  # pylint: disable=broad-except
+            self.exc_info = sys.exc_info()
+        finally:
+            self.done.set()
+
+    def result(self):
+        """Wait for and return result, re-raising exceptions."""
+        self.done.wait()
+        if self.exc_info is not None:
+            exc_type, exc_value, exc_tb = self.exc_info
+            raise exc_type, exc_value, exc_tb
+        return self.value
+
+
+def imap_ahead(function, items, workers):
+    """Yield ``function(item)`` for every item, in order, computing up to
+    ``workers`` results ahead in background threads.
+
+    Unlike :func:`map_threaded`, items are consumed lazily and at most
+    ``workers`` results are buffered (a bounded reorder buffer), so it is
+    suited for streaming. An exception is re-raised when its result is
+    reached.
+
+    :param function: Callable taking a single item.
+    :param items: Iterable of items.
+    :param workers: Maximum number of results computed ahead.
+    """
+    function = instrument.bind(function)
+    items = iter(items)
+    window = deque()
+
+    def fill():
+        """Start calls up to the window size."""
+        while len(window) < max(1, workers):
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            window.append(_Future(function, item))
+
+    fill()
+    while window:
+        future = window.popleft()
+        fill()
+        yield future.result()
@@ -20,9 +20,17 @@ class Config(object):
             from cloud_browser.cloud.aws import AwsConnection
             account = settings.CLOUD_BROWSER_AWS_ACCOUNT
             secret_key = settings.CLOUD_BROWSER_AWS_SECRET_KEY
+            host = settings.CLOUD_BROWSER_AWS_HOST
+            port = settings.CLOUD_BROWSER_AWS_PORT
+            is_secure = settings.CLOUD_BROWSER_AWS_IS_SECURE
             if account and secret_key:
                 conn_cls = AwsConnection
-                conn_fn = lambda: AwsConnection(account, secret_key)
+                conn_fn = lambda: AwsConnection(
+                    account,
+                    secret_key,
+                    host=host,
+                    port=int(port) if port else None,
+                    is_secure=is_secure)
 
         if datastore == 'Google':
             # Try Google Storage
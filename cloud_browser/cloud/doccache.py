@@ -0,0 +1,231 @@
+"""Local disk cache of document contents.
+
+Documents served by the ``document`` view are looked up (a cheap ``HEAD``
+or ``stat``) before they are read. The cache uses the object version from
+the lookup -- the etag, or the last modified date and size if the datastore
+has no etags -- to key cached contents by container, path and version. A
+cache hit serves the contents from local disk instead of reading them from
+the datastore, while a changed object simply misses and replaces the
+previous version.
+
+The cache keeps at most ``CLOUD_BROWSER_DOCUMENT_CACHE_SIZE`` bytes in the
+directory, across all processes sharing it, and evicts least recently used
+documents first. Recency is kept in the file modification times, which every
+cache hit touches. After storing a document, a process scans the directory
+under a lock file and evicts by modification time, so the budget and the
+eviction order account for the documents and reads of all processes. The
+scan costs one ``stat`` per cached document, on cache misses only.
+
+The cache is switched on by pointing ``CLOUD_BROWSER_DOCUMENT_CACHE_DIR`` at
+a writable local directory.
+"""
+from __future__ import with_statement
+
+import errno
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+from cloud_browser.app_settings import settings
+
+
+###############################################################################
+# Constants / Conditional Imports
+###############################################################################
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # pylint: disable=C0103
+
+#: Cached document file name suffix.
+SUFFIX = ".doc"
+
+#: Lock file serializing evictions of all processes.
+LOCK_NAME = ".lock"
+
+
+###############################################################################
+# Classes
+###############################################################################
+class DocumentCache(object):
+    """Read-through LRU cache of document contents in a directory.
+
+    :param directory: Cache directory (created if missing).
+    :param max_size: Byte budget of all cached documents.
+    :param max_object_size: Larger documents are not cached.
+    """
+
+    def __init__(self, directory, max_size, max_object_size=None):
+        """Initializer."""
+        self.directory = directory
+        self.max_size = max_size
+        self.max_object_size = max_object_size
+        self.lock = threading.Lock()
+        self.names = {}
+        try:
+            os.makedirs(self.directory)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+
+        #: Bytes cached in the directory (as of the last scan).
+        self.size = sum(size for _, _, size in self._scan())
+
+    def _scan(self):
+        """Return ``(mtime, name, size)`` of cached documents, oldest
+        first."""
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            found.append((stat.st_mtime, name, stat.st_size))
+
+        return sorted(found)
+
+    @staticmethod
+    def version(storage_obj):
+        """Return version of storage object, or ``None`` if unknown."""
+        if storage_obj.etag:
+            return storage_obj.etag
+        if storage_obj.last_modified is not None:
+            return "%s-%s" % (storage_obj.last_modified.isoformat(),
+                              storage_obj.size)
+        return None
+
+    @staticmethod
+    def key(storage_obj, version):
+        """Return cache file name of storage object version."""
+        ident = json.dumps([storage_obj.container.name, storage_obj.name,
+                            version])
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest() + SUFFIX
+
+    def get(self, name):
+        """Return cached contents of file ``name`` or ``None``."""
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as file_obj:
+                content = file_obj.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            # Evicted by another process.
+            return None
+
+        return content
+
+    def put(self, name, path_key, content):
+        """Store contents as file ``name``, replacing the previously cached
+        version of ``path_key`` and evicting least recently used documents.
+        """
+        path = os.path.join(self.directory, name)
+        tmp_path = "%s.%s.tmp" % (path, uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as file_obj:
+            file_obj.write(content)
+        os.rename(tmp_path, path)
+
+        with self.lock:
+            previous = self.names.get(path_key)
+            if previous is not None and previous != name:
+                self._remove(previous)
+            self.names[path_key] = name
+            self._evict()
+
+    def _evict(self):
+        """Evict least recently used documents of all processes until the
+        directory fits the budget. Caller holds the lock.
+        """
+        with open(os.path.join(self.directory, LOCK_NAME), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            found = self._scan()
+            self.size = sum(size for _, _, size in found)
+            for _, name, size in found:
+                if self.size <= self.max_size:
+                    break
+                self._remove(name)
+                self.size -= size
+
+    def _remove(self, name):
+        """Delete cached file ``name``."""
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def read(self, storage_obj):
+        """Return contents of storage object, from the cache if possible."""
+        version = self.version(storage_obj)
+        if version is None:
+            return storage_obj.read()
+
+        name = self.key(storage_obj, version)
+        content = self.get(name)
+        if content is None:
+            content = storage_obj.read()
+            if self.max_object_size is None or \
+                    len(content) <= self.max_object_size:
+                self.put(name, (storage_obj.container.name, storage_obj.name),
+                         content)
+
+        return content
+
+
+###############################################################################
+# Functions
+###############################################################################
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache():
+    """Return process-wide document cache, or ``None`` if disabled.
+
+    :rtype: :class:`DocumentCache`
+    """
+    global _CACHE  # pylint: disable=global-statement
+
+    directory = settings.CLOUD_BROWSER_DOCUMENT_CACHE_DIR
+    if not directory:
+        return None
+
+    with _CACHE_LOCK:
+        if _CACHE is None or _CACHE.directory != directory:
+            _CACHE = DocumentCache(
+                directory,
+                settings.CLOUD_BROWSER_DOCUMENT_CACHE_SIZE,
+                settings.CLOUD_BROWSER_DOCUMENT_CACHE_MAX_OBJECT_SIZE)
+        _CACHE.max_size = settings.CLOUD_BROWSER_DOCUMENT_CACHE_SIZE
+        _CACHE.max_object_size = \
+            settings.CLOUD_BROWSER_DOCUMENT_CACHE_MAX_OBJECT_SIZE
+
+    return _CACHE
+
+
+def read(storage_obj):
+    """Return contents of storage object, through the document cache if
+    enabled.
+    """
+    cache = get_cache()
+    if cache is None:
+        return storage_obj.read()
+
+    return cache.read(storage_obj)
+
+
+def read_iter(storage_obj):
+    """Return iterator of contents of storage object, through the document
+    cache if enabled and the object is small enough to be cached.
+    """
+    cache = get_cache()
+    if cache is None or cache.version(storage_obj) is None or \
+            (cache.max_object_size is not None and
+             storage_obj.size > cache.max_object_size):
+        return storage_obj.read_iter()
+
+    return iter([cache.read(storage_obj)])
@@ -1,4 +1,5 @@
 """Common cloud error wrappers."""
+import inspect
 import sys
 
 from functools import wraps
@@ -94,19 +95,21 @@ class CloudExceptionWrapper(object):
     in this module. See any of the data implementation modules for examples.
     """
     translations = {}
-    _excepts = None
 
-    def __new__(cls, *args, **kwargs):
-        """New."""
-        obj = object.__new__(cls, *args, **kwargs)
-
-        # Patch in lazy translations.
-        if not obj.translations:
-            lazy_translations = cls.lazy_translations()
-            if lazy_translations:
-                obj.translations = lazy_translations
+    @classmethod
+    def _resolved(cls):
+        """Return ``(translations, excepts, type_cache)`` of this class.
 
-        return obj
+        Translations (including :meth:`lazy_translations`) are resolved once
+        per wrapper class. ``type_cache`` maps raised exception types to
+        their translated class (or ``None``) along the exception MRO.
+        """
+        resolved = cls.__dict__.get('_resolved_translations')
+        if resolved is None:
+            translations = cls.translations or cls.lazy_translations() or {}
+            resolved = (translations, tuple(translations.keys()), {})
+            cls._resolved_translations = resolved
+        return resolved
 
     @classmethod
     def excepts(cls):
@@ -114,9 +117,29 @@ class CloudExceptionWrapper(object):
 
         :rtype: ``tuple`` of ``type``
         """
-        if cls._excepts is None:
-            cls._excepts = tuple(cls.translations.keys())
-        return cls._excepts
+        return cls._resolved()[1]
+
+    @classmethod
+    def translated_class(cls, exc_cls):
+        """Return translated class of exception class ``exc_cls`` or ``None``.
+
+        The most specific translated base class (by MRO) wins. Results are
+        cached per exception type.
+        """
+        translations, _, type_cache = cls._resolved()
+        try:
+            return type_cache[exc_cls]
+        except KeyError:
+            pass
+
+        new_cls = None
+        for base in inspect.getmro(exc_cls):
+            if base in translations:
+                new_cls = translations[base]
+                break
+
+        type_cache[exc_cls] = new_cls
+        return new_cls
 
     def translate(self, exc):
         """Return translation of exception to new class.
@@ -124,15 +147,20 @@ class CloudExceptionWrapper(object):
         Calling code should only raise exception if exception class is passed
         in, else ``None`` (which signifies no wrapping should be done).
         """
-        # Find actual class.
-        for key in self.translations.keys():
-            if isinstance(exc, key):
-                return self.translations[key](unicode(exc))
+        new_cls = self.translated_class(type(exc))
+        if new_cls is None:
+            return None
 
-        return None
+        return new_cls(unicode(exc))
 
     def __call__(self, operation):
-        """Call and wrap exceptions."""
+        """Call and wrap exceptions.
+
+        The wrapper adds a single frame around ``operation``; trapped classes
+        and translations are only looked up once an exception is raised.
+        """
+        translate = self.translate
+        excepts = self.excepts
 
         @wraps(operation)
         def wrapped(*args, **kwargs):
@@ -140,8 +168,8 @@ class CloudExceptionWrapper(object):
 
             try:
                 return operation(*args, **kwargs)
-            except self.excepts(), exc:
-                new_exc = self.translate(exc)
+            except excepts(), exc:
+                new_exc = translate(exc)
                 if new_exc:
                     # Wrap and raise with stack intact.
                     raise new_exc.__class__, new_exc, sys.exc_info()[2]
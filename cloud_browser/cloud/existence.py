@@ -0,0 +1,80 @@
+"""Short-lived cache of path existence probes.
+
+The views check that directories exist (and that new names do not) several
+times per request, and again when redirecting after every mutation. A probe
+(:meth:`CloudContainer.paths_exist`) asks the datastore for at most one key
+under the path, and its result -- positive or negative -- is remembered for
+``CLOUD_BROWSER_EXISTS_CACHE_TTL`` seconds per connection.
+
+Container mutations (:func:`invalidates`) drop every cached result of the
+container, so the cache is only stale for changes made outside of the
+process (e.g., by other processes or browser uploads), and then at most for
+the TTL. Checks guarding against overwrites (new directory and rename
+targets) bypass the cache, so a stale negative never lets them clobber an
+object.
+"""
+import threading
+import time
+
+from functools import wraps
+
+from cloud_browser.app_settings import settings
+
+
+class ExistenceCache(object):
+    """Thread-safe TTL cache of ``(container name, path)`` existence."""
+
+    def __init__(self):
+        """Initializer."""
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, container_name, path):
+        """Return cached existence of path, ``None`` if unknown or expired."""
+        key = (container_name, path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, exists = entry
+            if expires <= time.time():
+                del self.entries[key]
+                return None
+        return exists
+
+    def set(self, container_name, path, exists):
+        """Cache existence of path (unless the cache is disabled)."""
+        ttl = settings.CLOUD_BROWSER_EXISTS_CACHE_TTL
+        if not ttl:
+            return
+        with self.lock:
+            self.entries[(container_name, path)] = (time.time() + ttl,
+                                                    exists)
+
+    def invalidate(self, container_name):
+        """Drop all cached results of a container."""
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == container_name]:
+                del self.entries[key]
+
+    def clear(self):
+        """Drop all cached results."""
+        with self.lock:
+            self.entries.clear()
+
+
+def invalidates(method):
+    """Decorator of container mutation methods invalidating the cached
+    existence probes of the container once the mutation is done (or has
+    failed part way).
+    """
+
+    @wraps(method)
+    def wrapped(self, *args, **kwargs):
+        """Wrapped method."""
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.conn.existence.invalidate(self.name)
+
+    return wrapped
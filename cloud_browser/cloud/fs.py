@@ -8,7 +8,8 @@ import shutil
 import sys
 
 from cloud_browser.app_settings import settings
-from cloud_browser.cloud import errors, base
+from cloud_browser.cloud import errors, base, existence, index, instrument, \
+    singleflight
 from cloud_browser.common import SEP
 
 
@@ -76,11 +77,19 @@ class FilesystemObject(base.CloudObject):
         """Return native storage object."""
         return object()
 
+    @instrument.timed("fs.read")
     def _read(self):
         """Return contents of object."""
         with open(self.base_path, 'rb') as file_obj:
             return file_obj.read()
 
+    def read_iter(self, chunk_size=None):
+        """Yield contents of object in chunks."""
+        chunk_size = chunk_size or settings.CLOUD_BROWSER_READ_CHUNK_SIZE
+        with open(self.base_path, 'rb') as file_obj:
+            for chunk in iter(lambda: file_obj.read(chunk_size), ''):
+                yield chunk
+
     @property
     def base_path(self):
         """Base absolute path of container."""
@@ -114,34 +123,44 @@ class FilesystemContainer(base.CloudContainer):
         """Return native container object."""
         return object()
 
+    @instrument.timed("fs.get_objects")
     @wrap_fs_obj_errors
-    def get_objects(self, path, marker=None,
-                    limit=settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT):
-        """Get objects."""
-        def _filter(name):
-            """Filter."""
-            return (not_dot(name) and
-                    (marker is None or
-                     os.path.join(path, name).strip(SEP) > marker.strip(SEP)))
-
+    def _list_names(self, path, marker):
+        """Return sorted entry names of directory ``path`` after ``marker``.
+        """
+        marker = marker.strip(SEP) if marker else None
         search_path = os.path.join(self.base_path, path)
-        objs = [self.obj_cls.from_path(self, os.path.join(path, o))
-                for o in os.listdir(search_path) if _filter(o)]
-        objs = sorted(objs, key=lambda x: x.base_path)
-        return objs[:limit]
+        return [name for name in sorted(os.listdir(search_path))
+                if not_dot(name) and
+                (marker is None or
+                 os.path.join(path, name).strip(SEP) > marker)]
+
+    def _iter_pages(self, path, marker, page_size):
+        """Yield objects of directory ``path`` after ``marker``.
 
+        The directory is listed once and entries are looked up as they are
+        consumed, so paging through a directory stays linear.
+        """
+        for name in self._list_names(path, marker):
+            try:
+                yield self.obj_cls.from_path(self, os.path.join(path, name))
+            except OSError as error:
+                # Removed since the listing.
+                if error.errno != errno.ENOENT:
+                    raise
+
+    @singleflight.coalesced
+    @instrument.timed("fs.get_object")
     @wrap_fs_obj_errors
     def get_object(self, path):
         """Get single object."""
         return self.obj_cls.from_path(self, path)
 
-    def has_directory(self, path):
-        """Check the directory exists or not."""
+    @instrument.timed("fs.probe")
+    def _probe(self, path):
+        """Return ``True`` if the file or directory exists."""
         full_path = os.path.join(self.base_path, path)
-        if os.path.exists(full_path.rstrip(SEP)) is False:
-            raise errors.NoObjectException
-
-        return True
+        return os.path.exists(full_path.rstrip(SEP))
 
     @property
     def base_path(self):
@@ -167,7 +186,9 @@ class FilesystemContainer(base.CloudContainer):
         """Get full path in filesystem, easy for file operations."""
         return os.path.join(self.base_path, path).rstrip(SEP)
 
+    @instrument.timed("fs.get_directories_paths")
     @fs_server_client_error_wrapper
+    @index.served
     def get_directories_paths(self):
         """Get all the directories paths in the given container. Returns the
         relative path.  """
@@ -197,6 +218,8 @@ class FilesystemContainer(base.CloudContainer):
 
         return False
 
+    @existence.invalidates
+    @instrument.timed("fs.mkdir")
     @fs_server_client_error_wrapper
     def mkdir(self, dir_path, username=None):
         """Create a new subdirectory under dir_path."""
@@ -206,18 +229,35 @@ class FilesystemContainer(base.CloudContainer):
 
         return self.obj_cls.from_path(self, dir_path)
 
+    @existence.invalidates
+    @instrument.timed("fs.delete")
     @fs_server_client_error_wrapper
-    def delete(self, src_path, is_file):
+    def delete(self, src_path, is_file, progress=None):
         """If src_path is a file, rename it. If it's a directory, rename all
         paths under it and itself.
         """
+        full_path = self._get_full_path(src_path)
         if is_file:
-            os.remove(self._get_full_path(src_path))
+            paths = [full_path]
         else:
-            shutil.rmtree(self._get_full_path(src_path))
+            paths = [os.path.join(root, name)
+                     for root, _, names in os.walk(full_path)
+                     for name in names]
+
+        tracker = base.Progress(progress, len(paths))
+        for path in paths:
+            size = os.path.getsize(path)
+            os.remove(path)
+            tracker.step(size)
+
+        if not is_file:
+            shutil.rmtree(full_path)
 
+    @existence.invalidates
+    @instrument.timed("fs.rename")
     @fs_server_client_error_wrapper
-    def rename(self, parent_dir_path, src_path, new_basename, is_file):
+    def rename(self, parent_dir_path, src_path, new_basename, is_file,
+               progress=None):
         """If src_path is a file, rename it. If it's a directory, rename all
         paths under it and itself.
         """
@@ -229,9 +269,12 @@ class FilesystemContainer(base.CloudContainer):
             os.rename(full_src_path, full_new_path)
         else:
             os.renames(full_src_path, full_new_path)
+        base.Progress(progress, 1).step()
 
+    @existence.invalidates
+    @instrument.timed("fs.move")
     @fs_server_client_error_wrapper
-    def move(self, src_file_path, target_dir_path):
+    def move(self, src_file_path, target_dir_path, progress=None):
         """Move the file to the target directory."""
         os.rename(
             self._get_full_path(src_file_path),
@@ -240,6 +283,7 @@ class FilesystemContainer(base.CloudContainer):
                 os.path.basename(src_file_path))
             )
         )
+        base.Progress(progress, 1).step()
 
 
 class FilesystemConnection(base.CloudConnection):
@@ -257,6 +301,7 @@ class FilesystemConnection(base.CloudConnection):
         """Return native connection object."""
         return object()
 
+    @instrument.timed("fs.get_containers")
     @wrap_fs_cont_errors
     def _get_containers(self):
         """Return available containers."""
@@ -264,6 +309,7 @@ class FilesystemConnection(base.CloudConnection):
         return [self.cont_cls.from_path(self, d)
                 for d in os.listdir(self.abs_root) if is_dir(full_fn(d))]
 
+    @instrument.timed("fs.get_container")
     @wrap_fs_cont_errors
     def _get_container(self, path):
         """Return single container."""
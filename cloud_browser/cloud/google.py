@@ -11,8 +11,9 @@ S3 interface by Google.
 .. _`Google Storage for Developers`: http://code.google.com/apis/storage/
 .. _boto: http://code.google.com/p/boto/
 """
-from cloud_browser.app_settings import settings
 from cloud_browser.cloud import boto_base as base
+from cloud_browser.cloud import existence, ratelimit
+from cloud_browser.cloud.base import CloudContainer
 from cloud_browser.common import SEP, requires
 
 ###############################################################################
@@ -83,22 +84,35 @@ class GsContainer(base.BotoContainer):
     #: Storage object child class.
     obj_cls = GsObject
 
-    def get_objects(self, path, marker=None,
-                    limit=settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT):
-        """Get objects.
+    #: GS has no ``UploadPartCopy``, large keys are copied in one request.
+    multipart_copy = False
+
+    def listing_stages(self):
+        """Return filter stages of directory listings.
 
         Certain upload clients may add a 0-byte object (e.g., ``FOLDER`` object
-        for path ``path/to/FOLDER`` - ``path/to/FOLDER/FOLDER``). We add an
-        extra +1 limit query and ignore any such file objects.
+        for path ``path/to/FOLDER`` - ``path/to/FOLDER/FOLDER``). We ignore
+        any such file objects.
         """
-        # Get basename of implied folder.
-        folder = path.split(SEP)[-1]
-
-        # Query extra objects, then strip 0-byte dummy object if present.
-        objs = super(GsContainer, self).get_objects(path, marker, limit+1)
-        objs = [o for o in objs if not (o.size == 0 and o.name == folder)]
-
-        return objs[:limit]
+        return super(GsContainer, self).listing_stages() + \
+            [self._skip_folder_objects]
+
+    @staticmethod
+    def _skip_folder_objects(objs, path, marker):
+        """Skip 0-byte objects named like the implied folder."""
+        # pylint: disable=unused-argument
+        folder = path.rstrip(SEP).split(SEP)[-1]
+        for obj in objs:
+            if not (obj.size == 0 and obj.basename == folder):
+                yield obj
+
+    @existence.invalidates
+    def delete_files(self, paths):
+        """Delete files one by one.
+
+        The GS XML API has no multi-object delete request.
+        """
+        return CloudContainer.delete_files(self, paths)
 
 
 class GsConnection(base.BotoConnection):
@@ -110,4 +124,5 @@ class GsConnection(base.BotoConnection):
     @requires(boto, 'boto')
     def _get_connection(self):
         """Return native connection object."""
-        return boto.connect_gs(self.account, self.secret_key)
+        return ratelimit.limit_connection(
+            boto.connect_gs(self.account, self.secret_key))
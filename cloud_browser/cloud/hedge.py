@@ -0,0 +1,170 @@
+"""Hedged requests for tail latency reduction.
+
+A small fraction of datastore responses are much slower than the rest and
+dominate tail latencies. With hedging, a ``GET`` or ``HEAD`` that has not
+received its response (headers, i.e., the first byte) within a delay is
+issued a second time and the first successful response wins; the loser is
+discarded.
+
+The delay is a percentile (``CLOUD_BROWSER_HEDGE_PERCENTILE``) of a rolling
+histogram of recent latencies per operation type, so that only the slowest
+few percent of requests are duplicated. Until enough latencies are recorded,
+requests are not hedged.
+
+Hedging is switched off by default and enabled with
+``CLOUD_BROWSER_HEDGE``.
+"""
+from __future__ import with_statement
+
+import math
+import sys
+import threading
+import time
+
+from collections import deque
+
+from cloud_browser.app_settings import settings
+from cloud_browser.cloud import instrument
+
+
+###############################################################################
+# Constants
+###############################################################################
+#: Number of recent latencies kept per operation.
+HISTORY = 1000
+
+#: Minimum number of recorded latencies before requests are hedged.
+MIN_SAMPLES = 20
+
+
+###############################################################################
+# Classes
+###############################################################################
+class LatencyHistogram(object):
+    """Thread-safe rolling window of recent latencies."""
+
+    def __init__(self, size=HISTORY):
+        """Initializer."""
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def record(self, latency):
+        """Record latency in seconds."""
+        with self.lock:
+            self.samples.append(latency)
+
+    def percentile(self, percent):
+        """Return ``percent`` percentile latency, or ``None`` if fewer than
+        :data:`MIN_SAMPLES` latencies are recorded.
+        """
+        with self.lock:
+            samples = sorted(self.samples)
+
+        if len(samples) < MIN_SAMPLES:
+            return None
+
+        index = int(math.ceil(percent / 100.0 * len(samples))) - 1
+        return samples[max(0, min(index, len(samples) - 1))]
+
+
+class _Race(object):
+    """Attempts of a hedged call, first success wins."""
+
+    def __init__(self, function, histogram, discard):
+        """Initializer."""
+        self.function = function
+        self.histogram = histogram
+        self.discard = discard
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.pending = 0
+        self.won = False
+        self.result = None
+        self.exc_info = None
+
+    def start(self):
+        """Start an attempt in a background thread."""
+        with self.lock:
+            if self.done.is_set():
+                return
+            self.pending += 1
+        thread = threading.Thread(target=self.run)
+        thread.daemon = True
+        thread.start()
+
+    def run(self):
+        """Run attempt."""
+        start = time.time()
+        try:
+            result = self.function()
+        except Exception:  # pylint: disable=broad-except
+            with self.lock:
+                self.pending -= 1
+                if self.exc_info is None:
+                    self.exc_info = sys.exc_info()
+                # Fail once no other attempt may succeed.
+                if not self.won and not self.pending:
+                    self.done.set()
+            return
+
+        self.histogram.record(time.time() - start)
+        with self.lock:
+            self.pending -= 1
+            lost = self.won
+            if not lost:
+                self.won, self.result = True, result
+                self.done.set()
+
+        if lost and self.discard is not None:
+            self.discard(result)
+
+
+###############################################################################
+# Functions
+###############################################################################
+#: Process-wide latency histograms by operation type.
+HISTOGRAMS = {}
+_HISTOGRAMS_LOCK = threading.Lock()
+
+
+def get_histogram(operation):
+    """Return latency histogram of ``operation`` type.
+
+    :rtype: :class:`LatencyHistogram`
+    """
+    with _HISTOGRAMS_LOCK:
+        histogram = HISTOGRAMS.get(operation)
+        if histogram is None:
+            histogram = HISTOGRAMS[operation] = LatencyHistogram()
+
+    return histogram
+
+
+def call(operation, function, discard=None):
+    """Call ``function``, hedged if enabled.
+
+    :param operation: Operation type (e.g., ``"get"``), selecting the
+        latency histogram.
+    :param function: Callable without arguments returning once the response
+        started (e.g., after reading the response headers).
+    :param discard: Optional callable releasing the result of a losing
+        attempt (e.g., closing its response).
+    :return: Result of the first successful attempt.
+    """
+    if not settings.CLOUD_BROWSER_HEDGE:
+        return function()
+
+    histogram = get_histogram(operation)
+    delay = histogram.percentile(settings.CLOUD_BROWSER_HEDGE_PERCENTILE)
+
+    race = _Race(instrument.bind(function), histogram, discard)
+    race.start()
+    if not race.done.wait(delay):
+        race.start()
+        race.done.wait()
+
+    if not race.won:
+        exc_type, exc_value, exc_tb = race.exc_info
+        raise exc_type, exc_value, exc_tb
+
+    return race.result
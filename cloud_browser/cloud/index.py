@@ -0,0 +1,528 @@
+"""Local SQLite index of container metadata.
+
+A full crawl (``manage.py cloud_browser_index``, see
+:func:`MetadataIndex.crawl`) stores every file and directory of a container
+(name, parent directory, size, content type, last modified date and etag)
+in a local SQLite database. Once a container is indexed, directory listings
+(``get_objects``, also sorted by size or date with ``get_sorted_objects``),
+the directory tree (``get_directories_paths``) and the container statistics
+(object count and size) are answered from the index instead of the
+datastore.
+
+Instead of crawling, a container can also be loaded offline from an S3
+Inventory report (see :mod:`cloud_browser.cloud.inventory`).
+
+The index is kept fresh by the mutation views, background jobs and upload
+callbacks (:func:`record`, :func:`record_upload`). A mutation that fails
+part way marks the affected directories as changed (:func:`invalidate`):
+listings under them are served from the datastore again until the next
+crawl or import, while the rest of the container is still served from the
+index. Changes made outside of the browser are only picked up by crawls
+and imports.
+
+The index is switched on by pointing ``CLOUD_BROWSER_INDEX_PATH`` at a
+writable database file.
+"""
+from __future__ import with_statement
+
+import sqlite3
+import threading
+import time
+
+from functools import wraps
+
+from cloud_browser.app_settings import settings
+from cloud_browser.common import ROOT, SEP, basename, path_join
+
+
+###############################################################################
+# Constants
+###############################################################################
+#: Clustered (``WITHOUT ROWID``) tables need SQLite 3.8.2.
+WITHOUT_ROWID = " WITHOUT ROWID" \
+    if sqlite3.sqlite_version_info >= (3, 8, 2) else ""
+
+#: Database schema.
+#:
+#: Objects are clustered by container, parent directory and name, so that a
+#: directory listing is a single range scan. The second (covering) index
+#: serves subtree updates, the directory tree and size rollups, the last two
+#: sorted listings (the date index needs SQLite 3.9 for the expression).
+#: Directories changed since the crawl (by failed mutations) are kept in
+#: ``changed``.
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS containers (
+        container TEXT PRIMARY KEY,
+        crawled REAL NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS changed (
+        container TEXT NOT NULL,
+        prefix TEXT NOT NULL,
+        PRIMARY KEY (container, prefix))""" + WITHOUT_ROWID,
+    """CREATE TABLE IF NOT EXISTS objects (
+        container TEXT NOT NULL,
+        parent TEXT NOT NULL,
+        name TEXT NOT NULL,
+        is_dir INTEGER NOT NULL,
+        size INTEGER,
+        content_type TEXT,
+        last_modified TIMESTAMP,
+        etag TEXT,
+        PRIMARY KEY (container, parent, name))""" + WITHOUT_ROWID,
+    """CREATE INDEX IF NOT EXISTS objects_names
+        ON objects (container, name, is_dir, size)""",
+    """CREATE INDEX IF NOT EXISTS objects_sizes
+        ON objects (container, parent, size, name)""",
+    """CREATE INDEX IF NOT EXISTS objects_dates
+        ON objects (container, parent, %s, name)""" % (
+            "COALESCE(last_modified, '')"
+            if sqlite3.sqlite_version_info >= (3, 9, 0) else "last_modified"),
+)
+
+#: Columns of sorted listings (see :data:`cloud_browser.cloud.base.SORT_KEYS`).
+SORT_COLUMNS = {
+    'name': "name",
+    'size': "size",
+    'last_modified': "COALESCE(last_modified, '')",
+}
+
+#: Object columns (in row order).
+COLUMNS = ("container", "parent", "name", "is_dir", "size", "content_type",
+           "last_modified", "etag")
+
+#: Fields of storage objects (see :meth:`MetadataIndex._objects`).
+OBJECT_FIELDS = "name, is_dir, size, content_type, last_modified, etag"
+
+#: Object row statements.
+INSERT = "INSERT OR REPLACE INTO objects VALUES (%s)" % \
+    ", ".join("?" * len(COLUMNS))
+INSERT_DIR = "INSERT OR IGNORE INTO objects VALUES (%s)" % \
+    ", ".join("?" * len(COLUMNS))
+
+#: Rows inserted per transaction during crawls.
+BATCH_SIZE = 1000
+
+
+def _parent(name):
+    """Return parent directory name of object name."""
+    return name.rpartition(SEP)[0]
+
+
+def _ancestors(name):
+    """Return ``name`` and all its parent directory names (down to
+    ``ROOT``).
+    """
+    names = [name]
+    while name:
+        name = _parent(name)
+        names.append(name)
+    return names
+
+
+def _after(name):
+    """Return ``(low, high)`` bounds of names under directory ``name``."""
+    # Names under "foo" sort between "foo/" and "foo0" ('0' follows '/').
+    return name + SEP, name + chr(ord(SEP) + 1)
+
+
+###############################################################################
+# Classes
+###############################################################################
+class MetadataIndex(object):
+    """SQLite index of container objects.
+
+    :param path: Database file path.
+    """
+
+    def __init__(self, path):
+        """Initializer."""
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                  detect_types=sqlite3.PARSE_DECLTYPES)
+        with self.lock:
+            with self.db:
+                for statement in SCHEMA:
+                    self.db.execute(statement)
+
+    def _query(self, sql, *params):
+        """Return all rows of query."""
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def _row(self, container_name, obj):
+        """Return object row of storage object."""
+        return (container_name, _parent(obj.name), obj.name,
+                int(obj.is_subdir), obj.size or 0, obj.content_type or None,
+                obj.last_modified, obj.etag)
+
+    def _dir_rows(self, container_name, name):
+        """Return directory rows of ``name`` and its ancestors."""
+        rows = []
+        while name:
+            rows.append((container_name, _parent(name), name, 1, 0, None,
+                         None, None))
+            name = _parent(name)
+        return rows
+
+    def is_indexed(self, container_name):
+        """Return ``True`` if the container has been crawled."""
+        return bool(self._query(
+            "SELECT 1 FROM containers WHERE container = ?", container_name))
+
+    def crawled(self, container_name):
+        """Return time of the last crawl of container or ``None``."""
+        rows = self._query(
+            "SELECT crawled FROM containers WHERE container = ?",
+            container_name)
+        return rows[0][0] if rows else None
+
+    ###########################################################################
+    # Crawls.
+    ###########################################################################
+    def crawl(self, container):
+        """Replace indexed objects of container with a full listing.
+
+        The container is served from the datastore while it is crawled.
+
+        :return: Number of indexed objects.
+        """
+        rows = (self._row(container.name, obj)
+                for obj in container.walk_objects(ROOT))
+        return self.load(container.name, rows, time.time())
+
+    def load(self, container_name, rows, crawled):
+        """Replace indexed objects of container with object rows.
+
+        :param rows: Iterable of object rows (see :data:`COLUMNS`). Parent
+            directories must be included.
+        :param crawled: Time of the listing (or snapshot).
+        :return: Number of indexed objects.
+        """
+        self.drop(container_name)
+
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                with self.lock:
+                    with self.db:
+                        self.db.executemany(INSERT, batch)
+                count += len(batch)
+                batch = []
+
+        with self.lock:
+            with self.db:
+                self.db.executemany(INSERT, batch)
+                self.db.execute("INSERT OR REPLACE INTO containers "
+                                "VALUES (?, ?)", (container_name, crawled))
+        return count + len(batch)
+
+    def drop(self, container_name):
+        """Remove container from the index."""
+        with self.lock:
+            with self.db:
+                for table in ('containers', 'changed', 'objects'):
+                    self.db.execute("DELETE FROM %s WHERE container = ?" %
+                                    table, (container_name,))
+
+    ###########################################################################
+    # Queries.
+    ###########################################################################
+    def is_changed(self, container_name, path):
+        """Return ``True`` if directory ``path`` may have changed since the
+        crawl.
+        """
+        names = _ancestors(path.strip(SEP))
+        return bool(self._query(
+            "SELECT 1 FROM changed WHERE container = ? AND prefix IN (%s)" %
+            ", ".join("?" * len(names)), container_name, *names))
+
+    def _objects(self, container, sql, *params):
+        """Return storage objects of query selecting :data:`OBJECT_FIELDS`.
+
+        The index keeps no user metadata, so ``modified_by`` is left unknown
+        rather than looked up per object.
+        """
+        type_cls = container.obj_cls.type_cls
+        return [container.obj_cls(
+            container, name, size=size, content_type=content_type or '',
+            last_modified=last_modified, etag=etag, modified_by=None,
+            obj_type=type_cls.SUBDIR if is_dir else type_cls.FILE)
+                for name, is_dir, size, content_type, last_modified, etag
+                in self._query(sql, *params)]
+
+    def get_objects(self, container, path, marker=None,
+                    limit=settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT):
+        """Return up to ``limit`` objects of directory ``path`` after
+        ``marker`` (see :meth:`CloudContainer.get_objects`), or ``None`` if
+        the directory may have changed since the crawl.
+        """
+        if self.is_changed(container.name, path):
+            return None
+
+        return self._objects(
+            container,
+            "SELECT %s FROM objects WHERE container = ? AND parent = ? "
+            "AND name > ? ORDER BY name LIMIT ?" % OBJECT_FIELDS,
+            container.name, path.rstrip(SEP), (marker or '').rstrip(SEP),
+            limit)
+
+    def get_sorted_objects(self, container, path, sort_key,
+                           descending=False, after=None,
+                           limit=settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT):
+        """Return up to ``limit`` objects of directory ``path`` ordered by
+        ``sort_key`` after the ``after`` keyset (see
+        :meth:`CloudContainer.get_sorted_objects`), or ``None`` if the
+        directory may have changed since the crawl.
+        """
+        if self.is_changed(container.name, path):
+            return None
+
+        column = SORT_COLUMNS[sort_key]
+        order, compare = ("DESC", "<") if descending else ("ASC", ">")
+        where, params = "", ()
+        if after is not None:
+            where = " AND (%s %s ? OR (%s = ? AND name %s ?))" % (
+                column, compare, column, compare)
+            params = (after[0], after[0], after[1])
+
+        return self._objects(
+            container,
+            "SELECT %s FROM objects WHERE container = ? AND parent = ?%s "
+            "ORDER BY %s %s, name %s LIMIT ?" % (
+                OBJECT_FIELDS, where, column, order, order),
+            container.name, path.rstrip(SEP), *(params + (limit,)))
+
+    def get_directories_paths(self, container):
+        """Return all directory paths of container (see
+        :meth:`CloudContainer.get_directories_paths`), or ``None`` if any
+        directory of the container may have changed since the crawl.
+        """
+        if self._query("SELECT 1 FROM changed WHERE container = ? LIMIT 1",
+                       container.name):
+            return None
+
+        rows = self._query(
+            "SELECT name FROM objects WHERE container = ? AND is_dir = 1 "
+            "ORDER BY name", container.name)
+        return [ROOT] + [name + SEP for name, in rows]
+
+    def stats(self, container_name):
+        """Return ``(count, size)`` of files of container, or ``None`` if
+        the container is not indexed.
+        """
+        if not self.is_indexed(container_name):
+            return None
+
+        return self.rollup(container_name, ROOT)
+
+    def rollup(self, container_name, path):
+        """Return ``(count, size)`` of files under directory ``path``."""
+        name = path.strip(SEP)
+        if name:
+            low, high = _after(name)
+            where, params = "name >= ? AND name < ?", (low, high)
+        else:
+            where, params = "1", ()
+
+        count, size = self._query(
+            "SELECT COUNT(*), SUM(size) FROM objects "
+            "WHERE container = ? AND %s AND is_dir = 0" % where,
+            container_name, *params)[0]
+        return count, size or 0
+
+    ###########################################################################
+    # Updates.
+    ###########################################################################
+    def add(self, container_name, objs):
+        """Add (or replace) objects, including their parent directories."""
+        dir_rows, rows = [], []
+        for obj in objs:
+            dir_rows.extend(self._dir_rows(container_name, _parent(obj.name)))
+            rows.append(self._row(container_name, obj))
+
+        with self.lock:
+            with self.db:
+                self.db.executemany(INSERT_DIR, dir_rows)
+                self.db.executemany(INSERT, rows)
+
+    def add_directory(self, container_name, path):
+        """Add directory ``path`` and its parent directories."""
+        with self.lock:
+            with self.db:
+                self.db.executemany(
+                    INSERT_DIR, self._dir_rows(container_name,
+                                               path.strip(SEP)))
+
+    def remove(self, container_name, path):
+        """Remove object ``path`` and everything under it."""
+        name = path.strip(SEP)
+        low, high = _after(name)
+        with self.lock:
+            with self.db:
+                self.db.execute(
+                    "DELETE FROM objects WHERE container = ? AND "
+                    "(name = ? OR (name >= ? AND name < ?))",
+                    (container_name, name, low, high))
+
+    def move(self, container_name, src_path, dst_path):
+        """Move object ``src_path`` and everything under it to
+        ``dst_path``.
+        """
+        src, dst = src_path.strip(SEP), dst_path.strip(SEP)
+        low, high = _after(src)
+        with self.lock:
+            with self.db:
+                self.db.execute(
+                    "UPDATE OR REPLACE objects SET "
+                    "name = ? || substr(name, ?), "
+                    "parent = ? || substr(parent, ?) "
+                    "WHERE container = ? AND name >= ? AND name < ?",
+                    (dst, len(src) + 1, dst, len(src) + 1, container_name,
+                     low, high))
+                self.db.execute(
+                    "UPDATE OR REPLACE objects SET name = ?, parent = ? "
+                    "WHERE container = ? AND name = ?",
+                    (dst, _parent(dst), container_name, src))
+                self.db.executemany(
+                    INSERT_DIR, self._dir_rows(container_name, _parent(dst)))
+
+    @staticmethod
+    def _changed_paths(operation, kwargs):
+        """Return object paths changed by a container mutation."""
+        if operation == 'mkdir':
+            return [kwargs['dir_path']]
+        elif operation in ('delete', 'upload'):
+            return [kwargs['src_path']]
+        elif operation == 'rename':
+            return [kwargs['src_path'],
+                    path_join(kwargs['parent_dir_path'],
+                              kwargs['new_basename'])]
+        elif operation == 'move':
+            return [kwargs['src_file_path'],
+                    path_join(kwargs['target_dir_path'],
+                              basename(kwargs['src_file_path']))]
+        raise ValueError("Unknown index operation: %s" % operation)
+
+    def mark_changed(self, container_name, operation, kwargs):
+        """Mark directories affected by a (failed) container mutation as
+        changed, so they are listed from the datastore.
+        """
+        rows = [(container_name, _parent(path.strip(SEP)))
+                for path in self._changed_paths(operation, kwargs)]
+        with self.lock:
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO changed VALUES (?, ?)", rows)
+
+    def apply(self, container_name, operation, kwargs):
+        """Apply a completed container mutation.
+
+        :param operation: Container method name (``mkdir``, ``delete``,
+            ``rename`` or ``move``).
+        :param kwargs: Keyword arguments of the container method.
+        """
+        if operation == 'mkdir':
+            self.add_directory(container_name, kwargs['dir_path'])
+        elif operation == 'delete':
+            self.remove(container_name, kwargs['src_path'])
+        elif operation == 'rename':
+            self.move(container_name, kwargs['src_path'],
+                      path_join(kwargs['parent_dir_path'],
+                                kwargs['new_basename']))
+        elif operation == 'move':
+            self.move(container_name, kwargs['src_file_path'],
+                      path_join(kwargs['target_dir_path'],
+                                basename(kwargs['src_file_path'])))
+        else:
+            raise ValueError("Unknown index operation: %s" % operation)
+
+
+###############################################################################
+# Functions
+###############################################################################
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_index():
+    """Return process-wide metadata index, or ``None`` if disabled.
+
+    :rtype: :class:`MetadataIndex`
+    """
+    global _INDEX  # pylint: disable=global-statement
+
+    path = settings.CLOUD_BROWSER_INDEX_PATH
+    if not path:
+        return None
+
+    with _INDEX_LOCK:
+        if _INDEX is None or _INDEX.path != path:
+            _INDEX = MetadataIndex(path)
+
+    return _INDEX
+
+
+def _indexed(container_name):
+    """Return index if enabled and container is indexed, else ``None``."""
+    index = get_index()
+    if index is None or not index.is_indexed(container_name):
+        return None
+    return index
+
+
+def served(method):
+    """Decorator answering a container method from the index (the
+    :class:`MetadataIndex` method of the same name) when the container is
+    indexed. Index methods return ``None`` to fall back to the datastore.
+    """
+
+    @wraps(method)
+    def wrapped(self, *args, **kwargs):
+        """Wrapped method."""
+        index = _indexed(self.name)
+        if index is not None:
+            result = getattr(index, method.__name__)(self, *args, **kwargs)
+            if result is not None:
+                return result
+        return method(self, *args, **kwargs)
+
+    return wrapped
+
+
+def fill_stats(containers):
+    """Set ``count`` and ``size`` of indexed containers."""
+    index = get_index()
+    if index is None:
+        return
+
+    for container in containers:
+        stats = index.stats(container.name)
+        if stats is not None:
+            container.count, container.size = stats
+
+
+def record(container_name, operation, **kwargs):
+    """Update index after a completed container mutation (see
+    :meth:`MetadataIndex.apply`).
+    """
+    index = _indexed(container_name)
+    if index is not None:
+        index.apply(container_name, operation, kwargs)
+
+
+def record_upload(container, path):
+    """Add uploaded object ``path`` to the index."""
+    index = _indexed(container.name)
+    if index is not None:
+        index.add(container.name, [container.get_object(path)])
+
+
+def invalidate(container_name, operation, **kwargs):
+    """Mark directories affected by a failed container mutation as changed
+    (see :meth:`MetadataIndex.mark_changed`).
+    """
+    index = _indexed(container_name)
+    if index is not None:
+        index.mark_changed(container_name, operation, kwargs)
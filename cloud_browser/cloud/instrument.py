@@ -0,0 +1,307 @@
+"""Backend call instrumentation.
+
+Records how many native datastore calls (e.g., boto ``get_key``, ``list``,
+``get_all_buckets``, ``copy_key``) are issued while serving a request and how
+long each of them takes. The numbers are exposed per request through
+:class:`cloud_browser.middleware.ServerTimingMiddleware` as a
+``Server-Timing`` header and a structured log line.
+
+Lazy result sets of native calls (e.g., boto ``list``, which pages through
+keys while it is iterated) are recorded as one call spanning their iteration.
+Requests of native keys handed out by native calls (see
+:data:`KEY_METHODS`) are recorded too, as are calls made by helper threads
+started within the request (see :func:`bind`).
+
+Instrumentation is switched on with ``CLOUD_BROWSER_INSTRUMENTATION``. When it
+is off, native objects are handed out unwrapped and decorated methods only
+check the setting, so the overhead is negligible.
+"""
+import threading
+import time
+
+from functools import wraps
+
+from cloud_browser.app_settings import settings
+
+
+###############################################################################
+# Per-request statistics.
+###############################################################################
+_LOCAL = threading.local()
+
+
+class CallStats(object):
+    """Native call counts and latencies for a single request."""
+
+    def __init__(self):
+        """Initializer."""
+        self.calls = {}
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def record(self, name, elapsed):
+        """Record a single call of ``elapsed`` seconds (thread-safe)."""
+        with self.lock:
+            count, total = self.calls.get(name, (0, 0.0))
+            self.calls[name] = (count + 1, total + elapsed)
+
+    @property
+    def count(self):
+        """Total number of recorded calls."""
+        return sum(count for count, _ in self.calls.values())
+
+    @property
+    def duration(self):
+        """Total time (in seconds) spent in recorded calls."""
+        return sum(total for _, total in self.calls.values())
+
+    def items(self):
+        """Return sorted list of ``(name, count, seconds)`` tuples."""
+        return [(name, count, total)
+                for name, (count, total) in sorted(self.calls.items())]
+
+    def server_timing(self):
+        """Return ``Server-Timing`` header value.
+
+        Durations are in milliseconds, e.g.::
+
+            backend;dur=12.5;desc="4 calls", container.get_key;dur=9.1;desc="3"
+        """
+        metrics = ['backend;dur=%.1f;desc="%d calls"' %
+                   (self.duration * 1000.0, self.count)]
+        metrics.extend('%s;dur=%.1f;desc="%d"' % (name, total * 1000.0, count)
+                       for name, count, total in self.items())
+        return ", ".join(metrics)
+
+    def as_dict(self):
+        """Return structured (JSON-serializable) representation."""
+        return {
+            'count': self.count,
+            'duration_ms': round(self.duration * 1000.0, 1),
+            'calls': dict((name, {'count': count,
+                                  'duration_ms': round(total * 1000.0, 1)})
+                          for name, count, total in self.items()),
+        }
+
+
+def enabled():
+    """Return ``True`` if instrumentation is switched on."""
+    return bool(settings.CLOUD_BROWSER_INSTRUMENTATION)
+
+
+def start():
+    """Start recording calls for the current thread.
+
+    :rtype: :class:`CallStats`
+    """
+    _LOCAL.stats = CallStats()
+    return _LOCAL.stats
+
+
+def stop():
+    """Stop recording and return the recorded stats (or ``None``).
+
+    :rtype: :class:`CallStats` or ``None``
+    """
+    stats = current()
+    _LOCAL.stats = None
+    return stats
+
+
+def current():
+    """Return stats being recorded for the current thread (or ``None``)."""
+    return getattr(_LOCAL, 'stats', None)
+
+
+def bind(function, stats=None):
+    """Return ``function`` recording calls into ``stats`` in whatever
+    thread it runs (e.g., helper threads of a request).
+
+    :param stats: Stats, defaults to those of the current thread.
+    """
+    stats = stats or current()
+    if stats is None:
+        return function
+
+    def bound(*args, **kwargs):
+        """Bound function."""
+        previous = current()
+        _LOCAL.stats = stats
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _LOCAL.stats = previous
+
+    return bound
+
+
+###############################################################################
+# Wrappers.
+###############################################################################
+#: Methods of native keys (e.g., boto keys returned by container calls)
+#: recorded as ``key.<method name>``.
+KEY_METHODS = ('open_read', 'delete', 'set_contents_from_file')
+
+
+def _wrap_key(item):
+    """Record :data:`KEY_METHODS` calls of native key ``item``.
+
+    Methods are wrapped on the instance, so type checks of keys still hold.
+    """
+    if not hasattr(item, 'open_read') or not hasattr(item, '__dict__') or \
+            'open_read' in item.__dict__:
+        return item
+
+    for name in KEY_METHODS:
+        method = getattr(item, name, None)
+        if method is not None:
+            setattr(item, name, _timed_call("key.%s" % name, method))
+    return item
+
+
+def _wrap_keys(result):
+    """Wrap native keys of call result (a key or a list of keys)."""
+    if isinstance(result, list):
+        for item in result:
+            _wrap_key(item)
+        return result
+    return _wrap_key(result)
+
+
+def _is_lazy(result):
+    """Return ``True`` if result is a lazy (re-iterable) result set."""
+    return hasattr(result, '__iter__') and \
+        not hasattr(result, '__len__') and not hasattr(result, 'next')
+
+
+class TimedIterable(object):
+    """Lazy result set recording its iteration as a call.
+
+    All other attribute access passes straight through to the result set.
+    """
+
+    def __init__(self, result, name, elapsed):
+        """Initializer.
+
+        :param elapsed: Seconds the call returning the result set took.
+        """
+        self.__dict__['_result'] = result
+        self.__dict__['_name'] = name
+        self.__dict__['_elapsed'] = elapsed
+
+    def __getattr__(self, name):
+        """Get native attribute."""
+        return getattr(self._result, name)
+
+    def __iter__(self):
+        """Iterate result set, recording the time spent in it."""
+        stats = current()
+        elapsed = self._elapsed
+        iterator = iter(self._result)
+        try:
+            while True:
+                begin = time.time()
+                try:
+                    item = next(iterator)
+                finally:
+                    elapsed += time.time() - begin
+                yield _wrap_key(item)
+        except StopIteration:
+            pass
+        finally:
+            if stats is not None:
+                stats.record(self._name, elapsed)
+
+
+def _timed_call(name, method):
+    """Return ``method`` wrapped to record calls under ``name``."""
+
+    def wrapped(*args, **kwargs):
+        """Wrapped function."""
+        stats = current()
+        if stats is None:
+            return method(*args, **kwargs)
+
+        begin = time.time()
+        try:
+            result = method(*args, **kwargs)
+        except Exception:
+            stats.record(name, time.time() - begin)
+            raise
+
+        elapsed = time.time() - begin
+        if _is_lazy(result):
+            return TimedIterable(result, name, elapsed)
+        stats.record(name, elapsed)
+        return _wrap_keys(result)
+
+    return wrapped
+
+
+class NativeProxy(object):
+    """Timing proxy around a native connection or container object.
+
+    Public method calls are recorded as ``<prefix>.<method name>``. All other
+    attribute access passes straight through to the native object.
+    """
+
+    def __init__(self, native, prefix):
+        """Initializer."""
+        self.__dict__['_native'] = native
+        self.__dict__['_prefix'] = prefix
+
+    def __getattr__(self, name):
+        """Get (and possibly wrap) native attribute."""
+        attr = getattr(self._native, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        return _timed_call("%s.%s" % (self._prefix, name), attr)
+
+    def __setattr__(self, name, value):
+        """Set native attribute."""
+        setattr(self._native, name, value)
+
+    def __iter__(self):
+        """Iterate native object."""
+        return iter(self._native)
+
+    def __repr__(self):
+        """Representation."""
+        return "<NativeProxy %s: %r>" % (self._prefix, self._native)
+
+
+def wrap_native(native, prefix):
+    """Return timing proxy for ``native`` if instrumentation is enabled.
+
+    :param native: Native connection or container object.
+    :param prefix: Metric name prefix (e.g., ``"container"``).
+    """
+    if native is None or not enabled():
+        return native
+
+    return NativeProxy(native, prefix)
+
+
+def timed(name):
+    """Decorator recording calls of the method under ``name``.
+
+    For datastores without a native object to proxy (e.g., the filesystem).
+    Whether instrumentation is enabled is checked per call, so that it can
+    be switched on at runtime.
+    """
+
+    def decorator(method):
+        """Decorator."""
+        timed_method = _timed_call(name, method)
+
+        @wraps(method)
+        def wrapped(*args, **kwargs):
+            """Wrapped method."""
+            if not enabled():
+                return method(*args, **kwargs)
+            return timed_method(*args, **kwargs)
+
+        return wrapped
+
+    return decorator
@@ -0,0 +1,167 @@
+"""Offline import of S3 Inventory reports into the metadata index.
+
+Crawling a very large bucket with ``LIST`` requests takes long and costs
+one request per 1000 keys. S3 Inventory delivers the same listing as daily
+or weekly report files instead. Once a report is copied to local disk
+(e.g., with ``aws s3 sync``), its ``manifest.json`` and data files are
+loaded into the metadata index (see :mod:`cloud_browser.cloud.index`)
+without any datastore request::
+
+    $ python manage.py cloud_browser_index --inventory=path/manifest.json
+
+Directories are derived from the key names. The snapshot time of the index
+is the report creation time; changes made through the browser afterwards
+are applied to the index as usual.
+
+Only CSV reports are supported (``ORC`` and ``Parquet`` reports need
+readers that are not available here and are rejected).
+"""
+from __future__ import with_statement
+
+import csv
+import gzip
+import json
+import os
+import urllib
+
+from cloud_browser.common import SEP, dt_from_rfc8601
+
+
+###############################################################################
+# Constants
+###############################################################################
+#: Supported report file formats.
+FORMATS = frozenset(('CSV',))
+
+
+def _parent(name):
+    """Return parent directory name of key name."""
+    return name.rpartition(SEP)[0]
+
+
+###############################################################################
+# Functions
+###############################################################################
+def read_manifest(path):
+    """Return manifest of inventory report.
+
+    :raises: ``ValueError`` for unsupported or invalid reports.
+    :rtype: ``dict``
+    """
+    with open(path, 'rb') as file_obj:
+        manifest = json.load(file_obj)
+
+    file_format = manifest.get('fileFormat', 'CSV')
+    if file_format not in FORMATS:
+        raise ValueError("Unsupported inventory format: %s (supported: %s)" %
+                         (file_format, ", ".join(sorted(FORMATS))))
+
+    manifest['fields'] = [x.strip() for x in manifest['fileSchema'].split(',')]
+    if 'Key' not in manifest['fields']:
+        raise ValueError("Inventory schema has no Key field: %s" %
+                         manifest['fileSchema'])
+
+    return manifest
+
+
+def data_file_path(manifest_path, key, data_dir=None):
+    """Return local path of report data file ``key``.
+
+    Data files are looked up by name in ``data_dir``, in the ``data``
+    directory of the inventory configuration (the layout of a synced
+    report) and next to the manifest.
+    """
+    name = key.rpartition(SEP)[2]
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    candidates = [os.path.join(manifest_dir, os.pardir, 'data', name),
+                  os.path.join(manifest_dir, name)]
+    if data_dir is not None:
+        candidates.insert(0, os.path.join(data_dir, name))
+
+    for path in candidates:
+        if os.path.exists(path):
+            return os.path.normpath(path)
+
+    raise ValueError("Inventory data file not found: %s" % key)
+
+
+def read_records(path, fields):
+    """Yield ``(key, size, last_modified, etag)`` of current objects in
+    report data file.
+
+    Noncurrent versions and delete markers (of versioned reports) are
+    skipped.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as file_obj:
+        for values in csv.reader(file_obj):
+            record = dict(zip(fields, values))
+            if record.get('IsLatest', 'true') != 'true' or \
+                    record.get('IsDeleteMarker', 'false') == 'true':
+                continue
+
+            # Keys are URL-encoded.
+            key = urllib.unquote_plus(record['Key']).decode('utf-8')
+            size = int(record['Size']) if record.get('Size') else 0
+            last_modified = dt_from_rfc8601(record['LastModifiedDate']) \
+                if record.get('LastModifiedDate') else None
+            yield key, size, last_modified, record.get('ETag') or None
+
+
+def index_rows(container_name, records):
+    """Yield metadata index rows of inventory records, including a row for
+    every (implied) directory.
+    """
+    directories = set()
+    for key, size, last_modified, etag in records:
+        name = key.strip(SEP)
+        if not name:
+            continue
+
+        parent = _parent(name)
+        missing = []
+        while parent and parent not in directories:
+            missing.append(parent)
+            parent = _parent(parent)
+        for dir_name in reversed(missing):
+            directories.add(dir_name)
+            yield (container_name, _parent(dir_name), dir_name, 1, 0, None,
+                   None, None)
+
+        if key.endswith(SEP):
+            # Directory placeholder key.
+            if name not in directories:
+                directories.add(name)
+                yield (container_name, _parent(name), name, 1, 0, None, None,
+                       None)
+        else:
+            yield (container_name, _parent(name), name, 0, size, None,
+                   last_modified, etag)
+
+
+def import_report(index, manifest_path, container_name=None, data_dir=None):
+    """Replace indexed objects of container with an inventory report.
+
+    :param index: :class:`cloud_browser.cloud.index.MetadataIndex`.
+    :param manifest_path: Path of the report ``manifest.json``.
+    :param container_name: Container name, defaults to the source bucket.
+    :param data_dir: Directory of the report data files (see
+        :func:`data_file_path`).
+
+    :return: ``(container_name, count)`` tuple.
+    """
+    manifest = read_manifest(manifest_path)
+    container_name = container_name or manifest['sourceBucket']
+    paths = [data_file_path(manifest_path, x['key'], data_dir)
+             for x in manifest['files']]
+
+    def records():
+        """Yield records of all data files."""
+        for path in paths:
+            for record in read_records(path, manifest['fields']):
+                yield record
+
+    created = int(manifest['creationTimestamp']) / 1000.0
+    count = index.load(container_name,
+                       index_rows(container_name, records()), created)
+    return container_name, count
@@ -0,0 +1,92 @@
+"""Progress journal for resumable multi-object operations.
+
+Recursive renames and deletes remove every source key as they commit it, so
+running an interrupted operation again simply lists the keys that are left
+and only does the remaining work. The journal carries the progress of the
+interrupted run over to the new one: after every committed key (or batch
+of keys), the operation records its counts in a small JSON file, and the
+next identical operation starts its progress from there. The journal is
+removed once the operation completes.
+
+Journals older than ``CLOUD_BROWSER_JOB_TTL`` seconds (e.g., left behind by
+a run that crashed long ago) are ignored.
+
+Journaling is switched on by pointing ``CLOUD_BROWSER_JOURNAL_DIR`` at a
+writable directory (shared between servers, if there are several).
+"""
+from __future__ import with_statement
+
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from cloud_browser.app_settings import settings
+
+
+class Journal(object):
+    """Progress journal of a single operation.
+
+    :param path: Journal file path, or ``None`` for a no-op journal.
+    """
+
+    def __init__(self, path=None):
+        """Initializer."""
+        self.path = path
+        self.started = time.time()
+        self.done = 0
+        self.size = 0
+
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as file_obj:
+                state = json.load(file_obj)
+            if state.get('started', 0) + settings.CLOUD_BROWSER_JOB_TTL > \
+                    self.started:
+                self.started = state['started']
+                self.done = state['done']
+                self.size = state['size']
+
+    @classmethod
+    def open(cls, container, operation, *args):
+        """Return journal of operation on container.
+
+        The journal is identified by the datastore, container, operation
+        and its arguments.
+
+        :rtype: :class:`Journal`
+        """
+        journal_dir = settings.CLOUD_BROWSER_JOURNAL_DIR
+        if not journal_dir:
+            return cls()
+
+        ident = json.dumps([type(container).__name__, container.name,
+                            operation] + list(args))
+        name = "%s.json" % hashlib.sha1(ident.encode('utf-8')).hexdigest()
+        return cls(os.path.join(journal_dir, name))
+
+    @property
+    def resumed(self):
+        """Is this operation resumed from a checkpoint?"""
+        return self.done > 0
+
+    def checkpoint(self, done, size):
+        """Record progress after a committed key or batch of keys.
+
+        The file is replaced atomically, so a crash leaves either the
+        previous or the new checkpoint.
+        """
+        self.done, self.size = done, size
+        if self.path is None:
+            return
+
+        tmp_path = "%s.%s.tmp" % (self.path, uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as file_obj:
+            json.dump({'started': self.started, 'done': done, 'size': size},
+                      file_obj)
+        os.rename(tmp_path, self.path)
+
+    def complete(self):
+        """Remove journal of a finished operation."""
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
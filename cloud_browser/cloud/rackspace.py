@@ -9,7 +9,7 @@
 """
 
 from cloud_browser.app_settings import settings
-from cloud_browser.cloud import errors, base
+from cloud_browser.cloud import errors, base, singleflight
 from cloud_browser.common import SEP, check_version, requires, dt_from_header
 
 
@@ -72,6 +72,16 @@ class RackspaceObject(base.CloudObject):
         """Return contents of object."""
         return self.native_obj.read()
 
+    def read_iter(self, chunk_size=None):
+        """Yield contents of object in chunks.
+
+        Contents are streamed from a single ``GET`` request, so memory use
+        does not grow with the object size.
+        """
+        chunk_size = chunk_size or settings.CLOUD_BROWSER_READ_CHUNK_SIZE
+        for chunk in self.native_obj.stream(chunksize=chunk_size):
+            yield chunk
+
     @classmethod
     def from_info(cls, container, info_obj):
         """Create from subdirectory or file info object."""
@@ -101,6 +111,7 @@ class RackspaceObject(base.CloudObject):
                    size=info_obj['bytes'],
                    content_type=info_obj['content_type'],
                    last_modified=dt_from_header(info_obj['last_modified']),
+                   etag=info_obj.get('hash'),
                    obj_type=cls.choose_type(info_obj['content_type']))
 
     @classmethod
@@ -124,16 +135,7 @@ class RackspaceContainer(base.CloudContainer):
     wrap_rs_errors = RackspaceExceptionWrapper()
 
     #: Maximum number of objects that can be listed or ``None``.
-    #:
-    #: Enforced Rackspace maximums. We need a lower max. to be enforced on
-    #: the input end because under the hood, we can try subsequent larger
-    #: queries if we have marker or psuedo/dummy directory clashes.
-    #:
-    #: Specifically, we need to add one to the query to detect a
-    #: pseudo-directory matching the marker, and double the limit for a
-    #: follow-on query if we have both dummy and pseudo-directory objects
-    #: in results.
-    max_list = (RS_MAX_LIST_OBJECTS_LIMIT - 1) / 2
+    max_list = RS_MAX_LIST_OBJECTS_LIMIT
 
     @wrap_rs_errors
     def _get_container(self):
@@ -141,9 +143,28 @@ class RackspaceContainer(base.CloudContainer):
         return self.conn.native_conn.get_container(self.name)
 
     @wrap_rs_errors
-    def get_objects(self, path, marker=None,
-                    limit=settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT):
-        """Get objects.
+    def _get_page(self, path, marker, limit):
+        """Return a page of objects."""
+        prefix = path + SEP if path else ''
+        object_infos = self.native_container.list_objects_info(
+            limit=limit, delimiter=SEP, prefix=prefix, marker=marker)
+
+        next_marker = None
+        if len(object_infos) == limit:
+            next_marker = object_infos[-1].get('name',
+                                               object_infos[-1].get('subdir'))
+
+        return [self.obj_cls.from_info(self, x) for x in object_infos], \
+            next_marker
+
+    def listing_stages(self):
+        """Return filter stages of directory listings."""
+        return super(RackspaceContainer, self).listing_stages() + \
+            [self._collapse]
+
+    @staticmethod
+    def _collapse(objs, path, marker):
+        """Remove duplicate dummy / implied objects.
 
         **Pseudo-directory Notes**: Rackspace has two approaches to pseudo-
         directories within the (really) flat storage object namespace:
@@ -161,77 +182,30 @@ class RackspaceContainer(base.CloudContainer):
         ambiguous situation where there is both a dummy directory storage
         object and an implied subdirectory. To remedy this situation, we only
         show information for the dummy directory object in results if present,
-        and ignore the implied subdirectory. But, under the hood this means
-        that our `limit` parameter may end up with less than the desired
-        number of objects. So, we use the heuristic that if we **do** have
-        "application/directory" objects, we end up doing an extra query of
-        double the limit size to ensure we can get up to the limit amount
-        of objects. This double query approach is inefficient, but as
-        using dummy objects should now be deprecated, the second query should
-        only rarely occur.
-
+        and ignore the implied subdirectory, which is listed right after it.
         """
-        object_infos, full_query = self._get_object_infos(path, marker, limit)
-        if full_query and len(object_infos) < limit:
-            # The underlying query returned a full result set, but we
-            # truncated it to under limit. Re-run at twice the limit and then
-            # slice back.
-            object_infos, _ = self._get_object_infos(path, marker, 2*limit)
-            object_infos = object_infos[:limit]
-
-        return [self.obj_cls.from_info(self, x) for x in object_infos]
-
-    @wrap_rs_errors
-    def _get_object_infos(self, path, marker=None,
-                          limit=settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT):
-        """Get raw object infos (single-shot)."""
-        # Adjust limit to +1 to handle marker object as first result.
-        # We can get in to this situation for a marker of "foo", that will
-        # still return a 'subdir' object of "foo/" because of the extra
-        # slash.
-        orig_limit = limit
-        limit += 1
-
-        # Enforce maximum object size.
-        if limit > RS_MAX_LIST_OBJECTS_LIMIT:
-            raise errors.CloudException("Object limit must be less than %s" %
-                                        RS_MAX_LIST_OBJECTS_LIMIT)
-
-        def _collapse(infos):
-            """Remove duplicate dummy / implied objects."""
-            name = None
-            for info in infos:
-                name = info.get('name', name)
-                subdir = info.get('subdir', '').strip(SEP)
-                if not name or subdir != name:
-                    yield info
-
-        path = path + SEP if path else ''
-        object_infos = self.native_container.list_objects_info(
-            limit=limit, delimiter=SEP, prefix=path, marker=marker)
-
-        full_query = len(object_infos) == limit
-        if object_infos:
-            # Check first object for marker match and truncate if so.
-            if (marker and
-                    object_infos[0].get('subdir', '').strip(SEP) == marker):
-                object_infos = object_infos[1:]
-
-            # Collapse subdirs and dummy objects.
-            object_infos = list(_collapse(object_infos))
-
-            # Adjust to original limit.
-            if len(object_infos) > orig_limit:
-                object_infos = object_infos[:orig_limit]
-
-        return object_infos, full_query
-
+        # pylint: disable=unused-argument
+        name = None
+        for obj in objs:
+            if obj.name != name:
+                yield obj
+            name = obj.name
+
+    @singleflight.coalesced
     @wrap_rs_errors
     def get_object(self, path):
         """Get single object."""
         obj = self.native_container.get_object(path)
         return self.obj_cls.from_obj(self, obj)
 
+    @wrap_rs_errors
+    def _probe(self, path):
+        """Return ``True`` if there are objects whose name start with
+        ``path`` (lists at most one object).
+        """
+        return len(self.native_container.list_objects_info(
+            limit=1, prefix=path)) > 0
+
 
 class RackspaceConnection(base.CloudConnection):
     """Rackspace connection wrapper."""
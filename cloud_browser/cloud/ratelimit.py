@@ -0,0 +1,179 @@
+"""Adaptive rate limiting of boto datastore requests.
+
+S3 answers request rates above what a bucket (prefix) sustains with
+``503 SlowDown``. Every request of a boto connection passes through a
+per-process token bucket per endpoint and bucket. The bucket rate adapts
+AIMD-style (additive increase, multiplicative decrease): each successful
+request raises the rate a little, up to ``CLOUD_BROWSER_RATE_LIMIT``, and a
+``503`` response halves it. Throttled requests are retried after a jittered
+exponential backoff, so long-running operations (recursive renames and
+deletes, bulk operations) settle at the rate the bucket allows instead of
+failing partway.
+
+Rate limiting is switched on by default and disabled by setting
+``CLOUD_BROWSER_RATE_LIMIT`` to ``None``.
+"""
+import random
+import threading
+import time
+
+from cloud_browser.app_settings import settings
+
+
+###############################################################################
+# Constants
+###############################################################################
+#: Throttling response status.
+THROTTLED_STATUS = 503
+
+#: Minimum rate (requests per second).
+MIN_RATE = 1.0
+
+#: Rate increase (requests per second) per second of successful requests.
+ADDITIVE_INCREASE = 10.0
+
+#: Rate factor on throttling.
+MULTIPLICATIVE_DECREASE = 0.5
+
+#: Maximum retry backoff in seconds.
+MAX_BACKOFF = 20.0
+
+
+###############################################################################
+# Classes
+###############################################################################
+class Limiter(object):
+    """Thread-safe token bucket with AIMD rate adaptation.
+
+    The bucket holds at most one second's worth of tokens.
+
+    :param max_rate: Maximum (and initial) rate in requests per second.
+    """
+
+    def __init__(self, max_rate):
+        """Initializer."""
+        self.max_rate = float(max_rate)
+        self.rate = self.max_rate
+        self.tokens = self.rate
+        self.stamp = time.time()
+        self.decreased = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting for one if the bucket is empty.
+
+        :return: Time the request may be issued.
+        """
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.rate, self.tokens +
+                              (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate)
+
+        if wait:
+            time.sleep(wait)
+        return now + wait
+
+    def succeeded(self):
+        """Additively increase rate after a successful request."""
+        with self.lock:
+            self.rate = min(self.max_rate,
+                            self.rate + ADDITIVE_INCREASE / self.rate)
+
+    def throttled(self, issued):
+        """Multiplicatively decrease rate after a throttled request.
+
+        Requests issued before the last decrease were sent at the previous
+        rate, so their throttling does not decrease the rate again.
+
+        :param issued: Time the throttled request was issued.
+        """
+        with self.lock:
+            if issued < self.decreased:
+                return
+
+            self.rate = max(MIN_RATE, self.rate * MULTIPLICATIVE_DECREASE)
+            self.tokens = min(self.tokens, 0.0)
+            self.decreased = time.time()
+
+
+###############################################################################
+# Functions
+###############################################################################
+#: Process-wide limiters by endpoint and bucket.
+LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_limiter(host, port, bucket_name):
+    """Return process-wide limiter of bucket at endpoint.
+
+    :rtype: :class:`Limiter`
+    """
+    key = (host, port, bucket_name)
+    with _LIMITERS_LOCK:
+        limiter = LIMITERS.get(key)
+        if limiter is None:
+            limiter = LIMITERS[key] = \
+                Limiter(settings.CLOUD_BROWSER_RATE_LIMIT)
+
+    return limiter
+
+
+def backoff(attempt):
+    """Return jittered ("full jitter") backoff of retry ``attempt``.
+
+    :param attempt: Zero-based retry number.
+    """
+    ceiling = min(MAX_BACKOFF,
+                  settings.CLOUD_BROWSER_RATE_BACKOFF * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def limit_connection(native_conn):
+    """Pass all requests of boto connection through limiters.
+
+    Throttled responses are retried through the ``retry_handler`` hook of
+    boto's request loop, ahead of boto's own (non-adaptive) retries.
+
+    :param native_conn: Native boto connection.
+    :return: The connection.
+    """
+    make_request = native_conn.make_request
+
+    def limited(*args, **kwargs):
+        """Rate limited ``make_request``."""
+        if settings.CLOUD_BROWSER_RATE_LIMIT is None:
+            return make_request(*args, **kwargs)
+
+        bucket = args[1] if len(args) > 1 else kwargs.get('bucket', '')
+        limiter = get_limiter(native_conn.host, native_conn.port,
+                              getattr(bucket, 'name', bucket))
+        retries = settings.CLOUD_BROWSER_RATE_RETRIES
+        state = {'attempt': 0, 'issued': limiter.acquire()}
+        other_handler = kwargs.get('retry_handler')
+
+        def retry_handler(response, i, next_sleep):
+            """Retry throttled responses after backoff."""
+            if response.status != THROTTLED_STATUS:
+                limiter.succeeded()
+            else:
+                limiter.throttled(state['issued'])
+                if state['attempt'] < retries:
+                    response.read()
+                    time.sleep(backoff(state['attempt']))
+                    state['attempt'] += 1
+                    state['issued'] = limiter.acquire()
+                    return "Throttled, retrying.", i, 0
+
+            if callable(other_handler):
+                return other_handler(response, i, next_sleep)
+            return None
+
+        kwargs['retry_handler'] = retry_handler
+        return make_request(*args, **kwargs)
+
+    native_conn.make_request = limited
+    return native_conn
@@ -0,0 +1,109 @@
+"""Request coalescing ("single-flight") for identical datastore calls.
+
+When many requests list the same directory at the same moment, each of them
+would issue the same backend call. With single-flight, concurrent identical
+calls within a process wait on the one call already in flight and share its
+result (or exception), so a thundering herd collapses to one upstream
+request. Calls are only coalesced while in flight; nothing is cached.
+
+Listed objects are shared by the coalesced callers. Their metadata, looked up
+on first access (e.g., :attr:`BotoObject.modified_by
+<cloud_browser.cloud.boto_base.BotoObject.modified_by>`), is loaded once per
+object under a lock, so the callers rendering the same page share those
+lookups, too.
+
+Coalescing is switched on by default and can be disabled with
+``CLOUD_BROWSER_SINGLEFLIGHT``.
+"""
+import sys
+import threading
+
+from functools import wraps
+
+from cloud_browser.app_settings import settings
+
+
+class _Call(object):
+    """Call in flight."""
+
+    def __init__(self):
+        """Initializer."""
+        self.event = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class Group(object):
+    """Group of in-flight calls by key."""
+
+    def __init__(self):
+        """Initializer."""
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """Call ``function`` unless a call for ``key`` is already in flight,
+        in which case wait for and return its result.
+
+        :return: ``(result, shared)`` tuple, ``shared`` is ``True`` if the
+            result came from another caller's call.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.exc_info is not None:
+                exc_type, exc_value, exc_tb = call.exc_info
+                raise exc_type, exc_value, exc_tb
+            return call.result, True
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception:
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+        return call.result, False
+
+
+#: Process-wide group.
+GROUP = Group()
+
+
+def coalesced(method):
+    """Decorator coalescing concurrent identical calls of a datastore
+    method.
+
+    Calls are identified by the datastore class, the container name (if
+    any), the method name and the arguments. Followers get a copy of list
+    results so that they can be modified independently; the listed objects
+    are shared.
+    """
+
+    @wraps(method)
+    def wrapped(self, *args, **kwargs):
+        """Wrapped method."""
+        if not settings.CLOUD_BROWSER_SINGLEFLIGHT:
+            return method(self, *args, **kwargs)
+
+        key = (type(self).__name__, getattr(self, 'name', None),
+               method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+
+        result, shared = GROUP.do(key, method, self, *args, **kwargs)
+        if shared and isinstance(result, list):
+            result = list(result)
+        return result
+
+    return wrapped
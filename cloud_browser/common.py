@@ -4,6 +4,7 @@ Because cloud operations are OS agnostic, we don't use any of :mod:`os` or
 :mod:`os.path`.
 """
 from datetime import datetime
+from functools import wraps
 from django.core.exceptions import ImproperlyConfigured
 
 
@@ -40,6 +41,34 @@ def get_int(value, default, test_fn=None):
     return converted if test_fn(converted) else default
 
 
+def lazy_view(path, **initkwargs):
+    """Return view function importing view ``path`` on first call.
+
+    Keeps URL configurations from importing view modules (and, through
+    them, datastore libraries) at startup. Class-based views are set up with
+    ``as_view(**initkwargs)``.
+
+    :param path: Fully-qualified view function or class path.
+    """
+    cache = []
+
+    def view(request, *args, **kwargs):
+        """Import and call view."""
+        if not cache:
+            from django.utils.importlib import import_module
+
+            mod_str, _, view_str = path.rpartition('.')
+            view_obj = getattr(import_module(mod_str), view_str)
+            if hasattr(view_obj, 'as_view'):
+                view_obj = view_obj.as_view(**initkwargs)
+            cache.append(view_obj)
+
+        return cache[0](request, *args, **kwargs)
+
+    view.__name__ = path.rpartition('.')[2]
+    return view
+
+
 def check_version(mod, required):
     """Require minimum version of module using ``__version__`` member."""
     vers = tuple(int(v) for v in mod.__version__.split('.')[:3])
@@ -65,9 +94,15 @@ def requires(module, name=""):
     """
     def wrapped(method):
         """Call and enforce method."""
-        if module is None:
-            raise ImproperlyConfigured("Module '%s' is not installed." % name)
-        return method
+        @wraps(method)
+        def enforced(*args, **kwargs):
+            """Enforce module presence, then call method."""
+            if module is None:
+                raise ImproperlyConfigured(
+                    "Module '%s' is not installed." % name)
+            return method(*args, **kwargs)
+
+        return enforced
 
     return wrapped
 
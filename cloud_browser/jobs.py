@@ -0,0 +1,291 @@
+"""Background jobs for long-running datastore operations.
+
+Recursive deletes, renames and moves can touch thousands of keys, which is
+far too slow to do inside an HTTP request. Instead, views submit a
+:class:`Job` which runs in a pool of worker threads and returns right away.
+
+Job state (including progress: objects done / total, bytes and an ETA) is
+kept in the Django cache so that it can be polled through the
+``cloud_browser_job`` view. With more than one server process, use a shared
+cache backend (e.g., memcached) so every process sees every job.
+
+Worker pools keep a heartbeat in the cache. Unfinished jobs of a pool whose
+heartbeat is gone (e.g., after a server restart) are marked as failed when
+read, rather than showing as running until their state expires.
+
+Setting ``CLOUD_BROWSER_JOB_WORKERS`` to ``0`` runs jobs synchronously
+within the submitting request instead.
+"""
+import Queue
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+from cloud_browser.app_settings import settings
+from cloud_browser.cloud import get_connection, errors, index
+
+LOGGER = logging.getLogger(__name__)
+
+#: Job states.
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+#: Container operations that can be run as a job.
+OPERATIONS = frozenset(('delete', 'rename', 'move'))
+
+#: Minimum seconds between progress saves.
+PROGRESS_INTERVAL = 0.5
+
+#: Seconds between heartbeats of worker pools.
+HEARTBEAT_INTERVAL = 10
+
+
+###############################################################################
+# Jobs.
+###############################################################################
+def _cache_key(job_id):
+    """Return cache key for job."""
+    return "cloud_browser.job.%s" % job_id
+
+
+def _heartbeat_key(worker):
+    """Return cache key for worker pool heartbeat."""
+    return "cloud_browser.job_worker.%s" % worker
+
+
+class Job(object):
+    """Container operation run in the background.
+
+    :param operation: Container method name (one of :data:`OPERATIONS`).
+    :param container_name: Container name.
+    :param kwargs: Keyword arguments for the container method.
+    :param description: Human readable description.
+    """
+
+    def __init__(self, operation, container_name, kwargs, description=None):
+        """Initializer."""
+        if operation not in OPERATIONS:
+            raise ValueError("Unknown job operation: %s" % operation)
+
+        self.id = uuid.uuid4().hex  # pylint: disable=invalid-name
+        self.operation = operation
+        self.container_name = container_name
+        self.kwargs = kwargs
+        self.description = description or operation
+        self.state = QUEUED
+        self.done = 0
+        self.total = None
+        self.size = 0
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.worker = None
+        self._saved = 0.0
+
+    def __getstate__(self):
+        """Pickle state."""
+        state = self.__dict__.copy()
+        state.pop('_saved', None)
+        return state
+
+    def __setstate__(self, state):
+        """Unpickle state."""
+        self.__dict__.update(state)
+        self._saved = 0.0
+
+    @classmethod
+    def get(cls, job_id):
+        """Return stored job (or ``None`` if unknown or expired).
+
+        Unfinished jobs of a worker pool without heartbeat are marked as
+        failed.
+
+        :rtype: :class:`Job`
+        """
+        job = cache.get(_cache_key(job_id))
+        if job is not None and not job.is_finished and \
+                job.worker is not None and \
+                cache.get(_heartbeat_key(job.worker)) is None:
+            job.state = FAILED
+            job.error = "Job was interrupted."
+            job.finished = time.time()
+            job.save()
+        return job
+
+    def save(self):
+        """Store job state."""
+        self._saved = time.time()
+        cache.set(_cache_key(self.id), self, settings.CLOUD_BROWSER_JOB_TTL)
+
+    @property
+    def is_finished(self):
+        """Has the job finished (successfully or not)?"""
+        return self.state in (DONE, FAILED)
+
+    @property
+    def eta(self):
+        """Estimated seconds to completion (or ``None`` if unknown)."""
+        if self.state != RUNNING or not self.done or not self.total:
+            return None
+
+        elapsed = time.time() - self.started
+        return elapsed / self.done * max(self.total - self.done, 0)
+
+    def progress(self, done, total, size):
+        """Progress callback for the container operation."""
+        self.done, self.total, self.size = done, total, size
+        if time.time() - self._saved >= PROGRESS_INTERVAL:
+            self.save()
+
+    def run(self):
+        """Run the operation and store the outcome."""
+        self.state = RUNNING
+        self.started = time.time()
+        self.save()
+
+        try:
+            container = get_connection().get_container(self.container_name)
+            getattr(container, self.operation)(progress=self.progress,
+                                               **self.kwargs)
+            index.record(self.container_name, self.operation, **self.kwargs)
+            self.state = DONE
+        except errors.NoObjectException as error:
+            self.state = FAILED
+            self.error = "Object does not exist."
+            LOGGER.warning("Job '%s' failed: %s", self.description, error)
+        except errors.CloudException as error:
+            self.state = FAILED
+            self.error = unicode(error)
+            LOGGER.warning("Job '%s' failed: %s", self.description, error)
+        except Exception as error:  # pylint: disable=broad-except
+            self.state = FAILED
+            self.error = unicode(error)
+            LOGGER.exception("Job '%s' failed.", self.description)
+
+        if self.state == FAILED:
+            index.invalidate(self.container_name, self.operation,
+                             **self.kwargs)
+
+        self.finished = time.time()
+        self.save()
+
+    def as_dict(self):
+        """Return structured (JSON-serializable) representation."""
+        eta = self.eta
+        return {
+            'id': self.id,
+            'operation': self.operation,
+            'description': self.description,
+            'state': self.state,
+            'done': self.done,
+            'total': self.total,
+            'size': self.size,
+            'eta': round(eta, 1) if eta is not None else None,
+            'error': self.error,
+        }
+
+
+###############################################################################
+# Workers.
+###############################################################################
+class WorkerPool(object):
+    """Pool of daemon threads running queued jobs."""
+
+    def __init__(self, size):
+        """Initializer."""
+        self.size = size
+        self.queue = Queue.Queue()
+        self.threads = []
+        self.pid = os.getpid()
+        self.worker = uuid.uuid4().hex
+        self.lock = threading.Lock()
+
+    def _work(self):
+        """Worker loop."""
+        while True:
+            job = self.queue.get()
+            try:
+                job.run()
+            finally:
+                self.queue.task_done()
+
+    def _beat(self):
+        """Refresh heartbeat."""
+        cache.set(_heartbeat_key(self.worker), True, HEARTBEAT_INTERVAL * 3)
+
+    def _heartbeat(self):
+        """Heartbeat loop."""
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            self._beat()
+
+    def submit(self, job):
+        """Queue job, starting worker threads on first use."""
+        with self.lock:
+            if not self.threads:
+                self._beat()
+                thread = threading.Thread(target=self._heartbeat,
+                                          name="cloud-browser-job-heartbeat")
+                thread.daemon = True
+                thread.start()
+            while len(self.threads) < self.size:
+                thread = threading.Thread(target=self._work,
+                                          name="cloud-browser-job-worker")
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+
+        job.worker = self.worker
+        job.save()
+        self.queue.put(job)
+
+    def join(self):
+        """Block until all queued jobs are finished."""
+        self.queue.join()
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool():
+    """Return the worker pool of the current process.
+
+    A pool inherited through ``fork()`` has no running threads, so a new one
+    is created per process.
+
+    :rtype: :class:`WorkerPool`
+    """
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is None or _POOL.pid != os.getpid():
+            _POOL = WorkerPool(settings.CLOUD_BROWSER_JOB_WORKERS)
+        return _POOL
+
+
+def submit(operation, container_name, description=None, **kwargs):
+    """Create and queue (or, without workers, run) a job.
+
+    :param operation: Container method name (one of :data:`OPERATIONS`).
+    :param container_name: Container name.
+    :param description: Human readable description.
+    :param kwargs: Keyword arguments for the container method.
+
+    :rtype: :class:`Job`
+    """
+    job = Job(operation, container_name, kwargs, description)
+
+    if settings.CLOUD_BROWSER_JOB_WORKERS:
+        get_pool().submit(job)
+    else:
+        job.save()
+        job.run()
+
+    return job
@@ -0,0 +1,89 @@
+"""Crawl containers (or import inventory reports) into the metadata
+index.
+"""
+import time
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cloud_browser.cloud import errors, get_connection, inventory
+from cloud_browser.cloud.index import get_index
+
+
+class Command(BaseCommand):
+    """Crawl containers into the metadata index.
+
+    Usage::
+
+        $ python manage.py cloud_browser_index bucket1 bucket2
+        $ python manage.py cloud_browser_index --all
+        $ python manage.py cloud_browser_index --drop bucket1
+
+    or import an S3 Inventory report (see
+    :mod:`cloud_browser.cloud.inventory`) instead of crawling::
+
+        $ python manage.py cloud_browser_index --inventory=manifest.json
+    """
+    args = "<container container ...>"
+    help = "Crawls containers into the metadata index " \
+           "(CLOUD_BROWSER_INDEX_PATH)."
+    option_list = BaseCommand.option_list + (
+        make_option("--all", action='store_true', dest='all', default=False,
+                    help="Crawl all (permitted) containers."),
+        make_option("--drop", action='store_true', dest='drop',
+                    default=False,
+                    help="Remove containers from the index instead."),
+        make_option("--inventory", dest='inventory', default=None,
+                    help="Import S3 Inventory report (manifest.json path) "
+                         "into the container (default: the source bucket)."),
+        make_option("--inventory-data", dest='inventory_data', default=None,
+                    help="Directory of the inventory report data files."),
+    )
+
+    def handle(self, *args, **options):
+        """Handle command."""
+        index = get_index()
+        if index is None:
+            raise CommandError("CLOUD_BROWSER_INDEX_PATH is not set.")
+
+        if options['inventory']:
+            self._import(index, options['inventory'],
+                         args[0] if args else None, options['inventory_data'])
+            return
+
+        conn = get_connection()
+        if options['all']:
+            names = [container.name for container in conn.get_containers()]
+        elif args:
+            names = args
+        else:
+            raise CommandError("Name containers or use --all.")
+
+        for name in names:
+            if options['drop']:
+                index.drop(name)
+                self.stdout.write("Dropped '%s'." % name)
+                continue
+
+            try:
+                container = conn.get_container(name)
+            except errors.CloudException as error:
+                raise CommandError("No container '%s': %s" % (name, error))
+
+            start = time.time()
+            count = index.crawl(container)
+            self.stdout.write("Indexed %d objects of '%s' in %.1fs." %
+                              (count, name, time.time() - start))
+
+    def _import(self, index, manifest_path, container_name, data_dir):
+        """Import inventory report."""
+        start = time.time()
+        try:
+            container_name, count = inventory.import_report(
+                index, manifest_path, container_name, data_dir)
+        except (IOError, ValueError, KeyError) as error:
+            raise CommandError("Unable to import inventory: %s" % error)
+
+        self.stdout.write("Imported %d objects of '%s' in %.1fs." %
+                          (count, container_name, time.time() - start))
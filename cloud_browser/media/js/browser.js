@@ -61,5 +61,181 @@ var CloudBrowser = {
         var queryObj = CloudBrowser.getQueryObj(query);
         queryObj.params[key] = value;
         return CloudBrowser.toQueryString(queryObj);
+    },
+    /** Format background job status. */
+    formatJob: function (job) {
+        var text = job.description + ': ' + job.state;
+        if (job.total !== null) {
+            text += ' (' + job.done + '/' + job.total + ' objects';
+            if (job.eta !== null) {
+                text += ', about ' + Math.ceil(job.eta) + 's left';
+            }
+            text += ')';
+        }
+        if (job.error !== null) {
+            text += ' - ' + job.error;
+        }
+        return text;
+    },
+    /** Poll background job status (requires jQuery) until finished. */
+    pollJob: function (elementId, url, interval) {
+        interval = interval || 1000;
+        $.getJSON(url, function (job) {
+            $('#' + elementId).text(CloudBrowser.formatJob(job));
+            if (job.state === 'done' || job.state === 'failed') {
+                $('#' + elementId).addClass('cb-job-' + job.state);
+            } else {
+                setTimeout(function () {
+                    CloudBrowser.pollJob(elementId, url, interval);
+                }, interval);
+            }
+        });
+    },
+    /**
+     * Upload the file of a form directly to the datastore in parts
+     * (requires jQuery and XMLHttpRequest level 2).
+     *
+     * The server initiates the upload and presigns part URLs. Parts are
+     * uploaded a few at a time, a failed part is retried (with a freshly
+     * signed URL) after an exponential backoff. Finally the server completes
+     * the upload and the page is redirected; on failure the upload is
+     * aborted.
+     */
+    upload: function (formId) {
+        var form = $('#' + formId);
+        var file = form.find('input[type=file]')[0].files[0];
+        var status = form.find('.cloud-browser-upload-status');
+        if (!file) {
+            return false;
+        }
+
+        var url = form.attr('action');
+        var key = form.find('input[name=wd_path]').val() + file.name;
+        var post = function (action, data) {
+            return $.post(url, $.extend({
+                action: action,
+                key: key,
+                container_name: form.find('input[name=container_name]').val(),
+                csrfmiddlewaretoken:
+                    form.find('input[name=csrfmiddlewaretoken]').val()
+            }, data), null, 'json');
+        };
+        var fail = function (upload, message) {
+            status.text('Upload failed: ' + message);
+            form.find('input[type=submit]').prop('disabled', false);
+            if (upload) {
+                post('abort', {upload_id: upload.upload_id});
+            }
+        };
+
+        form.find('input[type=submit]').prop('disabled', true);
+        status.text('Starting upload...');
+
+        post('initiate', {size: file.size, content_type: file.type})
+            .fail(function (xhr) {
+                fail(null, CloudBrowser.uploadError(xhr));
+            })
+            .done(function (upload) {
+                CloudBrowser.uploadParts(file, upload, post, status,
+                    function (error) {
+                        if (error) {
+                            return fail(upload, error);
+                        }
+                        post('complete', {
+                            upload_id: upload.upload_id,
+                            part_count: upload.part_count
+                        }).fail(function (xhr) {
+                            fail(upload, CloudBrowser.uploadError(xhr));
+                        }).done(function (result) {
+                            window.location = result.redirect;
+                        });
+                    });
+            });
+
+        return false;
+    },
+    /** Upload all parts, then call ``done`` (with an error, if any). */
+    uploadParts: function (file, upload, post, status, done) {
+        var next = 1;
+        var running = 0;
+        var failed = false;
+        var loaded = {};
+
+        var report = function () {
+            var total = 0;
+            for (var number in loaded) {
+                if (loaded.hasOwnProperty(number)) {
+                    total += loaded[number];
+                }
+            }
+            status.text('Uploading: ' +
+                (file.size ? Math.floor(100 * total / file.size) : 100) + '%');
+        };
+
+        var start = function () {
+            while (!failed && running < upload.workers &&
+                    next <= upload.part_count) {
+                running += 1;
+                sendPart(next, 0);
+                next += 1;
+            }
+            if (!failed && running === 0) {
+                done(null);
+            }
+        };
+
+        var sendPart = function (number, attempt) {
+            var retry = function (error) {
+                loaded[number] = 0;
+                if (failed) {
+                    return;
+                }
+                if (attempt >= upload.retries) {
+                    failed = true;
+                    return done(error);
+                }
+                setTimeout(function () {
+                    sendPart(number, attempt + 1);
+                }, 1000 * Math.pow(2, attempt) * (0.5 + Math.random() / 2));
+            };
+
+            post('sign', {upload_id: upload.upload_id, part_numbers: number})
+                .fail(function (xhr) {
+                    retry(CloudBrowser.uploadError(xhr));
+                })
+                .done(function (result) {
+                    // A sliced blob has no type, so no (unsigned)
+                    // Content-Type header is sent.
+                    var begin = (number - 1) * upload.part_size;
+                    var xhr = new XMLHttpRequest();
+                    xhr.open('PUT', result.urls[number]);
+                    xhr.upload.onprogress = function (event) {
+                        loaded[number] = event.loaded;
+                        report();
+                    };
+                    xhr.onload = function () {
+                        if (xhr.status < 200 || xhr.status >= 300) {
+                            return retry('part ' + number + ': HTTP ' +
+                                         xhr.status);
+                        }
+                        loaded[number] = Math.min(upload.part_size,
+                                                  file.size - begin);
+                        report();
+                        running -= 1;
+                        start();
+                    };
+                    xhr.onerror = function () {
+                        retry('part ' + number + ': network error');
+                    };
+                    xhr.send(file.slice(begin, begin + upload.part_size));
+                });
+        };
+
+        start();
+    },
+    /** Return error message of a failed JSON request. */
+    uploadError: function (xhr) {
+        return (xhr.responseJSON && xhr.responseJSON.error) ||
+            xhr.statusText || 'request failed';
     }
 };
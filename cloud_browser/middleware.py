@@ -0,0 +1,73 @@
+"""Cloud browser middleware."""
+import json
+import logging
+
+from cloud_browser.cloud import instrument
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware(object):
+    """Report native datastore calls made while serving a request.
+
+    Adds a ``Server-Timing`` header (call counts and milliseconds per native
+    call) to the response and logs the same numbers as one JSON line. Does
+    nothing unless ``CLOUD_BROWSER_INSTRUMENTATION`` is set.
+
+    Streaming responses (e.g., documents and ZIP downloads) keep recording
+    while their content is iterated. Their header holds the calls made up to
+    the response only, the log line is written once the content is
+    exhausted (or closed) and holds all calls.
+
+    Add it to ``MIDDLEWARE_CLASSES``::
+
+        MIDDLEWARE_CLASSES = (
+            # ...
+            'cloud_browser.middleware.ServerTimingMiddleware',
+        )
+    """
+
+    def process_request(self, request):  # pylint: disable=no-self-use
+        """Start recording."""
+        if instrument.enabled():
+            instrument.start()
+
+    def process_response(self, request, response):  # pylint: disable=R0201
+        """Stop recording and report."""
+        stats = instrument.stop()
+        if stats is None:
+            return response
+
+        response['Server-Timing'] = stats.server_timing()
+
+        if getattr(response, 'streaming', False):
+            response.streaming_content = self._stream(
+                response.streaming_content, stats,
+                lambda: self._log(request, response, stats))
+        else:
+            self._log(request, response, stats)
+
+        return response
+
+    @staticmethod
+    def _stream(content, stats, finish):
+        """Yield content, recording calls into ``stats``, then ``finish``."""
+        next_chunk = instrument.bind(iter(content).next, stats)
+        try:
+            while True:
+                try:
+                    chunk = next_chunk()
+                except StopIteration:
+                    return
+                yield chunk
+        finally:
+            finish()
+
+    @staticmethod
+    def _log(request, response, stats):
+        """Log recorded calls as one JSON line."""
+        record = stats.as_dict()
+        record['path'] = request.path
+        record['method'] = request.method
+        record['status'] = response.status_code
+        LOGGER.info("backend calls: %s", json.dumps(record, sort_keys=True))
@@ -0,0 +1,787 @@
+"""Testing helpers: local S3-compatible stand-in server.
+
+A small in-process HTTP server implementing the subset of the Amazon S3 REST
+API used by the boto-based datastores:
+
+* Service: list buckets.
+* Buckets: create, ``HEAD``, delete and list objects with ``prefix``,
+  ``delimiter``, ``marker`` and ``max-keys`` (including truncation and
+  common prefixes).
+* Objects: ``HEAD``, ``GET`` (with ``Range`` and ``If-Match``), ``PUT``,
+  server-side copy (``x-amz-copy-source``), delete, multi-object delete and
+  ACL get / put.
+* Multipart uploads: initiate, upload part (including part copies with
+  ``x-amz-copy-source-range``), list parts, complete and abort.
+
+Latency and throttling can be injected to exercise backoff and concurrency
+code, and every request is counted per operation. Authentication is not
+checked. Typical use::
+
+    server = S3StandIn(latency=0.01).start()
+    try:
+        conn = server.connect()
+        bucket = conn.get_bucket('bucket')
+    finally:
+        server.stop()
+
+or, in tests, :class:`S3StandInTestCase`.
+"""
+from __future__ import with_statement
+
+import bisect
+import hashlib
+import socket
+import threading
+import time
+import unittest
+import uuid
+
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from collections import Counter
+from email.utils import formatdate
+from urllib import unquote
+from urlparse import urlparse, parse_qs
+from xml.etree import cElementTree as ElementTree
+from xml.sax.saxutils import escape
+
+#: Maximum (and default) number of entries in a listing page.
+MAX_KEYS = 1000
+
+#: Maximum size of a single (non-multipart) copy.
+MAX_COPY_SIZE = 5 * 1024 ** 3
+
+#: Minimum size of a multipart upload part (except the last one).
+MIN_PART_SIZE = 5 * 1024 ** 2
+
+#: Document namespace.
+S3_XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+#: Fixed owner for all buckets / objects.
+OWNER_XML = "<Owner><ID>standin</ID><DisplayName>standin</DisplayName></Owner>"
+
+
+def _iso8601(timestamp):
+    """Return listing (ISO 8601) date string."""
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(timestamp))
+
+
+def _xml(root, body):
+    """Return XML document."""
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<%s xmlns="%s">%s</%s>' % (root, S3_XMLNS, body, root))
+
+
+class StoredObject(object):
+    """Stored object."""
+
+    def __init__(self, data, content_type=None, metadata=None, etag=None):
+        """Initializer."""
+        self.data = data
+        self.content_type = content_type or "binary/octet-stream"
+        self.metadata = dict(metadata or {})
+        self.etag = etag or hashlib.md5(data).hexdigest()
+        self.last_modified = time.time()
+        self.acl = None
+
+    @property
+    def size(self):
+        """Number of bytes."""
+        return len(self.data)
+
+
+class StoredBucket(object):
+    """Stored bucket: objects by name plus a sorted name index."""
+
+    def __init__(self):
+        """Initializer."""
+        self.objects = {}
+        self.names = []
+
+    def __contains__(self, name):
+        """Has object?"""
+        return name in self.objects
+
+    def __getitem__(self, name):
+        """Get object."""
+        return self.objects[name]
+
+    def __setitem__(self, name, obj):
+        """Store object."""
+        if name not in self.objects:
+            bisect.insort(self.names, name)
+        self.objects[name] = obj
+
+    def pop(self, name, default=None):
+        """Remove and return object."""
+        if name in self.objects:
+            del self.names[bisect.bisect_left(self.names, name)]
+        return self.objects.pop(name, default)
+
+    def index_after(self, name):
+        """Return index of first name greater than ``name``."""
+        return bisect.bisect_right(self.names, name)
+
+
+class S3Error(Exception):
+    """S3 error response."""
+
+    def __init__(self, status, code, message=""):
+        """Initializer."""
+        super(S3Error, self).__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class Upload(object):
+    """Multipart upload in progress."""
+
+    def __init__(self, bucket_name, key_name, content_type, metadata):
+        """Initializer."""
+        self.bucket_name = bucket_name
+        self.key_name = key_name
+        self.content_type = content_type
+        self.metadata = metadata
+        self.parts = {}
+
+
+class S3StandIn(object):
+    """In-process S3-compatible server.
+
+    Size limits of copies and multipart parts follow S3 and can be lowered
+    (:attr:`max_copy_size`, :attr:`min_part_size`) to exercise large object
+    code paths with small objects.
+
+    :param latency: Seconds to sleep before answering each request.
+    :param max_rate: Maximum sustained requests per second. Requests above
+        the rate are answered with ``503 SlowDown``. ``None`` for unlimited.
+    :param host: Interface to bind.
+    :param port: Port to bind (``0`` picks a free port).
+    """
+
+    def __init__(self, latency=0.0, max_rate=None, host="127.0.0.1", port=0):
+        """Initializer."""
+        self.latency = latency
+        self.max_rate = max_rate
+        self.buckets = {}
+        self.uploads = {}
+        self.max_copy_size = MAX_COPY_SIZE
+        self.min_part_size = MIN_PART_SIZE
+        self.requests = Counter()
+        self.lock = threading.RLock()
+        self._throttle_next = 0
+        self._tokens = float(max_rate or 0)
+        self._token_time = time.time()
+        self._server = _Server((host, port), _Handler)
+        self._server.standin = self
+        self._thread = None
+
+    @property
+    def host(self):
+        """Bound host."""
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        """Bound port."""
+        return self._server.server_address[1]
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close open (keep-alive) connections."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._server.close_connections()
+
+    def connect(self, **kwargs):
+        """Return boto S3 connection to this server."""
+        from boto.s3.connection import S3Connection, OrdinaryCallingFormat
+
+        options = {
+            'host': self.host,
+            'port': self.port,
+            'is_secure': False,
+            'calling_format': OrdinaryCallingFormat(),
+        }
+        options.update(kwargs)
+        return S3Connection('standin_access_key', 'standin_secret_key',
+                            **options)
+
+    ###########################################################################
+    # Direct (non-HTTP) helpers.
+    ###########################################################################
+    def create_bucket(self, name):
+        """Create bucket (without a request)."""
+        with self.lock:
+            return self.buckets.setdefault(name, StoredBucket())
+
+    def put(self, bucket_name, key_name, data, **kwargs):
+        """Store object (without a request)."""
+        obj = StoredObject(data, **kwargs)
+        with self.lock:
+            self.create_bucket(bucket_name)[key_name] = obj
+        return obj
+
+    def keys(self, bucket_name):
+        """Return sorted key names of bucket."""
+        with self.lock:
+            return list(self.get_bucket(bucket_name).names)
+
+    def throttle_next(self, count=1):
+        """Answer the next ``count`` requests with ``503 SlowDown``."""
+        with self.lock:
+            self._throttle_next += count
+
+    def reset_requests(self):
+        """Reset request counters."""
+        with self.lock:
+            self.requests.clear()
+
+    def throttled(self):
+        """Return ``True`` if the current request should be throttled."""
+        with self.lock:
+            if self._throttle_next > 0:
+                self._throttle_next -= 1
+                return True
+
+            if self.max_rate is None:
+                return False
+
+            now = time.time()
+            self._tokens = min(float(self.max_rate),
+                               self._tokens +
+                               (now - self._token_time) * self.max_rate)
+            self._token_time = now
+            if self._tokens < 1.0:
+                return True
+
+            self._tokens -= 1.0
+            return False
+
+    ###########################################################################
+    # Operations.
+    ###########################################################################
+    def get_bucket(self, name):
+        """Return bucket dictionary."""
+        try:
+            return self.buckets[name]
+        except KeyError:
+            raise S3Error(404, "NoSuchBucket", name)
+
+    def get_object(self, bucket_name, key_name):
+        """Return stored object."""
+        try:
+            return self.get_bucket(bucket_name)[key_name]
+        except KeyError:
+            raise S3Error(404, "NoSuchKey", key_name)
+
+    def list_buckets(self):
+        """List buckets."""
+        with self.lock:
+            names = sorted(self.buckets)
+        body = "".join("<Bucket><Name>%s</Name><CreationDate>%s</CreationDate>"
+                       "</Bucket>" % (escape(x), _iso8601(0)) for x in names)
+        return _xml("ListAllMyBucketsResult",
+                    OWNER_XML + "<Buckets>%s</Buckets>" % body)
+
+    def list_objects(self, bucket_name, prefix="", delimiter="", marker="",
+                     max_keys=MAX_KEYS):
+        """List objects (single page)."""
+        max_keys = min(max_keys, MAX_KEYS)
+        with self.lock:
+            bucket = self.get_bucket(bucket_name)
+            names = bucket.names
+            index = max(bisect.bisect_left(names, prefix),
+                        bucket.index_after(marker))
+
+            entries = []
+            truncated = False
+            while index < len(names) and names[index].startswith(prefix):
+                name = names[index]
+                common = None
+                if delimiter:
+                    found = name.find(delimiter, len(prefix))
+                    if found >= 0:
+                        common = name[:found + len(delimiter)]
+
+                if common is not None and marker.startswith(common):
+                    # Prefix already returned on a previous page.
+                    index = bucket.index_after(_prefix_end(common))
+                    continue
+
+                if len(entries) >= max_keys:
+                    truncated = True
+                    break
+
+                if common is not None:
+                    entries.append((common, None))
+                    # Skip all keys rolled up into the prefix.
+                    index = bucket.index_after(_prefix_end(common))
+                else:
+                    entries.append((name, bucket[name]))
+                    index += 1
+
+        body = ["<Name>%s</Name><Prefix>%s</Prefix><Marker>%s</Marker>"
+                "<MaxKeys>%d</MaxKeys><IsTruncated>%s</IsTruncated>" %
+                (escape(bucket_name), escape(prefix), escape(marker),
+                 max_keys, "true" if truncated else "false")]
+        if delimiter:
+            body.append("<Delimiter>%s</Delimiter>" % escape(delimiter))
+        if truncated and entries:
+            body.append("<NextMarker>%s</NextMarker>" % escape(entries[-1][0]))
+
+        for name, obj in entries:
+            if obj is None:
+                body.append("<CommonPrefixes><Prefix>%s</Prefix>"
+                            "</CommonPrefixes>" % escape(name))
+            else:
+                body.append(
+                    "<Contents><Key>%s</Key><LastModified>%s</LastModified>"
+                    "<ETag>&quot;%s&quot;</ETag><Size>%d</Size>"
+                    "<StorageClass>STANDARD</StorageClass>%s</Contents>" %
+                    (escape(name), _iso8601(obj.last_modified), obj.etag,
+                     obj.size, OWNER_XML))
+
+        return _xml("ListBucketResult", "".join(body))
+
+    def delete_objects(self, bucket_name, body):
+        """Multi-object delete."""
+        doc = ElementTree.fromstring(body)
+        quiet = False
+        names = []
+        for elem in doc.iter():
+            tag = elem.tag.split('}')[-1]
+            if tag == 'Quiet':
+                quiet = (elem.text or "").strip() == "true"
+            elif tag == 'Key':
+                names.append(elem.text or "")
+
+        with self.lock:
+            bucket = self.get_bucket(bucket_name)
+            for name in names:
+                bucket.pop(name, None)
+
+        deleted = "" if quiet else "".join(
+            "<Deleted><Key>%s</Key></Deleted>" % escape(x) for x in names)
+        return _xml("DeleteResult", deleted)
+
+    def copy_object(self, bucket_name, key_name, source, headers):
+        """Server-side copy."""
+        src_bucket, _, src_key = unquote(source).lstrip('/').partition('/')
+        with self.lock:
+            src = self.get_object(src_bucket, src_key)
+            if src.size > self.max_copy_size:
+                raise S3Error(400, "InvalidRequest",
+                              "The specified copy source is larger than the "
+                              "maximum allowable size for a copy source: "
+                              "%d" % self.max_copy_size)
+            if headers.get('x-amz-metadata-directive', 'COPY') == 'REPLACE':
+                content_type = headers.get('content-type')
+                metadata = _metadata(headers)
+            else:
+                content_type = src.content_type
+                metadata = src.metadata
+            obj = self.put(bucket_name, key_name, src.data,
+                           content_type=content_type, metadata=metadata)
+
+        return _xml("CopyObjectResult",
+                    "<LastModified>%s</LastModified>"
+                    "<ETag>&quot;%s&quot;</ETag>" %
+                    (_iso8601(obj.last_modified), obj.etag))
+
+    def initiate_upload(self, bucket_name, key_name, headers):
+        """Initiate multipart upload."""
+        upload_id = uuid.uuid4().hex
+        with self.lock:
+            self.get_bucket(bucket_name)
+            self.uploads[upload_id] = Upload(
+                bucket_name, key_name, headers.get('content-type'),
+                _metadata(headers))
+
+        return _xml("InitiateMultipartUploadResult",
+                    "<Bucket>%s</Bucket><Key>%s</Key><UploadId>%s</UploadId>" %
+                    (escape(bucket_name), escape(key_name), upload_id))
+
+    def get_upload(self, upload_id):
+        """Return multipart upload."""
+        try:
+            return self.uploads[upload_id]
+        except KeyError:
+            raise S3Error(404, "NoSuchUpload", upload_id)
+
+    def upload_part(self, upload_id, number, body, headers):
+        """Upload (or copy) a part and return its ETag."""
+        source = headers.get('x-amz-copy-source')
+        with self.lock:
+            upload = self.get_upload(upload_id)
+            if source is not None:
+                src_bucket, _, src_key = \
+                    unquote(source).lstrip('/').partition('/')
+                body = self.get_object(src_bucket, src_key).data
+                if 'x-amz-copy-source-range' in headers:
+                    start, end = _parse_range(
+                        headers['x-amz-copy-source-range'], len(body))
+                    body = body[start:end + 1]
+
+            etag = hashlib.md5(body).hexdigest()
+            upload.parts[number] = (body, etag)
+            return etag
+
+    def list_parts(self, upload_id, marker=0, max_parts=MAX_KEYS):
+        """List uploaded parts after part number ``marker``."""
+        with self.lock:
+            upload = self.get_upload(upload_id)
+            numbers = sorted(x for x in upload.parts if x > marker)
+            page, truncated = numbers[:max_parts], len(numbers) > max_parts
+            parts = "".join(
+                "<Part><PartNumber>%d</PartNumber>"
+                "<LastModified>%s</LastModified>"
+                "<ETag>&quot;%s&quot;</ETag><Size>%d</Size></Part>" %
+                (number, _iso8601(time.time()), upload.parts[number][1],
+                 len(upload.parts[number][0])) for number in page)
+
+            return _xml(
+                "ListPartsResult",
+                "<Bucket>%s</Bucket><Key>%s</Key><UploadId>%s</UploadId>"
+                "<PartNumberMarker>%d</PartNumberMarker>"
+                "<NextPartNumberMarker>%d</NextPartNumberMarker>"
+                "<MaxParts>%d</MaxParts><IsTruncated>%s</IsTruncated>%s" %
+                (escape(upload.bucket_name), escape(upload.key_name),
+                 upload_id, marker, page[-1] if page else 0, max_parts,
+                 "true" if truncated else "false", parts))
+
+    def complete_upload(self, upload_id, body):
+        """Complete multipart upload from the listed parts."""
+        doc = ElementTree.fromstring(body)
+        listed = []
+        for part in doc:
+            values = dict((x.tag.split('}')[-1], (x.text or "").strip('"'))
+                          for x in part)
+            listed.append((int(values['PartNumber']), values['ETag']))
+
+        with self.lock:
+            upload = self.get_upload(upload_id)
+            if not listed or [x for x, _ in listed] != \
+                    sorted(set(x for x, _ in listed)):
+                raise S3Error(400, "InvalidPartOrder", upload_id)
+
+            datas = []
+            for index, (number, etag) in enumerate(listed):
+                if upload.parts.get(number, (None, None))[1] != etag:
+                    raise S3Error(400, "InvalidPart", str(number))
+                data = upload.parts[number][0]
+                if index < len(listed) - 1 and len(data) < self.min_part_size:
+                    raise S3Error(400, "EntityTooSmall", str(number))
+                datas.append(data)
+
+            etag = "%s-%d" % (hashlib.md5("".join(
+                hashlib.md5(x).digest() for x in datas)).hexdigest(),
+                              len(datas))
+            obj = self.put(upload.bucket_name, upload.key_name,
+                           "".join(datas), content_type=upload.content_type,
+                           metadata=upload.metadata, etag=etag)
+            del self.uploads[upload_id]
+
+        return _xml("CompleteMultipartUploadResult",
+                    "<Bucket>%s</Bucket><Key>%s</Key>"
+                    "<ETag>&quot;%s&quot;</ETag>" %
+                    (escape(upload.bucket_name), escape(upload.key_name),
+                     obj.etag))
+
+    def abort_upload(self, upload_id):
+        """Abort multipart upload."""
+        with self.lock:
+            self.get_upload(upload_id)
+            del self.uploads[upload_id]
+
+
+def _prefix_end(prefix):
+    """Return name ordered after all (UTF-8) names under ``prefix``."""
+    return prefix + "\xff"
+
+
+def _metadata(headers):
+    """Return user metadata from ``x-amz-meta-*`` headers."""
+    prefix = 'x-amz-meta-'
+    return dict((k[len(prefix):], v) for k, v in headers.items()
+                if k.startswith(prefix))
+
+
+def _object_headers(obj):
+    """Return response headers for stored object."""
+    headers = {
+        'Content-Type': obj.content_type,
+        'ETag': '"%s"' % obj.etag,
+        'Last-Modified': formatdate(obj.last_modified, usegmt=True),
+        'Accept-Ranges': 'bytes',
+    }
+    for key, value in obj.metadata.items():
+        headers['x-amz-meta-%s' % key] = value
+    return headers
+
+
+def _parse_range(value, size):
+    """Return inclusive ``(start, end)`` for a ``Range`` header."""
+    unit, _, spec = value.partition('=')
+    start, _, end = spec.partition('-')
+    if unit.strip() != 'bytes' or ',' in spec:
+        raise S3Error(416, "InvalidRange", value)
+
+    if not start:
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+
+    if start >= size or start > end:
+        raise S3Error(416, "InvalidRange", value)
+
+    return start, end
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP server."""
+    daemon_threads = True
+    allow_reuse_address = True
+    standin = None
+
+    def __init__(self, *args, **kwargs):
+        """Initializer."""
+        HTTPServer.__init__(self, *args, **kwargs)
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+
+    def process_request_thread(self, request, client_address):
+        """Track connection while it is handled."""
+        with self.connections_lock:
+            self.connections.add(request)
+        try:
+            ThreadingMixIn.process_request_thread(self, request,
+                                                  client_address)
+        finally:
+            with self.connections_lock:
+                self.connections.discard(request)
+
+    def close_connections(self):
+        """Shut down connections, ending their handler threads."""
+        with self.connections_lock:
+            connections = list(self.connections)
+        for request in connections:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """S3 request handler."""
+    protocol_version = "HTTP/1.1"
+    # Buffer responses: unbuffered header writes stall keep-alive
+    # connections on Nagle / delayed ACK (~40ms per request).
+    wbufsize = -1
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Silence request logging."""
+        pass
+
+    def _send(self, status, body="", headers=None, length=None):
+        """Send response."""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length',
+                         str(len(body) if length is None else length))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _body(self):
+        """Read request body."""
+        length = int(self.headers.get('content-length') or 0)
+        return self.rfile.read(length) if length else ""
+
+    def _dispatch(self):
+        """Route request to operation and send response."""
+        standin = self.server.standin
+        url = urlparse(self.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        bucket_name, _, key_name = url.path.lstrip('/').partition('/')
+        bucket_name, key_name = unquote(bucket_name), unquote(key_name)
+        headers = dict((k.lower(), v) for k, v in self.headers.items())
+        body = self._body()
+
+        if standin.latency:
+            time.sleep(standin.latency)
+
+        try:
+            if standin.throttled():
+                raise S3Error(503, "SlowDown", "Please reduce your request "
+                                               "rate.")
+
+            if not bucket_name:
+                return self._op("ListBuckets", 200, standin.list_buckets())
+
+            if not key_name:
+                return self._bucket_op(standin, bucket_name, query, body)
+
+            return self._object_op(standin, bucket_name, key_name, query,
+                                   headers, body)
+        except S3Error as error:
+            standin.requests["Error%d" % error.status] += 1
+            xml = "" if self.command == 'HEAD' else (
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                "<Error><Code>%s</Code><Message>%s</Message></Error>" %
+                (error.code, escape(error.message)))
+            return self._send(error.status, xml)
+
+    def _op(self, name, status, body="", headers=None, length=None):
+        """Count and send operation response."""
+        self.server.standin.requests[name] += 1
+        return self._send(status, body, headers, length)
+
+    def _bucket_op(self, standin, bucket_name, query, body):
+        """Bucket-level operations."""
+        if self.command == 'PUT':
+            standin.create_bucket(bucket_name)
+            return self._op("CreateBucket", 200)
+
+        if self.command == 'DELETE':
+            with standin.lock:
+                standin.buckets.pop(bucket_name, None)
+            return self._op("DeleteBucket", 204)
+
+        if self.command == 'HEAD':
+            with standin.lock:
+                standin.get_bucket(bucket_name)
+            return self._op("HeadBucket", 200)
+
+        if self.command == 'POST' and 'delete' in query:
+            return self._op("DeleteObjects", 200,
+                            standin.delete_objects(bucket_name, body))
+
+        param = lambda x, d="": query.get(x, [d])[0]
+        return self._op("ListObjects", 200, standin.list_objects(
+            bucket_name,
+            prefix=param('prefix'),
+            delimiter=param('delimiter'),
+            marker=param('marker'),
+            max_keys=int(param('max-keys', MAX_KEYS))))
+
+    # pylint: disable=too-many-arguments
+    def _object_op(self, standin, bucket_name, key_name, query, headers,
+                   body):
+        """Object-level operations."""
+        if 'uploads' in query and self.command == 'POST':
+            return self._op("CreateMultipartUpload", 200,
+                            standin.initiate_upload(bucket_name, key_name,
+                                                    headers))
+
+        if 'uploadId' in query:
+            return self._upload_op(standin, query, headers, body)
+
+        if 'acl' in query:
+            with standin.lock:
+                obj = standin.get_object(bucket_name, key_name)
+                if self.command == 'PUT':
+                    obj.acl = body or headers.get('x-amz-acl')
+                    return self._op("PutObjectAcl", 200)
+            return self._op("GetObjectAcl", 200, _xml(
+                "AccessControlPolicy",
+                OWNER_XML + "<AccessControlList></AccessControlList>"))
+
+        if self.command == 'PUT':
+            if 'x-amz-copy-source' in headers:
+                return self._op("CopyObject", 200, standin.copy_object(
+                    bucket_name, key_name, headers['x-amz-copy-source'],
+                    headers))
+
+            with standin.lock:
+                standin.get_bucket(bucket_name)
+                obj = standin.put(bucket_name, key_name, body,
+                                  content_type=headers.get('content-type'),
+                                  metadata=_metadata(headers))
+            return self._op("PutObject", 200,
+                            headers={'ETag': '"%s"' % obj.etag})
+
+        if self.command == 'DELETE':
+            with standin.lock:
+                standin.get_bucket(bucket_name).pop(key_name, None)
+            return self._op("DeleteObject", 204)
+
+        with standin.lock:
+            obj = standin.get_object(bucket_name, key_name)
+
+        obj_headers = _object_headers(obj)
+        if self.command == 'HEAD':
+            return self._op("HeadObject", 200, headers=obj_headers,
+                            length=obj.size)
+
+        if headers.get('if-match', obj.etag).strip('"') != obj.etag:
+            raise S3Error(412, "PreconditionFailed",
+                          "At least one of the preconditions you specified "
+                          "did not hold.")
+
+        if 'range' in headers:
+            start, end = _parse_range(headers['range'], obj.size)
+            obj_headers['Content-Range'] = "bytes %d-%d/%d" % (start, end,
+                                                               obj.size)
+            return self._op("GetObject", 206, obj.data[start:end + 1],
+                            obj_headers)
+
+        return self._op("GetObject", 200, obj.data, obj_headers)
+
+    def _upload_op(self, standin, query, headers, body):
+        """Multipart upload operations."""
+        upload_id = query['uploadId'][0]
+        if self.command == 'PUT':
+            etag = standin.upload_part(upload_id, int(query['partNumber'][0]),
+                                       body, headers)
+            if 'x-amz-copy-source' in headers:
+                return self._op("UploadPartCopy", 200, _xml(
+                    "CopyPartResult",
+                    "<LastModified>%s</LastModified>"
+                    "<ETag>&quot;%s&quot;</ETag>" %
+                    (_iso8601(time.time()), etag)))
+            return self._op("UploadPart", 200,
+                            headers={'ETag': '"%s"' % etag})
+
+        if self.command == 'POST':
+            return self._op("CompleteMultipartUpload", 200,
+                            standin.complete_upload(upload_id, body))
+
+        if self.command == 'DELETE':
+            standin.abort_upload(upload_id)
+            return self._op("AbortMultipartUpload", 204)
+
+        if self.command == 'GET':
+            param = lambda x, d: int(query.get(x, [d])[0])
+            return self._op("ListParts", 200, standin.list_parts(
+                upload_id,
+                marker=param('part-number-marker', 0),
+                max_parts=param('max-parts', MAX_KEYS)))
+
+        raise S3Error(501, "NotImplemented", self.command)
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_DELETE = _dispatch
+
+
+class S3StandInTestCase(unittest.TestCase):
+    """Base class for tests against a fresh :class:`S3StandIn` server."""
+    #: Bucket created for each test.
+    bucket_name = 'standin-bucket'
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.server = S3StandIn().start()
+        self.server.create_bucket(self.bucket_name)
+        self.conn = self.server.connect()
+        self.conn.num_retries = 0
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.server.stop()
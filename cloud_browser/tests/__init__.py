@@ -26,9 +26,21 @@
 import unittest
 
 from boto.compat import http_client
+from django.test.signals import setting_changed
 
 import mock
 
+from cloud_browser.app_settings import settings
+
+
+def _reload_settings(**kwargs):  # pylint: disable=unused-argument
+    """Retake settings snapshot when a test overrides Django settings."""
+    if settings._loaded:  # pylint: disable=protected-access
+        settings.reload()
+
+
+setting_changed.connect(_reload_settings)
+
 
 class AWSMockServiceTestCase(unittest.TestCase):
     """Base class for mocking aws services."""
@@ -0,0 +1,45 @@
+"""Cloud browser app_settings.py tests."""
+import os
+
+from django.test import TestCase
+
+import mock
+
+from cloud_browser.app_settings import Settings, settings
+
+
+class TestSettings(TestCase):
+    """Tests for the settings snapshot."""
+
+    def test_snapshot(self):
+        snapshot = Settings()
+        self.assertFalse(snapshot._loaded)
+
+        self.assertEqual(20, snapshot.CLOUD_BROWSER_DEFAULT_LIST_LIMIT)
+        self.assertTrue(snapshot._loaded)
+        self.assertTrue('CLOUD_BROWSER_DATASTORE' in vars(snapshot))
+
+    def test_read_only(self):
+        self.assertRaises(AttributeError, setattr, settings,
+                          'CLOUD_BROWSER_DEFAULT_LIST_LIMIT', 5)
+
+    def test_override_reloads(self):
+        with self.settings(CLOUD_BROWSER_DEFAULT_LIST_LIMIT=5,
+                           CLOUD_BROWSER_CONTAINER_BLACKLIST=['secret']):
+            self.assertEqual(5, settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT)
+            self.assertFalse(settings.container_permitted('secret'))
+
+        self.assertEqual(20, settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT)
+        self.assertTrue(settings.container_permitted('secret'))
+
+    def test_reload_environment(self):
+        snapshot = Settings()
+        self.assertFalse(snapshot.CLOUD_BROWSER_HEDGE)
+
+        with mock.patch.dict(os.environ, {'CLOUD_BROWSER_HEDGE': 'True'}):
+            self.assertFalse(snapshot.CLOUD_BROWSER_HEDGE)
+            snapshot.reload()
+            self.assertTrue(snapshot.CLOUD_BROWSER_HEDGE)
+
+    def test_django_settings(self):
+        self.assertEqual('cloud_browser_project.urls', settings.ROOT_URLCONF)
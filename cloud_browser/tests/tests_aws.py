@@ -0,0 +1,559 @@
+"""Cloud browser cloud/aws.py tests against the local S3 stand-in server."""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib2
+
+from django.test.utils import override_settings
+
+import mock
+
+from cloud_browser.cloud import errors, ratelimit
+from cloud_browser.cloud.aws import AwsConnection
+from cloud_browser.testing import S3StandInTestCase
+
+
+class AwsContainerTestCase(S3StandInTestCase):
+    """Base class for AwsContainer tests against the stand-in server."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        super(AwsContainerTestCase, self).setUp()
+        ratelimit.LIMITERS.clear()
+        conn = AwsConnection('account', 'secret_key', host=self.server.host,
+                             port=self.server.port, is_secure=False)
+        conn.native_conn.num_retries = 0
+        self.container = conn.get_container(self.bucket_name)
+        self.server.reset_requests()
+
+    def put(self, *names):
+        for name in names:
+            self.server.put(self.bucket_name, name, "data")
+
+
+class TestAwsContainer(AwsContainerTestCase):
+    """Tests for AwsContainer."""
+
+    def test_get_objects_pages_listing(self):
+        self.put(*["dir/f%04d" % i for i in range(1500)])
+
+        results = self.container.get_objects('dir', limit=1200)
+        self.assertEqual(1200, len(results))
+        self.assertEqual("dir/f1199", results[-1].name)
+        self.assertEqual(2, self.server.requests['ListObjects'])
+
+        results = self.container.get_objects('dir', marker="dir/f1199")
+        self.assertEqual("dir/f1200", results[0].name)
+
+    def test_get_objects_subdirectories(self):
+        self.put("dir/", "dir/sub/", "dir/sub/a", "dir/b", "other")
+
+        results = self.container.get_objects('dir')
+        self.assertEqual(["dir/b", "dir/sub"], [x.name for x in results])
+        self.assertTrue(results[1].is_subdir)
+
+    def test_get_objects_metadata(self):
+        self.put("dir/sub/a")
+        self.server.put(self.bucket_name, "dir/sub/", "",
+                        metadata={'modified-by': "me"})
+        self.server.put(self.bucket_name, "dir/b", "data",
+                        metadata={'modified-by': "you"})
+
+        results = self.container.get_objects('dir')
+        self.assertEqual(0, self.server.requests['HeadObject'])
+
+        # Metadata is looked up once, when first read.
+        self.assertEqual(["you", "me"], [x.modified_by for x in results])
+        self.assertTrue(results[1].last_modified is not None)
+        self.assertEqual("me", results[1].modified_by)
+        self.assertEqual(2, self.server.requests['HeadObject'])
+
+    def test_get_object_metadata(self):
+        self.server.put(self.bucket_name, "dir/b", "data",
+                        metadata={'modified-by': "you"})
+
+        obj = self.container.get_object("dir/b")
+        self.assertEqual("you", obj.modified_by)
+        self.assertEqual(1, self.server.requests['HeadObject'])
+
+    def test_filter_objects(self):
+        self.put("dir/", "dir/sub/a")
+        self.server.put(self.bucket_name, "dir/b", "data",
+                        metadata={'modified-by': "you"})
+        objs = [self.container.obj_cls(self.container, name)
+                for name in ("dir", "dir/b")]
+        objs.append(self.container.obj_cls(
+            self.container, "dir/sub",
+            obj_type=self.container.obj_cls.type_cls.SUBDIR))
+
+        results = self.container.filter_objects(objs)
+        self.assertEqual(["dir/b", "dir/sub"], [x.name for x in results])
+        self.assertEqual(["you", None], [x.modified_by for x in results])
+
+    def test_get_sorted_objects_by_date(self):
+        self.put("dir/sub/a", "dir/sub/", "dir/b", "dir/c")
+
+        results = self.container.get_sorted_objects('dir', 'last_modified',
+                                                    descending=True, limit=2)
+        self.assertEqual(2, len(results))
+        self.assertEqual(0, self.server.requests['HeadObject'])
+        self.assertEqual("dir/sub", self.container.get_sorted_objects(
+            'dir', 'last_modified')[0].name)
+
+    def test_get_objects_coalesced_metadata(self):
+        self.put("dir/a", "dir/b")
+        get_page = self.container._get_page
+
+        def slow_get_page(*args):
+            time.sleep(0.1)
+            return get_page(*args)
+
+        def browse():
+            for obj in self.container.get_objects('dir'):
+                obj.modified_by  # pylint: disable=pointless-statement
+
+        self.container._get_page = slow_get_page
+        threads = [threading.Thread(target=browse) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # One listing and one lookup per object for all requests.
+        self.assertEqual(1, self.server.requests['ListObjects'])
+        self.assertEqual(2, self.server.requests['HeadObject'])
+
+    def test_get_objects_fills_page(self):
+        self.put("dir/", "dir/a", "dir/b", "dir/c")
+
+        results = self.container.get_objects('dir', limit=2)
+        self.assertEqual(["dir/a", "dir/b"], [x.name for x in results])
+        self.assertEqual(1, self.server.requests['ListObjects'])
+
+        results = self.container.get_objects('dir', marker="dir/b", limit=2)
+        self.assertEqual(["dir/c"], [x.name for x in results])
+
+    def test_has_directory(self):
+        self.put("dir/a")
+
+        self.assertTrue(self.container.has_directory("dir/"))
+        self.assertRaises(errors.NoObjectException,
+                          self.container.has_directory, "missing/")
+
+    def test_paths_exist(self):
+        self.put(*["dir/f%04d" % i for i in range(5)])
+
+        self.assertEqual([True, False, True], self.container.paths_exist(
+            ["dir/", "missing/", "dir/"]))
+        self.assertEqual(2, self.server.requests['ListObjects'])
+
+        # Negative results are cached until a mutation.
+        self.assertFalse(self.container.path_exists("missing/"))
+        self.assertEqual(2, self.server.requests['ListObjects'])
+        self.container.mkdir("missing/")
+        self.assertTrue(self.container.path_exists("missing/"))
+        self.assertEqual(3, self.server.requests['ListObjects'])
+
+    def test_paths_exist_uncached(self):
+        self.assertFalse(self.container.path_exists("dir/"))
+
+        # Keys written behind the cache's back are seen when uncached.
+        self.put("dir/a")
+        self.assertFalse(self.container.path_exists("dir/"))
+        self.assertTrue(self.container.path_exists("dir/", cached=False))
+        self.assertEqual(2, self.server.requests['ListObjects'])
+
+        # ... and refresh the cache.
+        self.assertTrue(self.container.path_exists("dir/"))
+        self.assertEqual(2, self.server.requests['ListObjects'])
+
+    def test_paths_exist_lists_one_key(self):
+        self.put("dir/a", "dir/b")
+
+        with mock.patch.object(self.container.native_container,
+                               'get_all_keys',
+                               wraps=self.container.native_container
+                               .get_all_keys) as get_all_keys:
+            self.assertTrue(self.container.path_exists("dir/"))
+        get_all_keys.assert_called_with(prefix="dir/", max_keys=1)
+
+    def test_get_object_ranged_read(self):
+        self.put("doc")
+        key = self.container.native_container.get_key("doc")
+
+        self.assertEqual("at", key.get_contents_as_string(
+            headers={'Range': "bytes=1-2"}))
+
+    def test_rename_directory(self):
+        self.put("dir/", "dir/a", "dir/sub/b", "other")
+
+        renamed = self.container.rename('', "dir", "new", False)
+        self.assertEqual("new", renamed.name)
+        self.assertEqual(["new/", "new/a", "new/sub/b", "other"],
+                         self.server.keys(self.bucket_name))
+
+    def test_delete_directory(self):
+        self.put("dir/", "dir/a", "dir/sub/b", "other")
+
+        self.container.delete("dir", False)
+        self.assertEqual(["other"], self.server.keys(self.bucket_name))
+        self.assertRaises(errors.NoObjectException,
+                          self.container.delete, "dir", False)
+
+    def test_delete_keys(self):
+        self.put("a", "b", "c")
+
+        result = self.container.native_container.delete_keys(["a", "c"])
+        self.assertEqual(2, len(result.deleted))
+        self.assertEqual(["b"], self.server.keys(self.bucket_name))
+        self.assertEqual(1, self.server.requests['DeleteObjects'])
+
+    def test_read(self):
+        self.put("doc")
+
+        obj = self.container.get_object("doc")
+        self.assertEqual("data", obj.read())
+        self.assertEqual(1, self.server.requests['HeadObject'])
+        self.assertEqual(1, self.server.requests['GetObject'])
+
+    def test_read_hedged(self):
+        self.put("doc")
+
+        with override_settings(CLOUD_BROWSER_HEDGE=True):
+            self.assertEqual("data", self.container.get_object("doc").read())
+
+    def test_download_url(self):
+        self.put("doc.txt")
+        obj = self.container.get_object("doc.txt")
+
+        url = obj.get_download_url(60)
+        self.assertTrue("Signature=" in url and "Expires=" in url)
+        self.assertTrue("response-content-type=" in url)
+        self.assertEqual("data", urllib2.urlopen(url).read())
+
+    def test_walk_files(self):
+        self.put("dir/", "dir/a", "dir/sub/", "dir/sub/b", "dir2/c")
+
+        self.assertEqual(["dir/a", "dir/sub/b"],
+                         [x.name for x in self.container.walk_files("dir")])
+        self.assertEqual(1, self.server.requests['ListObjects'])
+
+    def test_read_iter(self):
+        self.server.put(self.bucket_name, "doc", "0123456789")
+
+        chunks = self.container.get_object("doc").read_iter(4)
+        self.assertEqual(["0123", "4567", "89"], list(chunks))
+
+    def test_read_iter_ranges(self):
+        data = "".join(chr(x % 256) for x in range(1000))
+        self.server.put(self.bucket_name, "doc", data)
+        obj = self.container.get_object("doc")
+
+        with override_settings(CLOUD_BROWSER_RANGED_READ_THRESHOLD=100,
+                               CLOUD_BROWSER_RANGED_READ_PART_SIZE=300,
+                               CLOUD_BROWSER_RANGED_READ_WORKERS=2):
+            chunks = list(obj.read_iter(200))
+        self.assertEqual(data, "".join(chunks))
+        self.assertEqual([200, 100, 200, 100, 200, 100, 100],
+                         [len(x) for x in chunks])
+        self.assertEqual(4, self.server.requests['GetObject'])
+
+    def test_read_iter_ranges_changed(self):
+        self.server.put(self.bucket_name, "doc", "data" * 100)
+        obj = self.container.get_object("doc")
+        self.server.put(self.bucket_name, "doc", "new!" * 100)
+
+        with override_settings(CLOUD_BROWSER_RANGED_READ_THRESHOLD=100,
+                               CLOUD_BROWSER_RANGED_READ_PART_SIZE=100):
+            self.assertRaises(errors.StorageResponseException, list,
+                              obj.read_iter())
+        self.assertEqual(0, self.server.requests['GetObject'])
+
+    def test_throttled_listing(self):
+        self.server.throttle_next()
+
+        with override_settings(CLOUD_BROWSER_RATE_RETRIES=0):
+            self.assertRaises(errors.StorageResponseException,
+                              self.container.get_objects, 'dir')
+        self.assertEqual([], self.container.get_objects('dir'))
+
+    def test_throttled_listing_retried(self):
+        self.server.throttle_next(2)
+
+        with override_settings(CLOUD_BROWSER_RATE_BACKOFF=0.01):
+            self.assertEqual([], self.container.get_objects('dir'))
+        self.assertEqual(1, self.server.requests['ListObjects'])
+        self.assertEqual(2, self.server.requests['Error503'])
+
+    def test_concurrent_listings_coalesced(self):
+        self.put("dir/a", "dir/b")
+        self.server.latency = 0.2
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(self.container.get_objects('dir')))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, self.server.requests['ListObjects'])
+        self.assertEqual([["dir/a", "dir/b"]] * 5,
+                         [[x.name for x in objs] for objs in results])
+
+
+class TestAwsContainerJournal(AwsContainerTestCase):
+    """Tests for resuming interrupted directory operations."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        super(TestAwsContainerJournal, self).setUp()
+        self.journal_dir = tempfile.mkdtemp()
+        self.override = override_settings(
+            CLOUD_BROWSER_JOURNAL_DIR=self.journal_dir,
+            CLOUD_BROWSER_RATE_RETRIES=0)
+        self.override.enable()
+        self.put("dir/", *["dir/f%d" % i for i in range(5)])
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.override.disable()
+        shutil.rmtree(self.journal_dir)
+        super(TestAwsContainerJournal, self).tearDown()
+
+    def fail_after(self, count):
+        """Return progress callback failing the next request after count."""
+        def progress(done, total, size):  # pylint: disable=unused-argument
+            if done == count:
+                self.server.throttle_next()
+        return progress
+
+    def test_resume_rename_directory(self):
+        self.assertRaises(errors.StorageResponseException,
+                          self.container.rename, '', "dir", "new", False,
+                          progress=self.fail_after(2))
+        self.assertEqual(1, len(os.listdir(self.journal_dir)))
+
+        self.server.reset_requests()
+        progress = []
+        self.container.rename('', "dir", "new", False,
+                              progress=lambda *args: progress.append(args))
+
+        # Only the remaining keys (and the directory key) are copied.
+        self.assertEqual(4, self.server.requests['CopyObject'])
+        self.assertEqual((3, 5, 12), progress[0])
+        self.assertEqual(["new/"] + ["new/f%d" % i for i in range(5)],
+                         self.server.keys(self.bucket_name))
+        self.assertEqual([], os.listdir(self.journal_dir))
+
+    @mock.patch('cloud_browser.cloud.boto_base.MULTI_DELETE_MAX_KEYS', 2)
+    def test_resume_delete_directory(self):
+        self.assertRaises(errors.StorageResponseException,
+                          self.container.delete, "dir", False,
+                          progress=self.fail_after(2))
+        self.assertEqual(1, self.server.requests['DeleteObjects'])
+
+        self.server.reset_requests()
+        progress = []
+        self.container.delete("dir", False,
+                              progress=lambda *args: progress.append(args))
+
+        # Only the remaining keys are deleted, in batches.
+        self.assertEqual(2, self.server.requests['DeleteObjects'])
+        self.assertEqual(1, self.server.requests['DeleteObject'])
+        self.assertEqual((3, 5, 12), progress[0])
+        self.assertEqual([], self.server.keys(self.bucket_name))
+        self.assertEqual([], os.listdir(self.journal_dir))
+
+    @mock.patch('cloud_browser.cloud.boto_base.MULTI_DELETE_MAX_KEYS', 2)
+    def test_recreated_directory(self):
+        self.assertRaises(errors.StorageResponseException,
+                          self.container.delete, "dir", False,
+                          progress=self.fail_after(2))
+        self.put(*["dir/f%d" % i for i in range(5)])
+
+        # Keys listed before the interrupted run stopped are not skipped.
+        self.container.delete("dir", False)
+        self.assertEqual([], self.server.keys(self.bucket_name))
+
+    @mock.patch('cloud_browser.cloud.boto_base.MULTI_DELETE_MAX_KEYS', 2)
+    def test_expired_journal(self):
+        self.assertRaises(errors.StorageResponseException,
+                          self.container.delete, "dir", False,
+                          progress=self.fail_after(2))
+
+        progress = []
+        with mock.patch('time.time', return_value=time.time() + 86400 * 7):
+            self.container.delete("dir", False,
+                                  progress=lambda *args: progress.append(args))
+        self.assertEqual((1, 3, 4), progress[0])
+
+
+class TestAwsContainerMultipartCopy(AwsContainerTestCase):
+    """Tests for multipart copies of large objects."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        super(TestAwsContainerMultipartCopy, self).setUp()
+        self.override = override_settings(
+            CLOUD_BROWSER_COPY_MULTIPART_THRESHOLD=100 * 1024,
+            CLOUD_BROWSER_COPY_PART_SIZE=64 * 1024,
+            CLOUD_BROWSER_COPY_WORKERS=3)
+        self.override.enable()
+        self.server.max_copy_size = 100 * 1024
+        self.server.min_part_size = 64 * 1024
+        self.data = "".join(chr(i % 251) for i in range(300 * 1024))
+        self.server.put(self.bucket_name, "dir/big", self.data,
+                        content_type="text/plain",
+                        metadata={'modified-by': "me"})
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.override.disable()
+        super(TestAwsContainerMultipartCopy, self).tearDown()
+
+    def test_rename_file(self):
+        renamed = self.container.rename("dir/", "dir/big", "large", True)
+
+        self.assertEqual("dir/large", renamed.name)
+        self.assertEqual(len(self.data), renamed.size)
+        self.assertEqual(5, self.server.requests['UploadPartCopy'])
+        self.assertEqual(0, self.server.requests['CopyObject'])
+        self.assertEqual(["dir/large"], self.server.keys(self.bucket_name))
+
+        obj = self.server.get_object(self.bucket_name, "dir/large")
+        self.assertEqual(self.data, obj.data)
+        self.assertEqual("text/plain", obj.content_type)
+        self.assertEqual({'modified-by': "me"}, obj.metadata)
+        self.assertTrue(obj.etag.endswith("-5"))
+
+    def test_move_small_file(self):
+        self.server.put(self.bucket_name, "dir/small", "data")
+
+        self.container.move("dir/small", "other/")
+        self.assertEqual(1, self.server.requests['CopyObject'])
+        self.assertEqual(0, self.server.requests['CreateMultipartUpload'])
+
+    def test_failed_copy_aborts_upload(self):
+        self.server.min_part_size = 1024 * 1024
+
+        self.assertRaises(errors.StorageResponseException,
+                          self.container.move, "dir/big", "other/")
+        self.assertEqual(1, self.server.requests['AbortMultipartUpload'])
+        self.assertEqual({}, self.server.uploads)
+        self.assertEqual(["dir/big"], self.server.keys(self.bucket_name))
+
+
+class TestAwsContainerMultipartUpload(AwsContainerTestCase):
+    """Tests for browser multipart uploads with presigned part URLs."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        super(TestAwsContainerMultipartUpload, self).setUp()
+        self.server.min_part_size = 4
+
+    def put_part(self, upload_id, number, data):
+        url = self.container.get_upload_part_url("dir/up", upload_id, number,
+                                                 60)
+        self.assertTrue("Signature=" in url)
+        self.assertTrue("partNumber=%d" % number in url)
+        request = urllib2.Request(url, data)
+        request.get_method = lambda: 'PUT'
+        urllib2.urlopen(request).read()
+
+    def test_upload(self):
+        upload_id = self.container.initiate_upload("dir/up", "text/plain",
+                                                   "me")
+        self.put_part(upload_id, 2, "defg")
+        self.put_part(upload_id, 1, "abcd")
+
+        obj = self.container.complete_upload("dir/up", upload_id, 2)
+        self.assertEqual(8, obj.size)
+        self.assertEqual(1, self.server.requests['ListParts'])
+
+        stored = self.server.get_object(self.bucket_name, "dir/up")
+        self.assertEqual("abcddefg", stored.data)
+        self.assertEqual("text/plain", stored.content_type)
+        self.assertEqual({'modified-by': "me"}, stored.metadata)
+
+    def test_part_url_signature(self):
+        import base64
+        import hashlib
+        import hmac
+        from urlparse import urlparse, parse_qs
+
+        url = urlparse(self.container.get_upload_part_url("dir/up", "i/d", 2,
+                                                          60))
+        query = parse_qs(url.query)
+        self.assertEqual("/%s/dir/up" % self.bucket_name, url.path)
+        self.assertEqual(['2'], query['partNumber'])
+        self.assertEqual(['i/d'], query['uploadId'])
+        self.assertEqual(['account'], query['AWSAccessKeyId'])
+
+        string_to_sign = "PUT\n\n\n%s\n/%s/dir/up?%s" % (
+            query['Expires'][0], self.bucket_name, "partNumber=2&uploadId=i/d")
+        self.assertEqual(
+            [base64.b64encode(hmac.new("secret_key", string_to_sign,
+                                       hashlib.sha1).digest())],
+            query['Signature'])
+
+    def test_missing_part(self):
+        upload_id = self.container.initiate_upload("dir/up")
+        self.put_part(upload_id, 1, "abcd")
+
+        self.assertRaises(errors.StorageResponseException,
+                          self.container.complete_upload, "dir/up",
+                          upload_id, 2)
+        self.assertEqual(0, self.server.requests['CompleteMultipartUpload'])
+
+        self.container.abort_upload("dir/up", upload_id)
+        self.assertEqual({}, self.server.uploads)
+        self.assertEqual([], self.server.keys(self.bucket_name))
+
+
+class TestAwsContainerBulk(AwsContainerTestCase):
+    """Tests for bulk operations."""
+
+    def test_delete_files_batches(self):
+        names = ["f%04d" % i for i in range(1500)]
+        self.put("keep", *names)
+
+        results = self.container.delete_files(names + ["missing"])
+        self.assertEqual([(x, None) for x in names + ["missing"]], results)
+        self.assertEqual(2, self.server.requests['DeleteObjects'])
+        self.assertEqual(["keep"], self.server.keys(self.bucket_name))
+
+    def test_move_files(self):
+        self.put("dir/", "a", "b")
+
+        results = self.container.move_files(["a", "b", "missing"], "dir/")
+        self.assertEqual([None, None], [x[1] for x in results[:2]])
+        self.assertTrue(results[2][1] is not None)
+        self.assertEqual(["dir/", "dir/a", "dir/b"],
+                         self.server.keys(self.bucket_name))
+
+
+class TestAwsContainerRateLimit(AwsContainerTestCase):
+    """Tests for operations against a rate limited bucket."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        super(TestAwsContainerRateLimit, self).setUp()
+        self.override = override_settings(CLOUD_BROWSER_RATE_BACKOFF=0.01)
+        self.override.enable()
+        self.put("dir/", *["dir/f%02d" % i for i in range(20)])
+        self.server.max_rate = 50
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.override.disable()
+        super(TestAwsContainerRateLimit, self).tearDown()
+
+    def test_rename_directory(self):
+        self.container.rename('', "dir", "new", False)
+
+        self.assertTrue(self.server.requests['Error503'] > 0)
+        self.assertEqual(["new/"] + ["new/f%02d" % i for i in range(20)],
+                         self.server.keys(self.bucket_name))
+        limiter = ratelimit.LIMITERS.values()[0]
+        self.assertTrue(limiter.rate < limiter.max_rate)
+
+    def test_rename_directory_without_rate_limit(self):
+        with override_settings(CLOUD_BROWSER_RATE_LIMIT=None):
+            self.assertRaises(errors.StorageResponseException,
+                              self.container.rename, '', "dir", "new", False)
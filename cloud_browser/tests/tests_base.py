@@ -0,0 +1,71 @@
+"""Cloud browser cloud/base.py tests."""
+from django.test import TestCase
+
+from cloud_browser.cloud.base import CloudContainer, CloudObject
+
+
+class PagedContainer(CloudContainer):
+    """Container listing names in pages."""
+
+    def __init__(self, names):
+        super(PagedContainer, self).__init__(None, 'cont')
+        self.names = names
+        self.pages = []
+
+    def _get_page(self, path, marker, limit):
+        self.pages.append((marker, limit))
+        names = [x for x in self.names if marker is None or x > marker]
+        objs = [CloudObject(self, x) for x in names[:limit]]
+        return objs, (names[limit - 1] if len(names) > limit else None)
+
+    def listing_stages(self):
+        return super(PagedContainer, self).listing_stages() + \
+            [self._skip_hidden]
+
+    @staticmethod
+    def _skip_hidden(objs, path, marker):
+        for obj in objs:
+            if not obj.name.endswith('~'):
+                yield obj
+
+
+class TestGetObjects(TestCase):
+    """Tests for the get_objects listing pipeline."""
+
+    def names(self, objs):
+        return [x.name for x in objs]
+
+    def test_single_page(self):
+        container = PagedContainer(['a', 'b', 'c'])
+
+        self.assertEqual(['a', 'b'],
+                         self.names(container.get_objects('', limit=2)))
+        self.assertEqual([(None, 3)], container.pages)
+
+    def test_fills_page(self):
+        container = PagedContainer(['a~', 'b~', 'c', 'd~', 'e', 'f', 'g'])
+
+        self.assertEqual(['c', 'e', 'f'],
+                         self.names(container.get_objects('', limit=3)))
+        self.assertEqual([(None, 4), ('d~', 4)], container.pages)
+
+    def test_skip_marker(self):
+        container = PagedContainer(['a', 'b/', 'c'])
+
+        self.assertEqual(['c'], self.names(
+            container.get_objects('', marker='b', limit=1)))
+
+    def test_exhausted(self):
+        container = PagedContainer(['a', 'b~'])
+
+        self.assertEqual(['a'],
+                         self.names(container.get_objects('', limit=5)))
+        self.assertEqual(1, len(container.pages))
+
+    def test_max_list(self):
+        container = PagedContainer(['a', 'b', 'c'])
+        container.max_list = 2
+
+        self.assertEqual(['a', 'b', 'c'],
+                         self.names(container.get_objects('', limit=3)))
+        self.assertEqual([(None, 2), ('b', 2)], container.pages)
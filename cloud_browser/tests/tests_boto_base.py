@@ -17,7 +17,7 @@ from cloud_browser.cloud.boto_base import BotoContainer
 class TestDelete(AWSMockServiceTestCase):
     """Tests for delete."""
 
-    boto_container = BotoContainer('fake_conn')
+    boto_container = BotoContainer(mock.Mock())
     connection_class = S3Connection
 
     def setUp(self):  # pylint: disable=invalid-name
@@ -56,10 +56,14 @@ class TestDelete(AWSMockServiceTestCase):
         key_fn_3 = bucket.new_key('foo/bar/baz/')
 
         get_key_objects_fn.return_value = [key_fn_1, key_fn_2, key_fn_3]
-        self.boto_container.native_container.get_key.return_value = key_dir_fn
+        native_container = self.boto_container.native_container
+        native_container.get_key.return_value = key_dir_fn
+        native_container.delete_keys.return_value.errors = []
 
         self.boto_container.delete('foo/', False)
-        self.assertEqual(4, self.delete_fn.call_count)
+        native_container.delete_keys.assert_called_once_with(
+            ['foo/bar', 'foo/bar/baz', 'foo/bar/baz/'])
+        self.assertEqual(1, self.delete_fn.call_count)
 
     def test_delete_file_not_exist(self):
         self.boto_container.native_container.get_key.return_value = None
@@ -94,7 +98,7 @@ class TestDelete(AWSMockServiceTestCase):
 class TestRename(AWSMockServiceTestCase):
     """Tests for rename."""
 
-    boto_container = BotoContainer('fake_conn')
+    boto_container = BotoContainer(mock.Mock())
     connection_class = S3Connection
 
     def setUp(self):  # pylint: disable=invalid-name
@@ -189,7 +193,7 @@ class TestRename(AWSMockServiceTestCase):
 class TestMove(AWSMockServiceTestCase):
     """Tests for move."""
 
-    boto_container = BotoContainer('fake_conn')
+    boto_container = BotoContainer(mock.Mock())
     connection_class = S3Connection
 
     def setUp(self):  # pylint: disable=invalid-name
@@ -260,7 +264,7 @@ class TestMove(AWSMockServiceTestCase):
 class TestFilterObjects(TestCase):
     """Tests for filter_objects."""
 
-    boto_container = BotoContainer('fake_conn')
+    boto_container = BotoContainer(mock.Mock())
 
     def setUp(self):  # pylint: disable=invalid-name
         self.awsobject_patcher = mock.patch.object(AwsObject, '__init__')
@@ -316,7 +320,7 @@ class TestFilterObjects(TestCase):
 
 class TestIsSafeBasename(TestCase):
     """Tests for is_safe_basename."""
-    boto_container = BotoContainer('fake_conn')
+    boto_container = BotoContainer(mock.Mock())
 
     # pylint: disable=invalid-name
     def test_is_safe_basename_valid(self):
@@ -0,0 +1,49 @@
+"""Cloud browser cloud/concurrency.py tests."""
+import threading
+import time
+
+from django.test import TestCase
+
+from cloud_browser.cloud import concurrency
+
+
+class TestImapAhead(TestCase):
+    """Tests for imap_ahead."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def slow_square(self, item):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.01 * (item % 3))
+        with self.lock:
+            self.running -= 1
+        if item < 0:
+            raise ValueError(item)
+        return item * item
+
+    def test_order_and_bound(self):
+        results = concurrency.imap_ahead(self.slow_square, range(10), 3)
+        self.assertEqual([x * x for x in range(10)], list(results))
+        self.assertTrue(1 < self.max_running <= 3)
+
+    def test_lazy(self):
+        consumed = []
+
+        def items():
+            for item in range(100):
+                consumed.append(item)
+                yield item
+
+        results = concurrency.imap_ahead(self.slow_square, items(), 2)
+        self.assertEqual(0, next(results))
+        self.assertTrue(len(consumed) <= 3)
+
+    def test_exception(self):
+        results = concurrency.imap_ahead(self.slow_square, [1, -1, 2], 2)
+        self.assertEqual(1, next(results))
+        self.assertRaises(ValueError, next, results)
@@ -0,0 +1,110 @@
+"""Cloud browser cloud/doccache.py tests."""
+import datetime
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+import mock
+
+from cloud_browser.cloud import doccache
+from cloud_browser.cloud.base import CloudObject
+
+
+class TestDocumentCache(TestCase):
+    """Tests for DocumentCache."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.directory = tempfile.mkdtemp()
+        self.cache = doccache.DocumentCache(self.directory, 10)
+        self.container = mock.Mock()
+        self.container.name = 'bucket'
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        shutil.rmtree(self.directory)
+
+    def obj(self, name, content, etag='v1'):
+        obj = CloudObject(self.container, name, size=len(content), etag=etag)
+        obj.read = mock.Mock(return_value=content)
+        return obj
+
+    def files(self):
+        return sorted(x for x in os.listdir(self.directory)
+                      if x.endswith(doccache.SUFFIX))
+
+    def test_read_through(self):
+        obj = self.obj('doc', "data")
+
+        self.assertEqual("data", self.cache.read(obj))
+        self.assertEqual("data", self.cache.read(obj))
+        self.assertEqual(1, obj.read.call_count)
+        self.assertEqual(1, len(self.files()))
+
+    def test_new_version_replaces_previous(self):
+        self.cache.read(self.obj('doc', "data"))
+        obj = self.obj('doc', "new", etag='v2')
+
+        self.assertEqual("new", self.cache.read(obj))
+        self.assertEqual(1, obj.read.call_count)
+        self.assertEqual([self.cache.key(obj, 'v2')], self.files())
+        self.assertEqual(3, self.cache.size)
+
+    def test_lru_eviction(self):
+        first, second = self.obj('a', "aaaa"), self.obj('b', "bbbb")
+        self.cache.read(first)
+        self.cache.read(second)
+        self.cache.read(first)
+        self.cache.read(self.obj('c', "cccc"))
+
+        self.assertEqual(8, self.cache.size)
+        self.assertFalse(os.path.exists(os.path.join(
+            self.directory, self.cache.key(second, 'v1'))))
+        self.cache.read(first)
+        self.assertEqual(1, first.read.call_count)
+
+    def test_shared_directory(self):
+        # Caches of two processes sharing the directory.
+        other = doccache.DocumentCache(self.directory, 10)
+        first, second = self.obj('a', "aaaa"), self.obj('b', "bbbb")
+        self.cache.read(first)
+        other.read(second)
+        os.utime(os.path.join(self.directory, self.cache.key(first, 'v1')),
+                 (0, 0))
+        self.cache.read(self.obj('c', "cccc"))
+
+        self.assertEqual(8, self.cache.size)
+        self.assertEqual(2, len(self.files()))
+        self.assertFalse(os.path.exists(os.path.join(
+            self.directory, self.cache.key(first, 'v1'))))
+
+    def test_too_large(self):
+        self.cache.max_object_size = 2
+        obj = self.obj('doc', "data")
+
+        self.cache.read(obj)
+        self.cache.read(obj)
+        self.assertEqual(2, obj.read.call_count)
+        self.assertEqual([], self.files())
+
+    def test_version_from_last_modified(self):
+        obj = self.obj('doc', "data", etag=None)
+        self.assertEqual(None, self.cache.version(obj))
+
+        obj.last_modified = datetime.datetime(2014, 1, 2, 3, 4, 5)
+        self.assertEqual("2014-01-02T03:04:05-4", self.cache.version(obj))
+
+    def test_scan_existing(self):
+        self.cache.read(self.obj('doc', "data"))
+
+        cache = doccache.DocumentCache(self.directory, 10)
+        self.assertEqual(4, cache.size)
+        obj = self.obj('doc', "data")
+        self.assertEqual("data", cache.read(obj))
+        self.assertFalse(obj.read.called)
+
+    def test_disabled(self):
+        obj = self.obj('doc', "data")
+        with self.settings(CLOUD_BROWSER_DOCUMENT_CACHE_DIR=None):
+            self.assertEqual(None, doccache.get_cache())
+            self.assertEqual("data", doccache.read(obj))
@@ -0,0 +1,106 @@
+"""Cloud browser cloud/errors.py tests."""
+import sys
+import traceback
+
+from django.test import TestCase
+
+from cloud_browser.cloud import errors
+
+
+class BaseError(Exception):
+    """Base library error."""
+    pass
+
+
+class MissingError(BaseError):
+    """Library missing error."""
+    pass
+
+
+class MissingKeyError(MissingError):
+    """Library missing key error."""
+    pass
+
+
+class TestCloudExceptionWrapper(TestCase):
+    """Tests for CloudExceptionWrapper."""
+
+    def wrapper_cls(self, translations):
+        return type('Wrapper', (errors.CloudExceptionWrapper,),
+                    {'translations': translations})
+
+    def test_most_specific_translation(self):
+        wrapper_cls = self.wrapper_cls({
+            BaseError: errors.StorageResponseException,
+            MissingError: errors.NoObjectException,
+        })
+
+        @wrapper_cls()
+        def missing():
+            raise MissingKeyError("gone")
+
+        self.assertRaises(errors.NoObjectException, missing)
+        self.assertEqual(errors.NoObjectException,
+                         wrapper_cls.translated_class(MissingKeyError))
+        self.assertEqual(errors.StorageResponseException,
+                         wrapper_cls.translated_class(BaseError))
+
+    def test_type_cache(self):
+        wrapper_cls = self.wrapper_cls({
+            MissingError: errors.NoObjectException})
+        wrapper = wrapper_cls()
+        wrapper.translate(MissingKeyError())
+        wrapper.translate(ValueError())
+
+        type_cache = wrapper_cls._resolved()[2]  # pylint: disable=W0212
+        self.assertEqual({MissingKeyError: errors.NoObjectException,
+                          ValueError: None}, type_cache)
+
+    def test_untranslated(self):
+        wrapper = self.wrapper_cls({MissingError: errors.NoObjectException})()
+
+        @wrapper
+        def fail():
+            raise BaseError("base")
+
+        self.assertRaises(BaseError, fail)
+
+    def test_traceback_preserved(self):
+        wrapper = self.wrapper_cls({MissingError: errors.NoObjectException})()
+
+        @wrapper
+        def missing():
+            raise MissingError("gone")
+
+        try:
+            missing()
+        except errors.NoObjectException, exc:
+            names = [frame[2] for frame in
+                     traceback.extract_tb(sys.exc_info()[2])]
+        self.assertEqual(u"gone", unicode(exc))
+        self.assertEqual(["test_traceback_preserved", "wrapped", "missing"],
+                         names)
+
+    def test_lazy_translations_resolved_once(self):
+        calls = []
+
+        class LazyWrapper(errors.CloudExceptionWrapper):
+            """Lazy wrapper."""
+
+            @classmethod
+            def lazy_translations(cls):
+                calls.append(cls)
+                return {MissingError: errors.NoObjectException}
+
+        @LazyWrapper()
+        def missing():
+            raise MissingError("gone")
+
+        @LazyWrapper()
+        def other():
+            raise MissingError("gone")
+
+        self.assertEqual([], calls)
+        self.assertRaises(errors.NoObjectException, missing)
+        self.assertRaises(errors.NoObjectException, other)
+        self.assertEqual([LazyWrapper], calls)
@@ -0,0 +1,50 @@
+"""Cloud browser cloud/existence.py tests."""
+from django.test import TestCase
+
+import mock
+
+from cloud_browser.cloud import existence
+
+
+class TestExistenceCache(TestCase):
+    """Tests for ExistenceCache."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.cache = existence.ExistenceCache()
+
+    @mock.patch('cloud_browser.cloud.existence.time.time')
+    def test_expiry(self, time_fn):
+        time_fn.return_value = 100.0
+        with self.settings(CLOUD_BROWSER_EXISTS_CACHE_TTL=5):
+            self.cache.set('bucket', 'dir/', False)
+
+        time_fn.return_value = 104.0
+        self.assertEqual(False, self.cache.get('bucket', 'dir/'))
+        time_fn.return_value = 105.0
+        self.assertEqual(None, self.cache.get('bucket', 'dir/'))
+
+    def test_disabled(self):
+        with self.settings(CLOUD_BROWSER_EXISTS_CACHE_TTL=0):
+            self.cache.set('bucket', 'dir/', True)
+        self.assertEqual(None, self.cache.get('bucket', 'dir/'))
+
+    def test_invalidate(self):
+        self.cache.set('bucket', 'dir/', True)
+        self.cache.set('other', 'dir/', True)
+
+        self.cache.invalidate('bucket')
+        self.assertEqual(None, self.cache.get('bucket', 'dir/'))
+        self.assertEqual(True, self.cache.get('other', 'dir/'))
+
+    def test_invalidates_on_failure(self):
+        container = mock.Mock()
+        container.name = 'bucket'
+        container.conn.existence = self.cache
+        self.cache.set('bucket', 'dir/', True)
+
+        @existence.invalidates
+        def mutate(self):  # pylint: disable=unused-argument
+            raise ValueError("failed")
+
+        self.assertRaises(ValueError, mutate, container)
+        self.assertEqual(None, self.cache.get('bucket', 'dir/'))
@@ -0,0 +1,50 @@
+"""Cloud browser cloud/google.py tests."""
+from django.test.utils import override_settings
+
+from cloud_browser.cloud.google import GsContainer
+from cloud_browser.tests.tests_aws import AwsContainerTestCase
+
+
+class GsContainerTestCase(AwsContainerTestCase):
+    """Base class for GsContainer tests against the S3 stand-in server."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        super(GsContainerTestCase, self).setUp()
+        self.container = GsContainer(self.container.conn, self.bucket_name)
+
+
+class TestGsContainerBulk(GsContainerTestCase):
+    """Tests for bulk operations."""
+
+    def test_delete_files(self):
+        self.put("keep", "a", "b")
+
+        results = self.container.delete_files(["a", "b", "missing"])
+        self.assertEqual([None, None], [x[1] for x in results[:2]])
+        self.assertTrue(results[2][1] is not None)
+        self.assertEqual(0, self.server.requests['DeleteObjects'])
+        self.assertEqual(2, self.server.requests['DeleteObject'])
+        self.assertEqual(["keep"], self.server.keys(self.bucket_name))
+
+
+class TestGsContainerCopy(GsContainerTestCase):
+    """Tests for copies of large objects."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        super(TestGsContainerCopy, self).setUp()
+        self.override = override_settings(
+            CLOUD_BROWSER_COPY_MULTIPART_THRESHOLD=1024)
+        self.override.enable()
+        self.server.put(self.bucket_name, "dir/big", "x" * 4096)
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.override.disable()
+        super(TestGsContainerCopy, self).tearDown()
+
+    def test_rename_large_file(self):
+        renamed = self.container.rename("dir/", "dir/big", "large", True)
+
+        self.assertEqual("dir/large", renamed.name)
+        self.assertEqual(1, self.server.requests['CopyObject'])
+        self.assertEqual(0, self.server.requests['CreateMultipartUpload'])
+        self.assertEqual(["dir/large"], self.server.keys(self.bucket_name))
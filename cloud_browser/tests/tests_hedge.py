@@ -0,0 +1,110 @@
+"""Cloud browser cloud/hedge.py tests."""
+import threading
+import time
+
+from django.test import TestCase
+
+import mock
+
+from cloud_browser.cloud import hedge
+
+
+class TestLatencyHistogram(TestCase):
+    """Tests for LatencyHistogram."""
+
+    def test_percentile(self):
+        histogram = hedge.LatencyHistogram()
+        for latency in range(1, 101):
+            histogram.record(latency)
+
+        self.assertEqual(95, histogram.percentile(95))
+        self.assertEqual(100, histogram.percentile(100))
+        self.assertEqual(1, histogram.percentile(0))
+
+    def test_too_few_samples(self):
+        histogram = hedge.LatencyHistogram()
+        histogram.record(1)
+        self.assertEqual(None, histogram.percentile(95))
+
+    def test_rolling_window(self):
+        histogram = hedge.LatencyHistogram(size=hedge.MIN_SAMPLES)
+        for latency in [100] * hedge.MIN_SAMPLES + [1] * hedge.MIN_SAMPLES:
+            histogram.record(latency)
+        self.assertEqual(1, histogram.percentile(100))
+
+
+class TestCall(TestCase):
+    """Tests for call."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        hedge.HISTOGRAMS.clear()
+        self.release = threading.Event()
+        self.discard = mock.Mock()
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.release.set()
+
+    def record(self, latency, operation='get'):
+        for _ in range(hedge.MIN_SAMPLES):
+            hedge.get_histogram(operation).record(latency)
+
+    def slow_then(self, *results):
+        """Return function blocking on first call, then returning
+        (or raising) ``results``."""
+        results = list(results)
+
+        def function():
+            if not function.calls:
+                function.calls += 1
+                self.release.wait()
+                return "slow"
+            function.calls += 1
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        function.calls = 0
+        return function
+
+    def test_disabled(self):
+        function = mock.Mock(return_value="result")
+        self.assertEqual("result", hedge.call('get', function))
+        self.assertFalse('get' in hedge.HISTOGRAMS)
+
+    def test_hedged(self):
+        self.record(0.01)
+        function = self.slow_then("fast")
+
+        with self.settings(CLOUD_BROWSER_HEDGE=True):
+            self.assertEqual("fast", hedge.call('get', function,
+                                                discard=self.discard))
+        self.assertEqual(2, function.calls)
+
+        self.release.set()
+        for _ in range(100):
+            if self.discard.called:
+                break
+            time.sleep(0.01)
+        self.discard.assert_called_with("slow")
+
+    def test_not_hedged_without_samples(self):
+        function = mock.Mock(return_value="result")
+
+        with self.settings(CLOUD_BROWSER_HEDGE=True):
+            self.assertEqual("result", hedge.call('head', function))
+        self.assertEqual(1, function.call_count)
+        self.assertEqual(1, len(hedge.get_histogram('head').samples))
+
+    def test_hedge_failure_waits_for_first(self):
+        self.record(0.01)
+        function = self.slow_then(ValueError("failed"))
+
+        with self.settings(CLOUD_BROWSER_HEDGE=True):
+            threading.Timer(0.05, self.release.set).start()
+            self.assertEqual("slow", hedge.call('get', function))
+
+    def test_failure(self):
+        function = mock.Mock(side_effect=ValueError("failed"))
+
+        with self.settings(CLOUD_BROWSER_HEDGE=True):
+            self.assertRaises(ValueError, hedge.call, 'get', function)
@@ -0,0 +1,42 @@
+"""Cloud browser import-time tests."""
+import json
+import os
+import subprocess
+import sys
+
+from django.test import TestCase
+
+import cloud_browser
+
+#: Seconds importing the URL configurations may take.
+IMPORT_BUDGET = 1.0
+
+#: Imports timed in a fresh interpreter, reporting elapsed time and modules.
+SCRIPT = """
+import json, sys, time
+import django.conf.urls, django.views.generic.base
+start = time.time()
+import cloud_browser.urls, cloud_browser.urls_admin
+print(json.dumps([time.time() - start, sorted(sys.modules)]))
+"""
+
+
+class TestImportTime(TestCase):
+    """Importing URL configurations must not load views or datastores."""
+
+    def test_urls(self):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [os.path.dirname(os.path.dirname(cloud_browser.__file__))] +
+            sys.path)
+        output = subprocess.check_output([sys.executable, '-c', SCRIPT],
+                                         env=env)
+        elapsed, modules = json.loads(output.splitlines()[-1])
+
+        loaded = [x for x in modules
+                  if x.split('.')[0] in ('boto', 'cloudfiles') or
+                  x.startswith(('cloud_browser.views',
+                                'cloud_browser.cloud.config'))]
+        self.assertEqual([], loaded)
+        self.assertTrue(elapsed < IMPORT_BUDGET,
+                        "Import took %.2fs" % elapsed)
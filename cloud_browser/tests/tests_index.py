@@ -0,0 +1,190 @@
+"""Cloud browser cloud/index.py tests."""
+import os
+import shutil
+import tempfile
+
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+
+import mock
+
+from cloud_browser import jobs
+from cloud_browser.cloud import base, index
+from cloud_browser.cloud.aws import AwsContainer
+from cloud_browser.cloud.fs import FilesystemConnection
+
+
+class IndexTestCase(TestCase):
+    """Base class for index tests against a filesystem container."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'cont', 'dir', 'sub'))
+        os.makedirs(os.path.join(self.root, 'cont', 'empty'))
+        for name in ('dir/a', 'dir/sub/b', 'c'):
+            self.write(name, name)
+
+        self.override = override_settings(
+            CLOUD_BROWSER_INDEX_PATH=os.path.join(self.root, 'index.db'))
+        self.override.enable()
+        self.conn = FilesystemConnection(self.root)
+        self.container = self.conn.get_container('cont')
+        self.index = index.get_index()
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.override.disable()
+        shutil.rmtree(self.root)
+
+    def write(self, name, content):
+        with open(os.path.join(self.root, 'cont', name), 'wb') as fil:
+            fil.write(content)
+
+    def names(self, path=''):
+        return [obj.name for obj in self.container.get_objects(path)]
+
+
+class TestMetadataIndex(IndexTestCase):
+    """Tests for MetadataIndex."""
+
+    def test_crawl(self):
+        live = self.names('dir')
+        self.assertEqual(6, self.index.crawl(self.container))
+        self.assertTrue(self.index.is_indexed('cont'))
+
+        os.remove(os.path.join(self.root, 'cont', 'dir', 'a'))
+        self.assertEqual(live, self.names('dir'))
+        self.assertEqual(['c', 'dir', 'empty'], self.names())
+
+        objs = self.container.get_objects('dir', marker='dir/a', limit=1)
+        self.assertEqual(['dir/sub'], [obj.name for obj in objs])
+        self.assertTrue(objs[0].is_subdir)
+
+    def test_directories_and_stats(self):
+        self.index.crawl(self.container)
+        os.rmdir(os.path.join(self.root, 'cont', 'empty'))
+
+        self.assertEqual(['', 'dir/', 'dir/sub/', 'empty/'],
+                         self.container.get_directories_paths())
+        container = [c for c in self.conn.get_containers()
+                     if c.name == 'cont'][0]
+        self.assertEqual((3, len('dir/a') + len('dir/sub/b') + len('c')),
+                         (container.count, container.size))
+
+    def test_apply(self):
+        self.index.crawl(self.container)
+
+        self.index.apply('cont', 'rename', {
+            'parent_dir_path': '', 'src_path': 'dir', 'new_basename': 'new'})
+        self.assertEqual(['c', 'empty', 'new'], self.names())
+        self.assertEqual(['new/a', 'new/sub'], self.names('new'))
+        self.assertEqual(['new/sub/b'], self.names('new/sub'))
+
+        self.index.apply('cont', 'move', {
+            'src_file_path': 'c', 'target_dir_path': 'empty/'})
+        self.assertEqual(['empty/c'], self.names('empty'))
+
+        self.index.apply('cont', 'delete', {'src_path': 'new'})
+        self.index.apply('cont', 'mkdir', {'dir_path': 'x/y/'})
+        self.assertEqual(['empty', 'x'], self.names())
+        self.assertEqual(['x/y'], self.names('x'))
+
+    def test_job_failure_marks_changed(self):
+        self.index.crawl(self.container)
+        job = jobs.Job('delete', 'cont', {'src_path': 'dir/missing',
+                                          'is_file': True})
+
+        with mock.patch('cloud_browser.jobs.get_connection',
+                        return_value=self.conn):
+            job.run()
+        self.assertEqual(jobs.FAILED, job.state)
+        self.assertTrue(self.index.is_changed('cont', 'dir/sub'))
+        self.assertFalse(self.index.is_changed('cont', 'empty'))
+
+        # Changed directories are listed from the datastore.
+        os.remove(os.path.join(self.root, 'cont', 'dir', 'a'))
+        os.remove(os.path.join(self.root, 'cont', 'c'))
+        self.assertEqual(['dir/sub'], self.names('dir'))
+        self.assertEqual(['c', 'dir', 'empty'], self.names())
+
+        os.rmdir(os.path.join(self.root, 'cont', 'empty'))
+        self.assertEqual(['', 'dir/', 'dir/sub/'],
+                         self.container.get_directories_paths())
+
+    def test_no_metadata_lookups(self):
+        container = AwsContainer(mock.Mock(), 'bucket')
+        self.index.load('bucket', [
+            ('bucket', '', 'a', 0, 1, None, None, None),
+            ('bucket', '', 'd', 1, 0, None, None, None)], 0)
+
+        with mock.patch.object(AwsContainer, '_get_container') as get_fn:
+            objs = container.get_objects('')
+            self.assertEqual([None, None], [x.modified_by for x in objs])
+            self.assertEqual([None, None], [x.last_modified for x in objs])
+        self.assertFalse(get_fn.called)
+
+    def test_rollup(self):
+        self.index.crawl(self.container)
+
+        self.assertEqual((2, len('dir/a') + len('dir/sub/b')),
+                         self.index.rollup('cont', 'dir/'))
+        self.assertEqual((0, 0), self.index.rollup('cont', 'empty'))
+
+
+class TestSortedObjects(IndexTestCase):
+    """Tests for sorted listings from the datastore and the index."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        super(TestSortedObjects, self).setUp()
+        for name, size in (('dir/big', 30), ('dir/mid', 20), ('dir/z', 20)):
+            self.write(name, 'x' * size)
+
+    def pages(self, sort_key, descending=False, limit=2):
+        """Return names of all pages of sorted listing of ``dir``."""
+        pages, after = [], None
+        while True:
+            objs = self.container.get_sorted_objects(
+                'dir', sort_key, descending, after, limit)
+            if not objs:
+                return pages
+            pages.append([obj.name for obj in objs])
+            after = (base.sort_value(objs[-1], sort_key), objs[-1].name)
+
+    def test_sorted(self):
+        # Directory sizes depend on the filesystem, so only files are
+        # compared.
+        files = ['dir/big', 'dir/z', 'dir/mid', 'dir/a']
+        listed = [x for page in self.pages('size', True, limit=1)
+                  for x in page]
+        self.assertEqual(files, [x for x in listed if x in files])
+        self.assertEqual([['dir/z', 'dir/sub'], ['dir/mid', 'dir/big'],
+                          ['dir/a']],
+                         self.pages('name', descending=True))
+
+        self.index.crawl(self.container)
+        for sort_key in base.SORT_KEYS:
+            for descending in (False, True):
+                indexed = self.pages(sort_key, descending)
+                with mock.patch.object(self.index, 'is_changed',
+                                       return_value=True):
+                    self.assertEqual(indexed,
+                                     self.pages(sort_key, descending))
+
+
+class TestIndexCommand(IndexTestCase):
+    """Tests for the cloud_browser_index management command."""
+
+    def test_crawl_and_drop(self):
+        stdout = StringIO()
+        with mock.patch('cloud_browser.management.commands.'
+                        'cloud_browser_index.get_connection',
+                        return_value=self.conn):
+            call_command('cloud_browser_index', 'cont', stdout=stdout)
+            self.assertTrue(self.index.is_indexed('cont'))
+            self.assertTrue("Indexed 6 objects of 'cont'" in stdout.getvalue())
+
+            call_command('cloud_browser_index', 'cont', drop=True,
+                         stdout=stdout)
+        self.assertFalse(self.index.is_indexed('cont'))
@@ -0,0 +1,169 @@
+"""Cloud browser cloud/instrument.py tests."""
+import json
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+import mock
+
+from cloud_browser.cloud import instrument
+from cloud_browser.cloud.concurrency import imap_ahead, map_threaded
+from cloud_browser.middleware import ServerTimingMiddleware
+
+
+class TestNativeProxy(TestCase):
+    """Tests for NativeProxy."""
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        instrument.stop()
+
+    def test_records_method_calls(self):
+        native = mock.Mock()
+        native.get_key.return_value = 'key'
+        proxy = instrument.NativeProxy(native, 'container')
+
+        stats = instrument.start()
+        self.assertEqual('key', proxy.get_key('foo'))
+        proxy.get_key('bar')
+        proxy.list('')
+
+        native.get_key.assert_called_with('bar')
+        self.assertEqual(3, stats.count)
+        self.assertEqual(['container.get_key', 'container.list'],
+                         [name for name, _, _ in stats.items()])
+        self.assertEqual(2, stats.calls['container.get_key'][0])
+
+    def test_records_failed_calls(self):
+        native = mock.Mock()
+        native.get_key.side_effect = ValueError
+        proxy = instrument.NativeProxy(native, 'container')
+
+        stats = instrument.start()
+        self.assertRaises(ValueError, proxy.get_key, 'foo')
+        self.assertEqual(1, stats.count)
+
+    def test_no_recording_passes_through(self):
+        native = mock.Mock()
+        native.name = 'bucket'
+        proxy = instrument.NativeProxy(native, 'container')
+
+        self.assertEqual('bucket', proxy.name)
+        proxy.get_key('foo')
+        self.assertEqual(None, instrument.current())
+
+    def test_records_lazy_results(self):
+        class ResultSet(object):
+            def __iter__(self):
+                return iter(['a', 'b'])
+        native = mock.Mock()
+        native.list.return_value = ResultSet()
+        proxy = instrument.NativeProxy(native, 'container')
+
+        stats = instrument.start()
+        results = proxy.list('')
+        self.assertEqual(0, stats.count)
+        self.assertEqual(['a', 'b'], list(results))
+        self.assertEqual(1, stats.calls['container.list'][0])
+
+    def test_records_key_methods(self):
+        class Key(object):
+            def open_read(self):
+                pass
+
+            def delete(self):
+                pass
+        native = mock.Mock()
+        native.get_key.return_value = Key()
+        native.get_all_keys.return_value = [Key(), Key()]
+        proxy = instrument.NativeProxy(native, 'container')
+
+        stats = instrument.start()
+        key = proxy.get_key('foo')
+        self.assertTrue(isinstance(key, Key))
+        key.open_read()
+        key.delete()
+        for key in proxy.get_all_keys():
+            key.delete()
+        self.assertEqual(1, stats.calls['key.open_read'][0])
+        self.assertEqual(3, stats.calls['key.delete'][0])
+
+    def test_records_helper_threads(self):
+        native = mock.Mock()
+        proxy = instrument.NativeProxy(native, 'container')
+
+        stats = instrument.start()
+        map_threaded(proxy.get_key, range(8), 4)
+        list(imap_ahead(proxy.get_key, range(4), 2))
+        self.assertEqual(12, stats.calls['container.get_key'][0])
+
+    def test_wrap_native_disabled(self):
+        native = object()
+        with mock.patch.object(instrument, 'enabled', return_value=False):
+            self.assertTrue(instrument.wrap_native(native, 'conn') is native)
+
+
+class TestTimed(TestCase):
+    """Tests for the timed decorator."""
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        instrument.stop()
+
+    def test_enabled_at_runtime(self):
+        method = instrument.timed('fs.get_object')(lambda: 'obj')
+
+        stats = instrument.start()
+        with self.settings(CLOUD_BROWSER_INSTRUMENTATION=False):
+            self.assertEqual('obj', method())
+        self.assertEqual(0, stats.count)
+        with self.settings(CLOUD_BROWSER_INSTRUMENTATION=True):
+            self.assertEqual('obj', method())
+        self.assertEqual(1, stats.calls['fs.get_object'][0])
+
+
+class TestServerTimingMiddleware(TestCase):
+    """Tests for ServerTimingMiddleware."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.middleware = ServerTimingMiddleware()
+        self.request = RequestFactory().get('/cb/browser/')
+
+    def test_server_timing_header(self):
+        with mock.patch.object(instrument, 'enabled', return_value=True):
+            self.middleware.process_request(self.request)
+        instrument.current().record('container.get_key', 0.002)
+        instrument.current().record('container.get_key', 0.003)
+
+        response = self.middleware.process_response(self.request,
+                                                    HttpResponse())
+        self.assertEqual(
+            'backend;dur=5.0;desc="2 calls", '
+            'container.get_key;dur=5.0;desc="2"',
+            response['Server-Timing'])
+        self.assertEqual(None, instrument.current())
+
+    @mock.patch('cloud_browser.middleware.LOGGER')
+    def test_streaming(self, logger):
+        def content():
+            for chunk in ("a", "b"):
+                instrument.current().record('object.read', 0.001)
+                yield chunk
+
+        with mock.patch.object(instrument, 'enabled', return_value=True):
+            self.middleware.process_request(self.request)
+        response = self.middleware.process_response(
+            self.request, StreamingHttpResponse(content()))
+        self.assertEqual(None, instrument.current())
+        self.assertFalse(logger.info.called)
+
+        self.assertEqual("ab", "".join(response.streaming_content))
+        record = json.loads(logger.info.call_args[0][1])
+        self.assertEqual(2, record['calls']['object.read']['count'])
+
+    def test_disabled(self):
+        with mock.patch.object(instrument, 'enabled', return_value=False):
+            self.middleware.process_request(self.request)
+
+        response = self.middleware.process_response(self.request,
+                                                    HttpResponse())
+        self.assertFalse(response.has_header('Server-Timing'))
@@ -0,0 +1,108 @@
+"""Cloud browser cloud/inventory.py tests."""
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from cloud_browser.cloud import index, inventory
+from cloud_browser.cloud.base import CloudContainer
+
+#: Versioned CSV report rows.
+ROWS = (
+    '"bucket","dir/a%20b.txt","v1","true","false","5",'
+    '"2014-05-06T07:08:09.000Z","e1"\n'
+    '"bucket","dir/a%20b.txt","v0","false","false","3",'
+    '"2014-05-01T07:08:09.000Z","e0"\n'
+    '"bucket","dir/deleted","v2","true","true","",'
+    '"2014-05-06T07:08:09.000Z",""\n'
+    '"bucket","dir/sub/c","v1","true","false","7",'
+    '"2014-05-06T07:08:09.000Z","e2"\n'
+    '"bucket","empty/","v1","true","false","0",'
+    '"2014-05-06T07:08:09.000Z","e3"\n'
+    '"bucket","top","v1","true","false","1",'
+    '"2014-05-06T07:08:09.000Z","e4"\n'
+)
+
+
+class TestInventory(TestCase):
+    """Tests for S3 Inventory imports."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.root = tempfile.mkdtemp()
+        report_dir = os.path.join(self.root, 'bucket', 'config')
+        os.makedirs(os.path.join(report_dir, '2014-05-06T00-00Z'))
+        os.makedirs(os.path.join(report_dir, 'data'))
+        with gzip.open(os.path.join(report_dir, 'data', 'part.csv.gz'),
+                       'wb') as file_obj:
+            file_obj.write(ROWS)
+
+        self.manifest_path = os.path.join(
+            report_dir, '2014-05-06T00-00Z', 'manifest.json')
+        self.write_manifest()
+        self.index = index.MetadataIndex(os.path.join(self.root, 'index.db'))
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        shutil.rmtree(self.root)
+
+    def write_manifest(self, **kwargs):
+        manifest = {
+            'sourceBucket': 'bucket',
+            'fileFormat': 'CSV',
+            'fileSchema': "Bucket, Key, VersionId, IsLatest, IsDeleteMarker, "
+                          "Size, LastModifiedDate, ETag",
+            'creationTimestamp': '1399334400000',
+            'files': [{'key': 'inv/bucket/config/data/part.csv.gz'}],
+        }
+        manifest.update(kwargs)
+        with open(self.manifest_path, 'wb') as file_obj:
+            json.dump(manifest, file_obj)
+
+    def test_import(self):
+        self.assertEqual(('bucket', 6), inventory.import_report(
+            self.index, self.manifest_path))
+        self.assertEqual(1399334400.0, self.index.crawled('bucket'))
+
+        container = CloudContainer(None, 'bucket')
+        objs = self.index.get_objects(container, 'dir')
+        self.assertEqual(
+            [(u"dir/a b.txt", 5, datetime.datetime(2014, 5, 6, 7, 8, 9),
+              "e1", False),
+             (u"dir/sub", 0, None, None, True)],
+            [(x.name, x.size, x.last_modified, x.etag, x.is_subdir)
+             for x in objs])
+        self.assertEqual(['', 'dir/', 'dir/sub/', 'empty/'],
+                         self.index.get_directories_paths(container))
+        self.assertEqual((3, 13), self.index.stats('bucket'))
+
+    def test_unsupported_format(self):
+        self.write_manifest(fileFormat='ORC')
+        self.assertRaises(ValueError, inventory.import_report, self.index,
+                          self.manifest_path)
+
+    def test_missing_data_file(self):
+        self.write_manifest(files=[{'key': 'inv/missing.csv.gz'}])
+        self.assertRaises(ValueError, inventory.import_report, self.index,
+                          self.manifest_path)
+
+    def test_command(self):
+        stdout = StringIO()
+        with override_settings(CLOUD_BROWSER_INDEX_PATH=self.index.path):
+            call_command('cloud_browser_index', 'other',
+                         inventory=self.manifest_path, stdout=stdout)
+            self.assertTrue("Imported 6 objects of 'other'" in
+                            stdout.getvalue())
+
+            self.write_manifest(fileFormat='Parquet')
+            self.assertRaises(CommandError, call_command,
+                              'cloud_browser_index',
+                              inventory=self.manifest_path)
+        self.assertTrue(self.index.is_indexed('other'))
@@ -0,0 +1,151 @@
+"""Cloud browser jobs.py tests."""
+import json
+import os
+import shutil
+import tempfile
+
+from django.http import Http404
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+import mock
+
+from cloud_browser import jobs, views
+from cloud_browser.cloud import errors
+from cloud_browser.cloud.fs import FilesystemConnection
+
+
+class TestJob(TestCase):
+    """Tests for Job."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.conn_patcher = mock.patch('cloud_browser.jobs.get_connection')
+        self.container = \
+            self.conn_patcher.start().return_value.get_container.return_value
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.conn_patcher.stop()
+
+    def test_run(self):
+        job = jobs.Job('delete', 'bucket', {'src_path': 'foo',
+                                            'is_file': False})
+        job.run()
+
+        self.container.delete.assert_called_with(
+            progress=job.progress, src_path='foo', is_file=False)
+        stored = jobs.Job.get(job.id)
+        self.assertEqual(jobs.DONE, stored.state)
+        self.assertTrue(stored.is_finished)
+
+    def test_run_failed(self):
+        self.container.move.side_effect = errors.NoObjectException
+        job = jobs.Job('move', 'bucket', {})
+        job.run()
+
+        stored = jobs.Job.get(job.id)
+        self.assertEqual(jobs.FAILED, stored.state)
+        self.assertEqual("Object does not exist.", stored.error)
+
+    def test_progress(self):
+        def delete(progress, **kwargs):  # pylint: disable=unused-argument
+            progress(1, 4, 100)
+            self.assertEqual(jobs.RUNNING, job.state)
+            self.assertTrue(job.eta >= 0)
+            self.assertEqual(
+                {'done': 1, 'total': 4, 'size': 100},
+                dict((key, value) for key, value in job.as_dict().items()
+                     if key in ('done', 'total', 'size')))
+
+        self.container.delete.side_effect = delete
+        job = jobs.Job('delete', 'bucket', {})
+        job.run()
+        self.assertEqual(None, job.eta)
+
+    def test_unknown_operation(self):
+        self.assertRaises(ValueError, jobs.Job, 'mkdir', 'bucket', {})
+
+    def test_submit_without_workers(self):
+        with self.settings(CLOUD_BROWSER_JOB_WORKERS=0):
+            job = jobs.submit('delete', 'bucket', src_path='foo',
+                              is_file=True)
+        self.assertEqual(jobs.DONE, job.state)
+
+    def test_submit_to_pool(self):
+        with self.settings(CLOUD_BROWSER_JOB_WORKERS=2):
+            job = jobs.submit('delete', 'bucket', src_path='foo',
+                              is_file=True)
+            jobs.get_pool().join()
+        self.assertEqual(jobs.DONE, jobs.Job.get(job.id).state)
+
+    def test_interrupted(self):
+        job = jobs.Job('delete', 'bucket', {})
+        job.worker = 'gone'
+        job.save()
+
+        stored = jobs.Job.get(job.id)
+        self.assertEqual(jobs.FAILED, stored.state)
+        self.assertEqual("Job was interrupted.", stored.error)
+        self.assertEqual(jobs.FAILED, jobs.Job.get(job.id).state)
+
+    def test_heartbeat(self):
+        pool = jobs.WorkerPool(0)
+        pool._beat()  # pylint: disable=protected-access
+        job = jobs.Job('delete', 'bucket', {})
+        job.worker = pool.worker
+        job.save()
+
+        self.assertEqual(jobs.QUEUED, jobs.Job.get(job.id).state)
+
+
+class TestJobStatusView(TestCase):
+    """Tests for the job_status view."""
+
+    def request(self, job_id, session_job_ids):
+        request = RequestFactory().get("/jobs/%s/" % job_id)
+        request.session = {views.JOBS_SESSION_KEY: session_job_ids}
+        return request
+
+    def test_job_status(self):
+        job = jobs.Job('delete', 'bucket', {}, "Deleting 'foo'")
+        job.save()
+
+        response = views.job_status(self.request(job.id, [job.id]), job.id)
+        status = json.loads(response.content)
+        self.assertEqual(job.id, status['id'])
+        self.assertEqual(jobs.QUEUED, status['state'])
+        self.assertEqual("Deleting 'foo'", status['description'])
+
+    def test_job_status_unknown(self):
+        self.assertRaises(Http404, views.job_status,
+                          self.request('0', ['0']), '0')
+
+    def test_job_status_other_session(self):
+        job = jobs.Job('delete', 'bucket', {}, "Deleting 'foo'")
+        job.save()
+
+        self.assertRaises(Http404, views.job_status,
+                          self.request(job.id, []), job.id)
+
+
+class TestFilesystemProgress(TestCase):
+    """Tests for filesystem operation progress."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'cont', 'dir', 'sub'))
+        for name in ('dir/a', 'dir/sub/b'):
+            with open(os.path.join(self.root, 'cont', name), 'wb') as fil:
+                fil.write("data")
+        self.container = FilesystemConnection(self.root).get_container('cont')
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        shutil.rmtree(self.root)
+
+    def test_delete_directory(self):
+        progress = mock.Mock()
+        self.container.delete('dir', False, progress=progress)
+
+        self.assertEqual([mock.call(1, 2, 4), mock.call(2, 2, 8)],
+                         progress.call_args_list)
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'cont',
+                                                     'dir')))
@@ -0,0 +1,207 @@
+"""Cloud browser cloud/rackspace.py tests."""
+from StringIO import StringIO
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+import mock
+
+from cloud_browser.cloud.rackspace import RackspaceContainer, \
+    RackspaceObject
+from cloud_browser.common import SEP
+
+
+class FakeNativeContainer(object):
+    """Stand-in for a :mod:`cloudfiles` container.
+
+    Lists object infos the way Cloud Files does: sorted by name, names
+    under ``prefix`` holding ``delimiter`` rolled up into ``subdir``
+    entries, and ``limit`` counting the rolled up entries.
+    """
+
+    def __init__(self, infos):
+        self.infos = sorted(infos, key=lambda x: x['name'])
+        self.calls = []
+
+    def list_objects_info(self, limit=None, delimiter=None, prefix='',
+                          marker=None):
+        self.calls.append(marker)
+        results = []
+        for info in self.infos:
+            name = info['name']
+            if not name.startswith(prefix):
+                continue
+
+            rest = name[len(prefix):]
+            if delimiter and delimiter in rest:
+                entry = {'subdir': prefix + rest.split(delimiter)[0] +
+                                   delimiter}
+            else:
+                entry = info
+
+            key = entry.get('name', entry.get('subdir'))
+            if marker is not None and key <= marker:
+                continue
+            if results and results[-1] == entry:
+                continue
+            results.append(entry)
+
+        return results[:limit]
+
+
+class FakeNativeObject(object):
+    """Stand-in for a :mod:`cloudfiles` storage object, streaming its
+    contents from a single response the way ``Object.stream`` does.
+    """
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.reads = []
+
+    def stream(self, chunksize=8192):
+        response = StringIO(self.contents)
+        while True:
+            self.reads.append(chunksize)
+            buff = response.read(chunksize)
+            if not buff:
+                break
+            yield buff
+
+
+def file_info(name, content_type='text/plain'):
+    """Return object info of file (or dummy directory) ``name``."""
+    return {
+        'name': name,
+        'bytes': 1,
+        'content_type': content_type,
+        'last_modified': '2010-04-15T01:52:13.919070',
+        'hash': 'etag',
+    }
+
+
+def dir_info(name):
+    """Return object info of dummy directory object ``name``."""
+    return file_info(name, 'application/directory')
+
+
+class RackspaceContainerTestCase(TestCase):
+    """Base class for RackspaceContainer tests on a fake container."""
+
+    def container(self, infos):
+        """Return container listing ``infos``."""
+        container = RackspaceContainer(None, 'cont')
+        native = FakeNativeContainer(infos)
+        patcher = mock.patch.object(RackspaceContainer, '_get_container',
+                                    return_value=native)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return container, native
+
+    def names(self, objs):
+        return [x.name for x in objs]
+
+
+class TestGetPage(RackspaceContainerTestCase):
+    """Tests for listing pages."""
+
+    def test_last_page(self):
+        container, _ = self.container([file_info('dir/a'),
+                                       file_info('dir/sub/b')])
+
+        objs, marker = container._get_page('dir', None, 3)
+        self.assertEqual(['dir/a', 'dir/sub'], self.names(objs))
+        self.assertEqual([False, True], [x.is_subdir for x in objs])
+        self.assertEqual(None, marker)
+
+    def test_full_page(self):
+        container, _ = self.container([file_info('dir/a'),
+                                       file_info('dir/sub/b'),
+                                       file_info('dir/z')])
+
+        objs, marker = container._get_page('dir', None, 2)
+        self.assertEqual(['dir/a', 'dir/sub'], self.names(objs))
+        self.assertEqual('dir/sub' + SEP, marker)
+
+        objs, marker = container._get_page('dir', marker, 2)
+        self.assertEqual(['dir/z'], self.names(objs))
+        self.assertEqual(None, marker)
+
+
+class TestGetObjects(RackspaceContainerTestCase):
+    """Tests for listings across pages."""
+
+    def test_continuation(self):
+        container, native = self.container(
+            [file_info('dir/%d' % x) for x in range(5)])
+
+        with mock.patch.object(RackspaceContainer, 'max_list', 2):
+            objs = container.get_objects('dir', limit=4)
+
+        self.assertEqual(['dir/0', 'dir/1', 'dir/2', 'dir/3'],
+                         self.names(objs))
+        self.assertEqual([None, 'dir/1'], native.calls)
+
+    def test_collapse(self):
+        container, _ = self.container([dir_info('dir/sub'),
+                                       file_info('dir/sub/a'),
+                                       file_info('dir/z')])
+
+        objs = container.get_objects('dir')
+        self.assertEqual(['dir/sub', 'dir/z'], self.names(objs))
+        self.assertTrue(objs[0].is_subdir)
+        self.assertEqual('etag', objs[0].etag)
+
+    def test_collapse_page_boundary(self):
+        # The dummy directory object ends the first page, the implied
+        # subdirectory of the same name starts the second one.
+        container, native = self.container([file_info('dir/a'),
+                                            dir_info('dir/sub'),
+                                            file_info('dir/sub/b'),
+                                            file_info('dir/z')])
+
+        with mock.patch.object(RackspaceContainer, 'max_list', 2):
+            objs = container.get_objects('dir', limit=3)
+
+        self.assertEqual(['dir/a', 'dir/sub', 'dir/z'], self.names(objs))
+        self.assertEqual('etag', objs[1].etag)
+        self.assertEqual([None, 'dir/sub'], native.calls)
+
+    def test_marker_subdir(self):
+        container, _ = self.container([file_info('dir/a'),
+                                       file_info('dir/sub/b'),
+                                       file_info('dir/z')])
+
+        objs = container.get_objects('dir', marker='dir/sub')
+        self.assertEqual(['dir/z'], self.names(objs))
+
+
+class TestReadIter(TestCase):
+    """Tests for streamed reads of objects."""
+
+    def obj(self, contents):
+        """Return object of ``contents`` on a fake native object."""
+        obj = RackspaceObject(RackspaceContainer(None, 'cont'), 'file')
+        native = FakeNativeObject(contents)
+        patcher = mock.patch.object(RackspaceObject, '_get_object',
+                                    return_value=native)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return obj, native
+
+    def test_chunks(self):
+        obj, native = self.obj("abcdefghij")
+
+        self.assertEqual(["abcd", "efgh", "ij"], list(obj.read_iter(4)))
+        self.assertEqual([4, 4, 4, 4], native.reads)
+
+    def test_exact_chunks(self):
+        obj, _ = self.obj("abcdefgh")
+
+        self.assertEqual(["abcd", "efgh"], list(obj.read_iter(4)))
+
+    @override_settings(CLOUD_BROWSER_READ_CHUNK_SIZE=3)
+    def test_default_chunk_size(self):
+        obj, native = self.obj("abcdefg")
+
+        self.assertEqual(["abc", "def", "g"], list(obj.read_iter()))
+        self.assertEqual(3, native.reads[0])
@@ -0,0 +1,60 @@
+"""Cloud browser cloud/ratelimit.py tests."""
+import time
+
+from django.test import TestCase
+
+import mock
+
+from cloud_browser.cloud import ratelimit
+
+
+class TestLimiter(TestCase):
+    """Tests for Limiter."""
+
+    def test_acquire_waits_for_token(self):
+        limiter = ratelimit.Limiter(10)
+        limiter.tokens = 0
+
+        with mock.patch('time.sleep') as sleep:
+            limiter.acquire()
+        self.assertAlmostEqual(0.1, sleep.call_args[0][0], places=2)
+
+    def test_burst(self):
+        limiter = ratelimit.Limiter(10)
+
+        with mock.patch('time.sleep') as sleep:
+            for _ in range(9):
+                limiter.acquire()
+        self.assertFalse(sleep.called)
+
+    def test_aimd(self):
+        limiter = ratelimit.Limiter(100)
+
+        limiter.throttled(time.time())
+        self.assertEqual(50, limiter.rate)
+        limiter.succeeded()
+        self.assertEqual(50.2, limiter.rate)
+
+    def test_decrease_once_per_window(self):
+        limiter = ratelimit.Limiter(100)
+        issued = time.time()
+
+        limiter.throttled(issued)
+        limiter.throttled(issued)
+        self.assertEqual(50, limiter.rate)
+        limiter.throttled(time.time())
+        self.assertEqual(25, limiter.rate)
+
+    def test_bounds(self):
+        limiter = ratelimit.Limiter(2)
+
+        limiter.succeeded()
+        self.assertEqual(2, limiter.rate)
+        for _ in range(3):
+            limiter.throttled(time.time())
+        self.assertEqual(ratelimit.MIN_RATE, limiter.rate)
+
+    def test_backoff(self):
+        with self.settings(CLOUD_BROWSER_RATE_BACKOFF=1):
+            self.assertTrue(0 <= ratelimit.backoff(2) <= 4)
+            self.assertTrue(ratelimit.backoff(20) <= ratelimit.MAX_BACKOFF)
@@ -0,0 +1,99 @@
+"""Cloud browser cloud/singleflight.py tests."""
+import threading
+import time
+
+from django.test import TestCase
+
+import mock
+
+from cloud_browser.cloud import singleflight
+
+
+class TestGroup(TestCase):
+    """Tests for Group."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.group = singleflight.Group()
+        self.release = threading.Event()
+        self.function = mock.Mock(side_effect=self.blocking)
+        self.results = []
+
+    def blocking(self, value):
+        self.release.wait()
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def call(self, key, value):
+        try:
+            self.results.append(self.group.do(key, self.function, value))
+        except ValueError as error:
+            self.results.append(error)
+
+    def run_concurrently(self, *calls):
+        threads = [threading.Thread(target=self.call, args=args)
+                   for args in calls]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+    def test_identical_calls_share_result(self):
+        self.run_concurrently(*[('key', 'value')] * 4)
+
+        self.assertEqual(1, self.function.call_count)
+        self.assertEqual(['value'] * 4, [x for x, _ in self.results])
+        self.assertEqual(3, len([x for _, x in self.results if x]))
+        self.assertEqual({}, self.group.calls)
+
+    def test_identical_calls_share_exception(self):
+        error = ValueError("failed")
+        self.run_concurrently(*[('key', error)] * 3)
+
+        self.assertEqual(1, self.function.call_count)
+        self.assertEqual([error] * 3, self.results)
+
+    def test_different_calls(self):
+        self.run_concurrently(('a', 'a'), ('b', 'b'))
+
+        self.assertEqual(2, self.function.call_count)
+        self.assertEqual([('a', False), ('b', False)], sorted(self.results))
+
+    def test_sequential_calls(self):
+        self.release.set()
+        self.assertEqual(('a', False), self.group.do('key', self.function,
+                                                     'a'))
+        self.assertEqual(('b', False), self.group.do('key', self.function,
+                                                     'b'))
+
+
+class TestCoalesced(TestCase):
+    """Tests for the coalesced decorator."""
+
+    class Container(object):
+        """Fake container."""
+        name = 'bucket'
+
+        def __init__(self):
+            self.calls = 0
+
+        @singleflight.coalesced
+        def get_objects(self, path, marker=None):
+            self.calls += 1
+            return [path, marker]
+
+    def test_results(self):
+        container = self.Container()
+        self.assertEqual(['dir', None], container.get_objects('dir'))
+        self.assertEqual(['dir', 'm'], container.get_objects('dir',
+                                                             marker='m'))
+        self.assertEqual(2, container.calls)
+
+    @mock.patch.object(singleflight.GROUP, 'do')
+    def test_disabled(self, do_fn):
+        with self.settings(CLOUD_BROWSER_SINGLEFLIGHT=False):
+            self.assertEqual(['dir', None],
+                             self.Container().get_objects('dir'))
+        self.assertFalse(do_fn.called)
@@ -1,12 +1,19 @@
 """Cloud browser views.py tests."""
+import json
+import os
+import shutil
+import tempfile
+
 from django.test import TestCase
+from django.test.client import RequestFactory
 
 import mock
 
 from cloud_browser.cloud import errors
 from cloud_browser.cloud.base import CloudContainer
+from cloud_browser.cloud.fs import FilesystemConnection
 from cloud_browser.common import ROOT
-from cloud_browser import views
+from cloud_browser import jobs, views
 
 
 class TestBrowserRedirect(TestCase):
@@ -49,3 +56,378 @@ class TestBrowserRedirect(TestCase):
         self.redirect_fn.assert_called_with('cloud_browser_browser',
                                             path='redirect_test',
                                             permanent=False)
+
+
+class TestDocument(TestCase):
+    """Tests for the document view."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.conn_patcher = mock.patch('cloud_browser.views.get_connection')
+        container = \
+            self.conn_patcher.start().return_value.get_container.return_value
+        self.storage_obj = container.get_object.return_value
+        self.storage_obj.size = 100
+        self.storage_obj.read.return_value = "data"
+        self.storage_obj.smart_content_type = 'text/plain'
+        self.storage_obj.smart_content_encoding = None
+        self.storage_obj.etag = None
+        self.storage_obj.last_modified = None
+        self.storage_obj.get_download_url.return_value = "http://signed/"
+        self.request = RequestFactory().get("/document/bucket/doc")
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.conn_patcher.stop()
+
+    def test_proxied(self):
+        self.storage_obj.read_iter.return_value = iter(["da", "ta"])
+
+        response = views.document(self.request, 'bucket/doc')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("100", response['Content-Length'])
+        self.assertEqual("data", "".join(response.streaming_content))
+        self.assertFalse(self.storage_obj.get_download_url.called)
+
+    def test_redirect(self):
+        with self.settings(CLOUD_BROWSER_DOCUMENT_REDIRECT=True,
+                           CLOUD_BROWSER_DOCUMENT_REDIRECT_EXPIRES=60):
+            response = views.document(self.request, 'bucket/doc')
+        self.assertEqual(302, response.status_code)
+        self.assertEqual("http://signed/", response['Location'])
+        self.storage_obj.get_download_url.assert_called_with(60)
+        self.assertFalse(self.storage_obj.read.called)
+
+    def test_redirect_below_min_size(self):
+        with self.settings(CLOUD_BROWSER_DOCUMENT_REDIRECT=True,
+                           CLOUD_BROWSER_DOCUMENT_REDIRECT_MIN_SIZE=101):
+            response = views.document(self.request, 'bucket/doc')
+        self.assertEqual(200, response.status_code)
+
+    def test_redirect_unsupported(self):
+        self.storage_obj.get_download_url.return_value = None
+        with self.settings(CLOUD_BROWSER_DOCUMENT_REDIRECT=True):
+            response = views.document(self.request, 'bucket/doc')
+        self.assertEqual(200, response.status_code)
+
+
+class TestBulkViews(TestCase):
+    """Tests for BulkDeleteView and BulkMoveView."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.container_patcher = mock.patch(
+            'cloud_browser.views.get_container_by_name')
+        self.container = self.container_patcher.start().return_value
+        self.container.name = 'bucket'
+        self.factory = RequestFactory()
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.container_patcher.stop()
+
+    def post(self, view, **data):
+        data.update(container_name='bucket', wd_path='')
+        request = self.factory.post("/bulk/", data,
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        request.session = {}
+        response = view.as_view()(request)
+        return request, json.loads(response.content)
+
+    def test_bulk_delete_files(self):
+        self.container.delete_files.return_value = [('a', None),
+                                                    ('b', "AccessDenied")]
+
+        _, summary = self.post(views.BulkDeleteView, file_paths=['a', 'b'])
+        self.container.delete_files.assert_called_with(['a', 'b'])
+        self.assertEqual(1, summary['succeeded'])
+        self.assertEqual(1, summary['failed'])
+        self.assertEqual("AccessDenied", summary['results'][1]['error'])
+
+    @mock.patch('cloud_browser.views.jobs.submit')
+    def test_bulk_delete_directories(self, submit_fn):
+        job = submit_fn.return_value = mock.Mock(spec=jobs.Job)
+        job.id = 'abc'
+        job.state = jobs.QUEUED
+        job.is_finished = False
+
+        request, summary = self.post(views.BulkDeleteView, dir_paths=['d'])
+        submit_fn.assert_called_with('delete', 'bucket', "Deleting 'd'",
+                                     src_path='d', is_file=False)
+        self.assertEqual([{'path': 'd', 'ok': True, 'error': None,
+                           'job': 'abc'}], summary['results'])
+        self.assertEqual(['abc'], request.session[views.JOBS_SESSION_KEY])
+        self.assertFalse(self.container.delete_files.called)
+
+    def test_bulk_move(self):
+        self.container.get_object.side_effect = errors.NoObjectException
+        self.container.move_files.return_value = [('a', None)]
+
+        _, summary = self.post(views.BulkMoveView, target_dir_path='dir/',
+                               file_paths=['a'], dir_paths=['d'])
+        self.container.has_directory.assert_called_with('dir/')
+        self.container.get_object.assert_called_with('dir/a')
+        self.container.move_files.assert_called_with(['a'], 'dir/')
+        self.assertEqual(1, summary['succeeded'])
+        self.assertEqual("Only files can be moved.",
+                         summary['results'][0]['error'])
+
+    def test_bulk_move_collision(self):
+        def get_object(path):
+            if path != 'dir/b':
+                raise errors.NoObjectException
+
+        self.container.get_object.side_effect = get_object
+        self.container.move_files.return_value = [('a', None)]
+
+        _, summary = self.post(views.BulkMoveView, target_dir_path='dir/',
+                               file_paths=['a', 'b'])
+        self.container.move_files.assert_called_with(['a'], 'dir/')
+        self.assertEqual(1, summary['succeeded'])
+        self.assertEqual([{'path': 'b', 'ok': False,
+                           'error': "'dir/' has file 'b'."}],
+                         [x for x in summary['results'] if not x['ok']])
+
+
+class TestAdminBrowser(TestCase):
+    """Tests for the browser view under the admin URL configuration."""
+
+    urls = 'cloud_browser.urls_admin'
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'cont', 'dir'))
+        with open(os.path.join(self.root, 'cont', 'file'), 'wb') as fil:
+            fil.write("data")
+        conn = FilesystemConnection(self.root)
+        self.patchers = [
+            mock.patch('cloud_browser.views.get_connection',
+                       return_value=conn),
+            mock.patch('cloud_browser.views.get_connection_cls',
+                       return_value=FilesystemConnection),
+            mock.patch('cloud_browser.views._session_jobs',
+                       return_value=[jobs.Job('delete', 'cont', {})]),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.root)
+
+    def test_browser(self):
+        with self.settings(CLOUD_BROWSER_DATASTORE="AWS"):
+            response = self.client.get("/browser/cont")
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, 'action="/bulk/delete/"')
+        self.assertContains(response, '/download/cont/dir')
+        self.assertContains(response, '/upload/multipart/')
+
+
+class TestDeleteView(TestCase):
+    """Tests for DeleteView."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.patchers = [
+            mock.patch('cloud_browser.views.get_container_by_name'),
+            mock.patch('cloud_browser.views.browser_redirect'),
+            mock.patch('cloud_browser.views.messages'),
+            mock.patch('cloud_browser.views.jobs.submit'),
+        ]
+        self.container, self.redirect_fn, _, self.submit_fn = \
+            [patcher.start() for patcher in self.patchers]
+        self.container = self.container.return_value
+        self.container.name = 'bucket'
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def post(self, is_file):
+        request = RequestFactory().post("/delete/", {
+            'container_name': 'bucket', 'src_path': 'dir/a',
+            'is_file': str(is_file)})
+        request.session = {}
+        return views.DeleteView.as_view()(request)
+
+    def test_delete_file(self):
+        self.post(True)
+        self.container.delete.assert_called_with('dir/a', True)
+        self.assertFalse(self.submit_fn.called)
+        self.redirect_fn.assert_called_with(self.container, 'dir/')
+
+    def test_delete_directory(self):
+        self.submit_fn.return_value.is_finished = False
+        self.post(False)
+        self.submit_fn.assert_called_with('delete', 'bucket',
+                                          "Deleting 'dir/a'",
+                                          src_path='dir/a', is_file=False)
+        self.assertFalse(self.container.delete.called)
+
+
+class TestMkdirView(TestCase):
+    """Tests for MkdirView."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.patchers = [
+            mock.patch('cloud_browser.views.get_container_by_name'),
+            mock.patch('cloud_browser.views.browser_redirect'),
+            mock.patch('cloud_browser.views.messages'),
+        ]
+        self.container, self.redirect_fn, self.messages = \
+            [patcher.start() for patcher in self.patchers]
+        self.container = self.container.return_value
+        self.container.is_safe_basename.return_value = True
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def post(self, wd_path):
+        request = RequestFactory().post("/mkdir/", {
+            'container_name': 'bucket', 'wd_path': wd_path,
+            'dir_basename': 'new'})
+        request.user = mock.Mock(username='user')
+        return views.MkdirView.as_view()(request)
+
+    def test_mkdir(self):
+        self.container.paths_exist.return_value = [True, False]
+
+        self.post('dir/')
+        self.container.paths_exist.assert_called_once_with(
+            ['dir/', 'dir/new/'], cached=False)
+        self.container.mkdir.assert_called_with('dir/new/', username='user')
+
+    def test_mkdir_existing(self):
+        self.container.paths_exist.return_value = [True, True]
+
+        self.post('dir/')
+        self.assertFalse(self.container.mkdir.called)
+
+    def test_mkdir_root(self):
+        self.container.path_exists.return_value = False
+
+        self.post('')
+        self.container.path_exists.assert_called_once_with(
+            'new/', cached=False)
+        self.container.mkdir.assert_called_with('new/', username='user')
+
+    def test_mkdir_missing_wd(self):
+        self.container.paths_exist.return_value = [False, False]
+
+        self.post('dir/')
+        self.assertFalse(self.container.mkdir.called)
+        self.redirect_fn.assert_called_with(self.container, ROOT)
+
+
+class TestBrowserSort(TestCase):
+    """Tests for the sort and page token helpers of the browser view."""
+
+    def test_parse_sort(self):
+        self.assertEqual(('size', True), views._parse_sort('-size'))
+        self.assertEqual(('last_modified', False),
+                         views._parse_sort('last_modified'))
+        self.assertEqual(('name', False), views._parse_sort('bogus'))
+        self.assertEqual(('name', False), views._parse_sort(None))
+
+    def test_sort_links(self):
+        self.assertEqual({'name': 'name', 'size': 'size',
+                          'last_modified': '-last_modified'},
+                         views._sort_links('size', True))
+
+    def test_page_token(self):
+        token = views._encode_page_token(20, u'dir/\u00e9')
+        self.assertEqual((20, u'dir/\u00e9'),
+                         views._decode_page_token(token))
+        self.assertEqual(None, views._decode_page_token('!bogus'))
+        self.assertEqual(None, views._decode_page_token(
+            views.base64.urlsafe_b64encode('[1]')))
+
+
+class TestUploadFileView(TestCase):
+    """Tests for UploadFileView."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.patchers = [
+            mock.patch('cloud_browser.views.get_container_by_name'),
+            mock.patch('cloud_browser.views.browser_redirect'),
+            mock.patch('cloud_browser.views.messages'),
+            mock.patch('cloud_browser.views.index'),
+        ]
+        self.container, self.redirect_fn, _, _ = \
+            [patcher.start() for patcher in self.patchers]
+        self.container = self.container.return_value
+        self.container.name = 'bucket'
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def test_upload_invalidates_existence(self):
+        request = RequestFactory().get("/upload/", {
+            'bucket': 'bucket', 'key': 'dir/new/file'})
+        views.UploadFileView.as_view()(request)
+
+        self.container.conn.existence.invalidate.assert_called_with(
+            'bucket')
+        self.redirect_fn.assert_called_with(self.container, 'dir/new/')
+
+
+class TestMultipartUploadView(TestCase):
+    """Tests for MultipartUploadView."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.container_patcher = mock.patch(
+            'cloud_browser.views.get_container_by_name')
+        self.container = self.container_patcher.start().return_value
+        self.container.name = 'bucket'
+        self.factory = RequestFactory()
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.container_patcher.stop()
+
+    def post(self, action, **data):
+        data.update(action=action, container_name='bucket', key='dir/up')
+        request = self.factory.post("/upload/multipart/", data)
+        request.user = mock.Mock(username='me')
+        response = views.MultipartUploadView.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    def test_initiate(self):
+        self.container.initiate_upload.return_value = 'id'
+
+        with self.settings(CLOUD_BROWSER_UPLOAD_PART_SIZE=10):
+            _, result = self.post('initiate', size=25,
+                                  content_type='text/plain')
+        self.container.initiate_upload.assert_called_with(
+            'dir/up', content_type='text/plain', username='me')
+        self.assertEqual('id', result['upload_id'])
+        self.assertEqual(10, result['part_size'])
+        self.assertEqual(3, result['part_count'])
+
+    def test_initiate_part_size_raised(self):
+        self.container.initiate_upload.return_value = 'id'
+
+        with self.settings(CLOUD_BROWSER_UPLOAD_PART_SIZE=10):
+            _, result = self.post('initiate', size=1000000)
+        self.assertEqual(100, result['part_size'])
+        self.assertEqual(10000, result['part_count'])
+
+    def test_sign(self):
+        self.container.get_upload_part_url.side_effect = \
+            lambda key, upload_id, number, expires: "url%d" % number
+
+        _, result = self.post('sign', upload_id='id', part_numbers=['1', '2'])
+        self.assertEqual({'1': "url1", '2': "url2"}, result['urls'])
+
+    def test_complete(self):
+        _, result = self.post('complete', upload_id='id', part_count='3')
+        self.container.complete_upload.assert_called_with('dir/up', 'id', 3)
+        self.assertTrue(result['redirect'].endswith(
+            "/upload/?bucket=bucket&key=dir%2Fup"))
+
+    def test_error(self):
+        self.container.complete_upload.side_effect = \
+            errors.StorageResponseException("missing parts")
+
+        status, result = self.post('complete', upload_id='id',
+                                   part_count='3')
+        self.assertEqual(400, status)
+        self.assertEqual("missing parts", result['error'])
@@ -0,0 +1,112 @@
+"""Cloud browser zipstream.py tests."""
+import datetime
+import os
+import shutil
+import tempfile
+import zipfile
+
+from StringIO import StringIO
+
+from django.http import Http404
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+import mock
+
+from cloud_browser import views, zipstream
+from cloud_browser.cloud.fs import FilesystemConnection
+
+
+class TestZipStream(TestCase):
+    """Tests for ZipStream."""
+
+    def test_archive(self):
+        archive = zipstream.ZipStream()
+        modified = datetime.datetime(2014, 5, 6, 7, 8, 10)
+        data = "".join(
+            list(archive.member("dir/a.txt", ["hello ", "world"], modified)) +
+            list(archive.member(u"dir/\xe9.bin", [])) +
+            list(archive.close()))
+        self.assertEqual(len(data), archive.offset)
+
+        zip_file = zipfile.ZipFile(StringIO(data))
+        self.assertEqual(None, zip_file.testzip())
+        self.assertEqual([u"dir/a.txt", u"dir/\xe9.bin"], zip_file.namelist())
+        self.assertEqual("hello world", zip_file.read("dir/a.txt"))
+        self.assertEqual("", zip_file.read(u"dir/\xe9.bin"))
+        self.assertEqual((2014, 5, 6, 7, 8, 10),
+                         zip_file.getinfo("dir/a.txt").date_time)
+
+
+class TestPrefetched(TestCase):
+    """Tests for prefetched."""
+
+    def obj(self, name, size):
+        obj = mock.Mock(size=size)
+        obj.name = name
+        obj.read.return_value = name
+        obj.read_iter.return_value = iter([name])
+        return obj
+
+    def test_order_and_streaming(self):
+        objs = [self.obj("a", 1), self.obj("big", 100), self.obj("c", 1)]
+
+        results = [(obj.name, list(chunks)) for obj, chunks in
+                   zipstream.prefetched(objs, 2, 10)]
+        self.assertEqual([("a", ["a"]), ("big", ["big"]), ("c", ["c"])],
+                         results)
+        self.assertFalse(objs[1].read.called)
+        self.assertFalse(objs[0].read_iter.called)
+
+    def test_error(self):
+        obj = self.obj("a", 1)
+        obj.read.side_effect = IOError("failed")
+
+        files = zipstream.prefetched([obj], 2, 10)
+        self.assertRaises(IOError, list, files)
+
+
+class TestDownloadDirectory(TestCase):
+    """Tests for the download_directory view."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'cont', 'dir', 'sub'))
+        for name in ('dir/a', 'dir/sub/b', 'c'):
+            with open(os.path.join(self.root, 'cont', name), 'wb') as fil:
+                fil.write(name * 1000)
+
+        self.conn_patcher = mock.patch('cloud_browser.views.get_connection')
+        self.conn_patcher.start().return_value = \
+            FilesystemConnection(self.root)
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        self.conn_patcher.stop()
+        shutil.rmtree(self.root)
+
+    def download(self, path):
+        request = RequestFactory().get("/download/" + path)
+        return views.download_directory(request, path)
+
+    def test_download_directory(self):
+        with self.settings(CLOUD_BROWSER_ZIP_PREFETCH_SIZE=3000):
+            response = self.download('cont/dir')
+
+        self.assertEqual('application/zip', response['Content-Type'])
+        self.assertEqual('attachment; filename="dir.zip"',
+                         response['Content-Disposition'])
+        zip_file = zipfile.ZipFile(
+            StringIO("".join(response.streaming_content)))
+        self.assertEqual(["dir/a", "dir/sub/b"], zip_file.namelist())
+        self.assertEqual("dir/sub/b" * 1000, zip_file.read("dir/sub/b"))
+
+    def test_download_container(self):
+        response = self.download('cont')
+
+        zip_file = zipfile.ZipFile(
+            StringIO("".join(response.streaming_content)))
+        self.assertEqual(["cont/c", "cont/dir/a", "cont/dir/sub/b"],
+                         sorted(zip_file.namelist()))
+
+    def test_download_missing(self):
+        self.assertRaises(Http404, self.download, 'cont/missing')
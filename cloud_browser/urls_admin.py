@@ -3,8 +3,8 @@ from django.conf.urls import patterns, url
 from django.views.generic.base import RedirectView
 
 from cloud_browser.app_settings import settings
-from cloud_browser.views import UploadFileView, MkdirView, DeleteView, \
-    RenameView, MoveFileView
+from cloud_browser.common import lazy_view
+
 
 # pylint: disable=invalid-name, no-value-for-parameter
 urlpatterns = patterns(
@@ -15,13 +15,27 @@ urlpatterns = patterns(
     url(r'^browser/(?P<path>.*)$', 'browser', name="cloud_browser_browser",
         kwargs={'template': "cloud_browser/admin/browser.html"}),
     url(r'^document/(?P<path>.*)$', 'document', name="cloud_browser_document"),
-    url(r'^upload/$', UploadFileView.as_view(), name='upload'),
-    url(r'^mkdir/$', MkdirView.as_view(), name='mkdir'),
-    url(r'^delete/$', DeleteView.as_view(), name='delete'),
-    url(r'^rename/$', RenameView.as_view(), name='rename',
+    url(r'^download/(?P<path>.*)$', 'download_directory',
+        name="cloud_browser_download"),
+    url(r'^upload/$',
+        lazy_view('cloud_browser.views.UploadFileView'), name='upload'),
+    url(r'^upload/multipart/$',
+        lazy_view('cloud_browser.views.MultipartUploadView'),
+        name='multipart_upload'),
+    url(r'^mkdir/$', lazy_view('cloud_browser.views.MkdirView'), name='mkdir'),
+    url(r'^delete/$',
+        lazy_view('cloud_browser.views.DeleteView'), name='delete'),
+    url(r'^rename/$',
+        lazy_view('cloud_browser.views.RenameView'), name='rename',
         kwargs={'template': "cloud_browser/admin/rename.html"}),
-    url(r'^move/$', MoveFileView.as_view(), name='move',
+    url(r'^move/$', lazy_view('cloud_browser.views.MoveFileView'), name='move',
         kwargs={'template': "cloud_browser/admin/move.html"}),
+    url(r'^bulk/delete/$',
+        lazy_view('cloud_browser.views.BulkDeleteView'), name='bulk_delete'),
+    url(r'^bulk/move/$',
+        lazy_view('cloud_browser.views.BulkMoveView'), name='bulk_move'),
+    url(r'^jobs/(?P<job_id>[0-9a-f]+)/$', 'job_status',
+        name="cloud_browser_job"),
 )
 
 if settings.app_media_url is None:
@@ -1,22 +1,34 @@
 """Cloud browser views."""
+from urllib import urlencode
 from urlparse import urlparse
+import base64
+import json
 import logging
 
 from django.contrib import messages
-from django.http import HttpResponse, Http404
+from django.http import HttpResponse, HttpResponseRedirect, Http404, \
+    StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.utils.importlib import import_module
 from django.views.generic.base import View
 import django.core.urlresolvers
 
+from cloud_browser import jobs, zipstream
 from cloud_browser.app_settings import settings
-from cloud_browser.cloud import get_connection, get_connection_cls, errors
+from cloud_browser.cloud import get_connection, get_connection_cls, errors, \
+    doccache, index
+from cloud_browser.cloud.base import SORT_KEYS, sort_value
 from cloud_browser.common import SEP, ROOT, get_int, basename, \
     get_wd_path, path_parts, path_join, path_join_sep, path_yield, relpath
 
-MAX_LIMIT = get_connection_cls().cont_cls.max_list
 LOGGER = logging.getLogger(__name__)
 
+#: Session key holding ids of the user's background jobs.
+JOBS_SESSION_KEY = 'cloud_browser_jobs'
+
+#: Maximum number of job ids kept in the session.
+JOBS_SESSION_MAX = 10
+
 
 def get_container_by_name(container_name):
     """Get the container object by given container_name.
@@ -64,6 +76,56 @@ def browser_redirect(container, redirect_directory, permanent=False):
                     permanent=permanent)
 
 
+def submit_job(request, operation, container, description, **kwargs):
+    """Submit a background job, remember it in the session and add a message.
+
+    :param operation: Container method name (see :mod:`cloud_browser.jobs`).
+    :param container: An instance of a container object, inherited from
+        the abstract class CloudContainer.
+    :param description: Human readable description.
+
+    :rtype: :class:`cloud_browser.jobs.Job`
+    """
+    job = jobs.submit(operation, container.name, description, **kwargs)
+    _remember_job(request, job)
+
+    if job.state == jobs.DONE:
+        message = "{} done.".format(description)
+    elif job.state == jobs.FAILED:
+        message = "{} failed: {}".format(description, job.error)
+    else:
+        message = "{} started.".format(description)
+    messages.add_message(request, messages.INFO, message)
+
+    return job
+
+
+def _remember_job(request, job):
+    """Remember an unfinished job in the session for display."""
+    if not job.is_finished:
+        job_ids = request.session.get(JOBS_SESSION_KEY, [])
+        request.session[JOBS_SESSION_KEY] = \
+            (job_ids + [job.id])[-JOBS_SESSION_MAX:]
+
+
+def _session_jobs(request):
+    """Return the user's known jobs, forgetting finished ones.
+
+    Finished jobs are returned (and thus displayed) one last time.
+    """
+    session_jobs = []
+    for job_id in request.session.get(JOBS_SESSION_KEY, []):
+        job = jobs.Job.get(job_id)
+        if job is not None:
+            session_jobs.append(job)
+
+    pending = [job.id for job in session_jobs if not job.is_finished]
+    if pending != request.session.get(JOBS_SESSION_KEY, []):
+        request.session[JOBS_SESSION_KEY] = pending
+
+    return session_jobs
+
+
 def settings_view_decorator(function):
     """Insert decorator from settings, if any.
 
@@ -106,6 +168,48 @@ def _breadcrumbs(path):
     return crumbs
 
 
+def _parse_sort(sort):
+    """Return ``(sort key, descending)`` of sort parameter (``"size"``,
+    ``"-size"``, ...), sorting by name if invalid.
+    """
+    sort = sort or ''
+    descending = sort.startswith('-')
+    sort_key = sort.lstrip('-')
+    if sort_key not in SORT_KEYS:
+        return 'name', False
+    return sort_key, descending
+
+
+def _sort_links(sort_key, descending):
+    """Return sort parameters of the listing column headers: the current
+    column toggles its order, sizes and dates sort largest / newest first.
+    """
+    links = {}
+    for key in SORT_KEYS:
+        if key == sort_key:
+            reverse = not descending
+        else:
+            reverse = key != 'name'
+        links[key] = '-' + key if reverse else key
+    return links
+
+
+def _encode_page_token(value, name):
+    """Return page token of ``(sort value, name)`` keyset."""
+    return base64.urlsafe_b64encode(json.dumps([value, name]))
+
+
+def _decode_page_token(token):
+    """Return ``(sort value, name)`` keyset of page token, ``None`` if
+    invalid.
+    """
+    try:
+        value, name = json.loads(base64.urlsafe_b64decode(str(token)))
+    except (TypeError, ValueError, UnicodeError):
+        return None
+    return value, name
+
+
 @settings_view_decorator
 def browser(request, path='', template="cloud_browser/browser.html"):
     """View files in a file path.
@@ -125,9 +229,14 @@ def browser(request, path='', template="cloud_browser/browser.html"):
     if marker_part:
         marker = path_join(object_path, marker_part)
 
+    sort_key, descending = _parse_sort(incoming.get('sort', None))
+    page_token = incoming.get('page_token', None)
+    after = _decode_page_token(page_token) if page_token else None
+
     # Get and adjust listing limit.
     limit_default = settings.CLOUD_BROWSER_DEFAULT_LIST_LIMIT
-    limit_test = lambda x: x > 0 and (MAX_LIMIT is None or x <= MAX_LIMIT - 1)
+    max_limit = get_connection_cls().cont_cls.max_list
+    limit_test = lambda x: x > 0 and (max_limit is None or x <= max_limit - 1)
     limit = get_int(incoming.get('limit', limit_default),
                     limit_default,
                     limit_test)
@@ -140,9 +249,11 @@ def browser(request, path='', template="cloud_browser/browser.html"):
     containers = conn.get_containers()
 
     marker_part = None
+    page_token = None
     container = None
     objects = None
     upload_form = None
+    multipart_upload_action = None
     key_prefix = ''
     if container_path != ROOT:
         # Find marked container from list.
@@ -154,7 +265,12 @@ def browser(request, path='', template="cloud_browser/browser.html"):
         # Q2: Get objects for instant list, plus one to check "next".
         container = cont_list[0]
         try:
-            objects = container.get_objects(object_path, marker, limit+1)
+            if sort_key == 'name' and not descending:
+                objects = container.get_objects(object_path, marker,
+                                                limit+1)
+            else:
+                objects = container.get_sorted_objects(
+                    object_path, sort_key, descending, after, limit+1)
         except (errors.StorageResponseException,
                 errors.ClientException) as error:
             LOGGER.warning(
@@ -164,11 +280,16 @@ def browser(request, path='', template="cloud_browser/browser.html"):
 
         marker = None
 
-        # If over limit, strip last item and set marker.
+        # If over limit, strip last item and set marker (or page token of
+        # sorted listings).
         if len(objects) == limit + 1:
             objects = objects[:limit]
-            marker = objects[-1].name
-            marker_part = relpath(marker, object_path)
+            if sort_key == 'name' and not descending:
+                marker = objects[-1].name
+                marker_part = relpath(marker, object_path)
+            else:
+                page_token = _encode_page_token(
+                    sort_value(objects[-1], sort_key), objects[-1].name)
 
         key_prefix = path[len(container.name)+1:]
 
@@ -193,7 +314,11 @@ def browser(request, path='', template="cloud_browser/browser.html"):
         # get_upload_form() methods vary, so corresponding upload method is
         # called here, except "Filesystem".
         datastore = settings.CLOUD_BROWSER_DATASTORE
-        if datastore == "AWS":
+        if datastore == "AWS" and settings.CLOUD_BROWSER_UPLOAD_MULTIPART:
+            # Rendered by the template, uploaded by browser.js.
+            multipart_upload_action = \
+                django.core.urlresolvers.reverse('multipart_upload')
+        elif datastore == "AWS":
             upload_form = conn.get_upload_form(
                 container_name=container.name,
                 key_prefix=key_prefix,
@@ -206,12 +331,13 @@ def browser(request, path='', template="cloud_browser/browser.html"):
         elif datastore == "Rackspace":
             upload_form = conn.get_upload_form()
 
-        objects = container.filter_objects(objects)
-
     return render(request, template,
                   {'path': path,
                    'marker': marker,
                    'marker_part': marker_part,
+                   'page_token': page_token,
+                   'sort': '-' + sort_key if descending else sort_key,
+                   'sort_links': _sort_links(sort_key, descending),
                    'limit': limit,
                    'breadcrumbs': _breadcrumbs(path),
                    'container_path': container_path,
@@ -220,8 +346,10 @@ def browser(request, path='', template="cloud_browser/browser.html"):
                    'object_path': object_path,
                    'objects': objects,
                    'upload_form': upload_form,
+                   'multipart_upload_action': multipart_upload_action,
                    'mkdir_action': django.core.urlresolvers.reverse('mkdir'),
                    'delete_action': django.core.urlresolvers.reverse('delete'),
+                   'jobs': _session_jobs(request),
                    'wd_path': key_prefix})
 
 
@@ -245,17 +373,77 @@ def document(_, path=''):
     except errors.NoObjectException:
         raise Http404("No object at: %s" % object_path)
 
+    # Let the datastore serve large documents.
+    if settings.CLOUD_BROWSER_DOCUMENT_REDIRECT and \
+            storage_obj.size >= \
+            settings.CLOUD_BROWSER_DOCUMENT_REDIRECT_MIN_SIZE:
+        url = storage_obj.get_download_url(
+            settings.CLOUD_BROWSER_DOCUMENT_REDIRECT_EXPIRES)
+        if url is not None:
+            return HttpResponseRedirect(url)
+
     # Get content-type and encoding.
     content_type = storage_obj.smart_content_type
     encoding = storage_obj.smart_content_encoding
-    response = HttpResponse(content=storage_obj.read(),
-                            content_type=content_type)
+    response = StreamingHttpResponse(doccache.read_iter(storage_obj),
+                                     content_type=content_type)
+    if storage_obj.size:
+        response['Content-Length'] = str(storage_obj.size)
     if encoding not in (None, ''):
         response['Content-Encoding'] = encoding
 
     return response
 
 
+@settings_view_decorator
+def download_directory(_, path=''):
+    """Stream directory from path as ZIP archive.
+
+    :param path: Path to directory, including container as first part of
+        path.
+    """
+    container_path, object_path = path_parts(path)
+    conn = get_connection()
+    try:
+        container = conn.get_container(container_path)
+    except errors.NoContainerException:
+        raise Http404("No container at: %s" % container_path)
+    except errors.NotPermittedException:
+        raise Http404("Access denied for container at: %s" % container_path)
+
+    if object_path:
+        try:
+            container.has_directory(object_path.rstrip(SEP) + SEP)
+        except errors.NoObjectException:
+            raise Http404("No directory at: %s" % object_path)
+
+    name = basename(object_path.rstrip(SEP)) or container.name
+    response = StreamingHttpResponse(
+        zipstream.directory_zip(container, object_path, name),
+        content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="%s.zip"' % \
+        name.encode('ascii', 'replace').replace('"', '')
+    return response
+
+
+@settings_view_decorator
+def job_status(request, job_id):
+    """Return background job status as JSON.
+
+    Only jobs submitted in the user's session are visible.
+
+    :param job_id: Job identifier.
+    """
+    job = None
+    if job_id in request.session.get(JOBS_SESSION_KEY, []):
+        job = jobs.Job.get(job_id)
+    if job is None:
+        raise Http404("No job: %s" % job_id)
+
+    return HttpResponse(json.dumps(job.as_dict()),
+                        content_type="application/json")
+
+
 class UploadFileView(View):
 
     # pylint: disable=no-self-use, unused-argument
@@ -265,6 +453,16 @@ class UploadFileView(View):
         container_name = request.GET['bucket']
 
         container = get_container_by_name(container_name)
+        # The browser uploaded straight to the datastore, past the
+        # container methods that drop cached existence probes.
+        container.conn.existence.invalidate(container.name)
+
+        try:
+            index.record_upload(container, src_path)
+        except errors.CloudException as error:
+            LOGGER.warning("Unable to index upload of '{}': {}.".format(
+                src_path, error))
+            index.invalidate(container.name, 'upload', src_path=src_path)
 
         messages.add_message(
             request, messages.INFO,
@@ -273,6 +471,71 @@ class UploadFileView(View):
         return browser_redirect(container, get_wd_path(src_path))
 
 
+class MultipartUploadView(View):
+    """Initiate, sign parts of, complete and abort multipart uploads.
+
+    The browser uploads parts directly to the datastore with presigned URLs
+    (see ``CloudBrowser.upload`` in ``browser.js``). The ``action`` field
+    selects the operation, responses are JSON.
+    """
+
+    # pylint: disable=no-self-use, unused-argument
+    def post(self, request, *args, **kwargs):
+        action = request.POST['action']
+        container = get_container_by_name(request.POST['container_name'])
+        key = request.POST['key']
+
+        try:
+            if action == 'initiate':
+                result = self._initiate(request, container, key)
+            elif action == 'sign':
+                result = {'urls': dict(
+                    (number, container.get_upload_part_url(
+                        key, request.POST['upload_id'], int(number),
+                        settings.CLOUD_BROWSER_UPLOAD_URL_EXPIRES))
+                    for number in request.POST.getlist('part_numbers'))}
+            elif action == 'complete':
+                container.complete_upload(key, request.POST['upload_id'],
+                                          int(request.POST['part_count']))
+                result = {'redirect': "{}?{}".format(
+                    django.core.urlresolvers.reverse('upload'),
+                    urlencode({'bucket': container.name,
+                               'key': key.encode('utf-8')}))}
+            elif action == 'abort':
+                container.abort_upload(key, request.POST['upload_id'])
+                result = {}
+            else:
+                raise Http404("No upload action: %s" % action)
+        except (errors.StorageResponseException,
+                errors.ClientException) as error:
+            LOGGER.warning("Unable to {} upload of {}: {}".format(
+                action, key, error))
+            return HttpResponse(json.dumps({'error': unicode(error)}),
+                                content_type="application/json", status=400)
+
+        return HttpResponse(json.dumps(result),
+                            content_type="application/json")
+
+    @staticmethod
+    def _initiate(request, container, key):
+        """Initiate upload, return upload id and part layout."""
+        from cloud_browser.cloud.boto_base import MULTIPART_MAX_PARTS
+
+        size = int(request.POST['size'])
+        part_size = max(settings.CLOUD_BROWSER_UPLOAD_PART_SIZE,
+                        -(-size // MULTIPART_MAX_PARTS))
+        upload_id = container.initiate_upload(
+            key,
+            content_type=request.POST.get('content_type') or None,
+            username=request.user.username)
+
+        return {'upload_id': upload_id,
+                'part_size': part_size,
+                'part_count': max(1, -(-size // part_size)),
+                'workers': settings.CLOUD_BROWSER_UPLOAD_WORKERS,
+                'retries': settings.CLOUD_BROWSER_UPLOAD_RETRIES}
+
+
 class DeleteView(View):
 
     # pylint: disable=no-self-use, unused-argument
@@ -283,14 +546,24 @@ class DeleteView(View):
 
         container = get_container_by_name(container_name)
 
+        # Single files are deleted right away, so the redirected page no
+        # longer lists them.
+        if not is_file:
+            submit_job(request, 'delete', container,
+                       "Deleting '{}'".format(src_path),
+                       src_path=src_path, is_file=is_file)
+            return browser_redirect(container, get_wd_path(src_path))
+
         try:
             container.delete(src_path, is_file)
+            index.record(container.name, 'delete', src_path=src_path)
             messages.add_message(
                 request, messages.INFO,
                 "'{}' deleted.".format(src_path))
         except (errors.StorageResponseException,
                 errors.ClientException) as error:
             LOGGER.warning("Unable to delete '{}': {}".format(src_path, error))
+            index.invalidate(container.name, 'delete', src_path=src_path)
         except errors.NoObjectException as error:
             LOGGER.warning(error)
 
@@ -307,15 +580,21 @@ class MkdirView(View):
 
         container = get_container_by_name(container_name)
 
-        # Check current directory exists or not.
+        # Probe current and new directory at once.
+        dir_path = path_join_sep(wd_path, dir_basename)
         if wd_path != ROOT:
-            try:
-                container.has_directory(wd_path)
-            except errors.NoObjectException:
-                messages.add_message(
-                    request, messages.INFO,
-                    "'{}' does not exist.".format(wd_path))
-                return browser_redirect(container, ROOT)
+            wd_exists, dir_exists = container.paths_exist(
+                [wd_path, dir_path], cached=False)
+        else:
+            wd_exists, dir_exists = True, container.path_exists(
+                dir_path, cached=False)
+
+        # Check current directory exists or not.
+        if not wd_exists:
+            messages.add_message(
+                request, messages.INFO,
+                "'{}' does not exist.".format(wd_path))
+            return browser_redirect(container, ROOT)
 
         # Check the correctness of the new directory name.
         if not container.is_safe_basename(dir_basename):
@@ -327,19 +606,15 @@ class MkdirView(View):
             return browser_redirect(container, wd_path)
 
         # Check new directory object exists or not.
-        try:
-            if container.has_directory(
-                    path_join_sep(wd_path, dir_basename)):
-                messages.add_message(
-                    request, messages.INFO,
-                    "'{}' existed.".format(dir_basename))
+        if dir_exists:
+            messages.add_message(
+                request, messages.INFO,
+                "'{}' existed.".format(dir_basename))
             return browser_redirect(container, wd_path)
-        except errors.NoObjectException:
-            pass
 
         try:
-            container.mkdir(path_join_sep(wd_path, dir_basename),
-                            username=request.user.username)
+            container.mkdir(dir_path, username=request.user.username)
+            index.record(container.name, 'mkdir', dir_path=dir_path)
             messages.add_message(
                 request, messages.INFO,
                 "Directory '{}' created.".format(dir_basename))
@@ -404,34 +679,18 @@ class RenameView(View):
             return browser_redirect(container, wd_path)
 
         # Check new object name exists or not.
-        try:
-            path = path_join(wd_path, new_basename)
-            if ((is_file and container.get_object(path)) or
-                    container.has_directory(path)):
-                messages.add_message(
-                    request, messages.INFO,
-                    "'{}' existed.".format(
-                        path_join(wd_path, new_basename)))
-                return browser_redirect(container, wd_path)
-        except errors.NoObjectException:
-            pass
-
-        try:
-            container.rename(wd_path, src_path, new_basename, is_file)
+        path = path_join(wd_path, new_basename)
+        if container.path_exists(path, cached=False):
             messages.add_message(
                 request, messages.INFO,
-                "'{}' was renamed as '{}'.".format(
-                    src_path, path_join(wd_path, new_basename)))
-        except errors.NoObjectException as error:
-            messages.add_message(
-                request, messages.INFO,
-                "'{}' does not exist.".format(src_path))
-            LOGGER.warning(
-                "Unable to rename '{}': {}.".format(src_path, error))
-        except (errors.StorageResponseException,
-                errors.ClientException) as error:
-            LOGGER.warning(
-                "Unable to rename '{}': {}.".format(src_path, error))
+                "'{}' existed.".format(path))
+            return browser_redirect(container, wd_path)
+
+        submit_job(request, 'rename', container,
+                   "Renaming '{}' as '{}'".format(
+                       src_path, path_join(wd_path, new_basename)),
+                   parent_dir_path=wd_path, src_path=src_path,
+                   new_basename=new_basename, is_file=is_file)
 
         return browser_redirect(container, wd_path)
 
@@ -496,23 +755,136 @@ class MoveFileView(View):
         except errors.NoObjectException:
             pass
 
-        try:
-            container.move(src_path, target_dir_path)
-            messages.add_message(
-                request, messages.INFO,
-                "'{}' was moved to '{}'.".format(
-                    src_path, target_dir_path))
-        except errors.NoObjectException as error:
+        submit_job(request, 'move', container,
+                   "Moving '{}' to '{}'".format(src_path, target_dir_path),
+                   src_file_path=src_path, target_dir_path=target_dir_path)
+
+        return browser_redirect(container, wd_path)
+
+
+def _bulk_response(request, container, wd_path, results, verb):
+    """Return per-item results of a bulk operation.
+
+    AJAX requests get a JSON summary, others a summary message and a redirect
+    to the working directory.
+
+    :param results: List of ``(path, error)`` tuples, error is ``None`` for
+        successful paths, or a ``Job`` for paths handed to background jobs.
+    :param verb: Past tense of the operation, e.g., "deleted".
+    """
+    items = []
+    for path, error in results:
+        item = {'path': path, 'ok': error is None, 'error': None}
+        if isinstance(error, jobs.Job):
+            item.update(ok=True, job=error.id)
+        elif error is not None:
+            item['error'] = error
+        items.append(item)
+
+    succeeded = len([x for x in items if x['ok']])
+    if request.is_ajax():
+        return HttpResponse(json.dumps({'succeeded': succeeded,
+                                        'failed': len(items) - succeeded,
+                                        'results': items}),
+                            content_type="application/json")
+
+    messages.add_message(
+        request, messages.INFO,
+        "{} of {} selected objects {}.".format(succeeded, len(items), verb))
+    for item in items:
+        if item['error'] is not None:
             messages.add_message(
                 request, messages.INFO,
-                "'{}' does not exist.".format(src_path))
-            LOGGER.warning(
-                "Unable to move file '{}': {}.".format(
-                    src_path, error))
-        except (errors.StorageResponseException,
-                errors.ClientException) as error:
-            LOGGER.warning(
-                "Unable to move file '{}': {}.".format(
-                    src_path, error))
+                "'{}': {}".format(item['path'], item['error']))
 
-        return browser_redirect(container, wd_path)
+    return browser_redirect(container, wd_path)
+
+
+class BulkDeleteView(View):
+    """Delete selected files and directories.
+
+    Files are deleted with batched datastore calls, directories with one
+    background job each.
+    """
+
+    # pylint: disable=no-self-use, unused-argument
+    def post(self, request, *args, **kwargs):
+        container_name = request.POST['container_name']
+        wd_path = request.POST['wd_path']
+        file_paths = request.POST.getlist('file_paths')
+        dir_paths = request.POST.getlist('dir_paths')
+
+        container = get_container_by_name(container_name)
+
+        results = []
+        if file_paths:
+            try:
+                deleted = container.delete_files(file_paths)
+            except (errors.StorageResponseException,
+                    errors.ClientException) as error:
+                LOGGER.warning("Unable to delete files: {}".format(error))
+                deleted = [(path, unicode(error)) for path in file_paths]
+                for path in file_paths:
+                    index.invalidate(container.name, 'delete', src_path=path)
+            else:
+                for path, error in deleted:
+                    if error is None:
+                        index.record(container.name, 'delete', src_path=path)
+            results.extend(deleted)
+
+        for path in dir_paths:
+            job = jobs.submit('delete', container.name,
+                              "Deleting '{}'".format(path),
+                              src_path=path, is_file=False)
+            _remember_job(request, job)
+            results.append((path, job.error if job.state == jobs.FAILED
+                            else job))
+
+        return _bulk_response(request, container, wd_path, results,
+                              "deleted")
+
+
+class BulkMoveView(View):
+    """Move selected files to a target directory."""
+
+    # pylint: disable=no-self-use, unused-argument
+    def post(self, request, *args, **kwargs):
+        container_name = request.POST['container_name']
+        wd_path = request.POST['wd_path']
+        target_dir_path = request.POST['target_dir_path'].strip(SEP)
+        file_paths = request.POST.getlist('file_paths')
+        dir_paths = request.POST.getlist('dir_paths')
+
+        container = get_container_by_name(container_name)
+
+        if target_dir_path != ROOT:
+            try:
+                container.has_directory(path_join_sep(target_dir_path))
+            except errors.NoObjectException:
+                messages.add_message(
+                    request, messages.INFO,
+                    "'{}' does not exist.".format(target_dir_path))
+                return browser_redirect(container, wd_path)
+            target_dir_path = path_join_sep(target_dir_path)
+
+        results = [(path, "Only files can be moved.") for path in dir_paths]
+
+        # Check new objects (target_dir_path + basename) exist or not.
+        movable = []
+        for path in file_paths:
+            try:
+                container.get_object(path_join(target_dir_path,
+                                               basename(path)))
+            except errors.NoObjectException:
+                movable.append(path)
+            else:
+                results.append((path, "'{}' has file '{}'.".format(
+                    target_dir_path, basename(path))))
+
+        for path, error in container.move_files(movable, target_dir_path):
+            if error is None:
+                index.record(container.name, 'move', src_file_path=path,
+                             target_dir_path=target_dir_path)
+            results.append((path, error))
+
+        return _bulk_response(request, container, wd_path, results, "moved")
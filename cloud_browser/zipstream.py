@@ -0,0 +1,177 @@
+"""Streaming ZIP archives of directories.
+
+Archives are produced as a byte stream without seeking: every member is
+written with a data descriptor (its CRC and sizes follow the data) and
+ZIP64 records, so that archives and members may exceed 4 GB. Members are
+deflated.
+
+The files of a directory are listed lazily. Small members are prefetched
+by background threads a bounded number of members ahead, larger members
+are streamed chunk by chunk when their turn comes, so memory use is bounded
+by ``CLOUD_BROWSER_ZIP_WORKERS`` times ``CLOUD_BROWSER_ZIP_PREFETCH_SIZE``
+regardless of the directory size.
+"""
+import datetime
+import struct
+import zlib
+
+from cloud_browser.app_settings import settings
+from cloud_browser.cloud.concurrency import imap_ahead
+from cloud_browser.common import SEP
+
+
+###############################################################################
+# Helpers / Constants
+###############################################################################
+#: Version needed to extract (ZIP64).
+ZIP_VERSION = 45
+
+#: General purpose flags: data descriptor, UTF-8 names.
+ZIP_FLAGS = 0x0808
+
+#: Compression method: deflate.
+ZIP_DEFLATED = 8
+
+#: 32-bit field placeholder of ZIP64 values.
+ZIP64_LIMIT = 0xFFFFFFFF
+
+#: External attributes of members (regular file, rw-r--r--).
+ZIP_FILE_ATTRS = (0100644 << 16)
+
+#: Compression level.
+COMPRESS_LEVEL = 6
+
+
+def _dos_date_time(modified):
+    """Return (DOS date, DOS time) of a ``datetime``."""
+    if modified is None:
+        modified = datetime.datetime.now()
+    if modified.year < 1980:
+        modified = datetime.datetime(1980, 1, 1)
+
+    return (((modified.year - 1980) << 9) | (modified.month << 5) |
+            modified.day,
+            (modified.hour << 11) | (modified.minute << 5) |
+            (modified.second // 2))
+
+
+###############################################################################
+# Classes
+###############################################################################
+class ZipStream(object):
+    """Writer of a ZIP64 archive as a stream of byte strings."""
+
+    def __init__(self):
+        """Initializer."""
+        self.offset = 0
+        self.entries = []
+
+    def _out(self, data):
+        """Account for and return output data."""
+        self.offset += len(data)
+        return data
+
+    def member(self, name, chunks, modified=None):
+        """Yield archive data of member ``name``.
+
+        :param name: Member name (path within the archive).
+        :param chunks: Iterable of member content chunks.
+        :param modified: Last modified ``datetime``.
+        """
+        name = name.encode('utf-8') if isinstance(name, unicode) else name
+        date, time = _dos_date_time(modified)
+        header_offset = self.offset
+
+        extra = struct.pack('<HHQQ', 1, 16, 0, 0)
+        yield self._out(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, ZIP_VERSION, ZIP_FLAGS,
+            ZIP_DEFLATED, time, date, 0, ZIP64_LIMIT, ZIP64_LIMIT,
+            len(name), len(extra)) + name + extra)
+
+        crc, size, compressed_size = 0, 0, 0
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                compressed_size += len(data)
+                yield self._out(data)
+        data = compressor.flush()
+        compressed_size += len(data)
+        crc &= 0xFFFFFFFF
+
+        yield self._out(data + struct.pack(
+            '<IIQQ', 0x08074b50, crc, compressed_size, size))
+        self.entries.append((name, date, time, crc, compressed_size, size,
+                             header_offset))
+
+    def close(self):
+        """Yield central directory and end records."""
+        cd_offset = self.offset
+        for name, date, time, crc, compressed_size, size, header_offset in \
+                self.entries:
+            extra = struct.pack('<HHQQQ', 1, 24, size, compressed_size,
+                                header_offset)
+            yield self._out(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | ZIP_VERSION,
+                ZIP_VERSION, ZIP_FLAGS, ZIP_DEFLATED, time, date, crc,
+                ZIP64_LIMIT, ZIP64_LIMIT, len(name), len(extra), 0, 0, 0,
+                ZIP_FILE_ATTRS, ZIP64_LIMIT) + name + extra)
+
+        count = len(self.entries)
+        cd_size = self.offset - cd_offset
+        eocd64_offset = self.offset
+        yield self._out(struct.pack(
+            '<IQHHIIQQQQ', 0x06064b50, 44, (3 << 8) | ZIP_VERSION,
+            ZIP_VERSION, 0, 0, count, count, cd_size, cd_offset))
+        yield self._out(struct.pack('<IIQI', 0x07064b50, 0, eocd64_offset,
+                                    1))
+        yield self._out(struct.pack(
+            '<IHHHHIIH', 0x06054b50, 0, 0, min(count, 0xFFFF),
+            min(count, 0xFFFF), min(cd_size, ZIP64_LIMIT),
+            min(cd_offset, ZIP64_LIMIT), 0))
+
+
+###############################################################################
+# Functions
+###############################################################################
+def prefetched(storage_objs, workers, max_size):
+    """Yield ``(storage_obj, chunks)`` pairs in order.
+
+    Objects of at most ``max_size`` bytes are read by background threads up
+    to ``workers`` objects ahead; larger objects are read in chunks.
+    """
+    def read_small(storage_obj):
+        """Return ``(object, contents)``, ``None`` contents if large."""
+        if storage_obj.size <= max_size:
+            return storage_obj, storage_obj.read()
+        return storage_obj, None
+
+    for storage_obj, content in imap_ahead(read_small, storage_objs,
+                                           workers):
+        if content is None:
+            yield storage_obj, storage_obj.read_iter()
+        else:
+            yield storage_obj, [content]
+
+
+def directory_zip(container, path, root_name):
+    """Yield ZIP archive data of all files under directory ``path``.
+
+    :param container: Container object.
+    :param path: Directory path (``''`` for the whole container).
+    :param root_name: Name of the archive's top-level directory.
+    """
+    prefix = path.rstrip(SEP) + SEP if path else path
+    archive = ZipStream()
+    files = prefetched(container.walk_files(path),
+                       settings.CLOUD_BROWSER_ZIP_WORKERS,
+                       settings.CLOUD_BROWSER_ZIP_PREFETCH_SIZE)
+    for storage_obj, chunks in files:
+        name = SEP.join((root_name, storage_obj.name[len(prefix):]))
+        for data in archive.member(name, chunks, storage_obj.last_modified):
+            yield data
+
+    for data in archive.close():
+        yield data
@@ -124,6 +124,25 @@ def check():
     pylint()
 
 
+###############################################################################
+# Benchmarks
+###############################################################################
+def bench(backend="fs", sizes=None, save=False):
+    """Run benchmarks and compare with stored baselines.
+
+    :param backend: Datastore backend.
+    :param sizes: Directory sizes (semicolon-separated, e.g., "10;1000").
+    :param save: Store results as new baselines?
+    """
+    extra = "--backend=%s" % backend
+    if sizes:
+        extra += " --sizes=%s" % sizes.replace(";", ",")
+    if _parse_bool(save):
+        extra += " --save"
+
+    local("python -m bench.run %s" % extra, capture=False)
+
+
 ###############################################################################
 # Documentation
 ###############################################################################